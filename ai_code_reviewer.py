@@ -6,7 +6,7 @@
 
 import os
 import sys
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import json
 
@@ -18,7 +18,8 @@ from ai_prompt import (
     create_code_review_prompt,
     create_bug_detection_prompt,
     create_security_check_prompt,
-    create_performance_analysis_prompt
+    create_performance_analysis_prompt,
+    estimate_tokens
 )
 from git_commit_analyzer import (
     GitAnalyzer, 
@@ -26,30 +27,36 @@ from git_commit_analyzer import (
     get_files_for_review_by_prefix
 )
 from markdown_generator import MarkdownReportGenerator
+from diff_hunks import build_review_excerpt
 
 
 class SmartCodeReviewer:
     """智能代码审查器"""
     
-    def __init__(self, repo_path: str = ".", config_path: str = "config.yaml"):
+    def __init__(self, repo_path: str = ".", config_path: str = "config.yaml",
+                 **analyzer_options):
         """
         初始化智能代码审查器
         
         Args:
             repo_path: Git仓库路径
             config_path: AI配置文件路径
+            **analyzer_options: 传给 GitAnalyzer 的选项 (如 use_index、grep_pushdown)
         """
         self.repo_path = os.path.abspath(repo_path)
         self.ai_router = AIRouter(config_path)
         self.prompt_manager = AIPromptManager()
         self.prompt_builder = CodeReviewPromptBuilder(self.prompt_manager)
-        self.git_analyzer = GitAnalyzer(repo_path)
-        self.requirement_analyzer = RequirementAnalyzer(repo_path)
+        self.git_analyzer = GitAnalyzer(repo_path, **analyzer_options)
+        self.requirement_analyzer = RequirementAnalyzer(repo_path, git_analyzer=self.git_analyzer)
     
     def review_by_commit_prefix(self, 
                                prefix: str, 
                                since: str = "1 week ago",
-                               review_types: Optional[List[str]] = None) -> Dict[str, Any]:
+                               review_types: Optional[List[str]] = None,
+                               review_mode: str = "file",
+                               context_lines: int = 3,
+                               commit_token_threshold: int = 4000) -> Dict[str, Any]:
         """
         根据提交前缀进行智能代码审查
         
@@ -57,10 +64,18 @@ class SmartCodeReviewer:
             prefix: 提交消息前缀 (如: 'feat:', 'fix:', 'JIRA-123:')
             since: 时间范围
             review_types: 审查类型列表 ['code_review', 'bug_detection', 'security_check', 'performance_analysis']
+            review_mode: 'file' 审查整个文件；'diff' 只审查各提交的变更片段 (扩展到所在函数/类)；
+                'net' 每个文件只按全部匹配提交的净差异审查一次；
+                'commit' 补丁不超过阈值的小提交整体审查一次，其余文件按文件审查
+            context_lines: diff/net 模式下片段两端保留的上下文行数
+            commit_token_threshold: commit 模式下整体审查的补丁token上限 (估算值)
             
         Returns:
             审查结果字典
         """
+        if review_mode not in ('file', 'diff', 'net', 'commit'):
+            raise ValueError(f"不支持的审查模式: {review_mode}")
+        
         print(f"🔍 开始分析提交前缀: {prefix}")
         print(f"⏰ 时间范围: {since}")
         
@@ -70,46 +85,152 @@ class SmartCodeReviewer:
         
         # 1. 获取相关文件
         try:
-            analysis_result = self.requirement_analyzer.analyze_requirement_by_prefix(prefix, since)
-            files_to_review = list(analysis_result['files'])
-            commits = analysis_result['commits']
-            
-            print(f"📂 找到 {len(files_to_review)} 个相关文件")
-            print(f"📝 涉及 {len(commits)} 个提交")
+            analysis_result = self.requirement_analyzer.analyze_requirement_by_prefix(
+                prefix, since, net_diff=(review_mode == 'net')
+            )
+        except Exception as e:
+            print(f"❌ Git分析失败: {e}")
+            return {
+                'prefix': prefix,
+                'error': str(e),
+                'files_reviewed': [],
+                'reviews': {}
+            }
+        
+        return self._review_analysis(
+            prefix, analysis_result, review_types, review_mode, context_lines, commit_token_threshold
+        )
+    
+    def review_range(self,
+                     range_spec: str,
+                     review_types: Optional[List[str]] = None,
+                     review_mode: str = "file",
+                     context_lines: int = 3,
+                     commit_token_threshold: int = 4000) -> Dict[str, Any]:
+        """
+        审查提交范围内的全部提交 (如 CI 中的 'origin/main..HEAD')
+        
+        不按时间窗口和前缀扫描历史，只枚举范围内的提交；'A...B' 与 'A..B' 一样
+        以合并基准为起点计算净变更。
+        
+        Args:
+            range_spec: 提交范围 ('base..head'、'base...head'，只给 base 时 head 为 HEAD)
+            review_types: 审查类型列表
+            review_mode: 审查模式，同 review_by_commit_prefix
+            context_lines: diff/net 模式下片段两端保留的上下文行数
+            commit_token_threshold: commit 模式下整体审查的补丁token上限 (估算值)
             
-            if not files_to_review:
-                return {
-                    'prefix': prefix,
-                    'files_reviewed': [],
-                    'reviews': {},
-                    'summary': '未找到相关文件'
-                }
+        Returns:
+            审查结果字典 (结构与 review_by_commit_prefix 相同，'prefix' 为范围描述)
+        """
+        if review_mode not in ('file', 'diff', 'net', 'commit'):
+            raise ValueError(f"不支持的审查模式: {review_mode}")
+        
+        print(f"🔍 开始分析提交范围: {range_spec}")
         
+        if review_types is None:
+            review_types = ['code_review', 'bug_detection', 'performance_analysis']
+        
+        try:
+            analysis_result = self.requirement_analyzer.analyze_range(
+                range_spec, net_diff=(review_mode == 'net')
+            )
+            print(f"🔀 合并基准: {analysis_result['merge_base'][:8]}")
         except Exception as e:
             print(f"❌ Git分析失败: {e}")
             return {
-                'prefix': prefix,
+                'prefix': range_spec,
                 'error': str(e),
                 'files_reviewed': [],
                 'reviews': {}
             }
         
-        # 2. 对每个文件进行代码审查
+        return self._review_analysis(
+            range_spec, analysis_result, review_types, review_mode, context_lines, commit_token_threshold
+        )
+    
+    def _review_analysis(self,
+                         scope: str,
+                         analysis_result: Dict[str, Any],
+                         review_types: List[str],
+                         review_mode: str,
+                         context_lines: int,
+                         commit_token_threshold: int) -> Dict[str, Any]:
+        """
+        按分析结果 (提交与相关文件) 执行审查并汇总，前缀审查与范围审查共用
+        
+        Args:
+            scope: 审查范围描述 (前缀或提交范围)
+            analysis_result: RequirementAnalyzer 的分析结果
+            review_types: 审查类型列表
+            review_mode: 审查模式
+            context_lines: diff/net 模式下片段两端保留的上下文行数
+            commit_token_threshold: commit 模式下整体审查的补丁token上限
+            
+        Returns:
+            审查结果字典
+        """
+        files_to_review = list(analysis_result['files'])
+        commits = analysis_result['commits']
+        duplicate_commits = analysis_result.get('duplicate_commits', {})
+        
+        print(f"📂 找到 {len(files_to_review)} 个相关文件")
+        print(f"📝 涉及 {len(commits)} 个提交")
+        if duplicate_commits:
+            duplicate_count = sum(len(hashes) for hashes in duplicate_commits.values())
+            print(f"🔁 已合并 {duplicate_count} 个重复提交 (cherry-pick/变基副本)")
+        
+        if not files_to_review:
+            return {
+                'prefix': scope,
+                'files_reviewed': [],
+                'reviews': {},
+                'summary': '未找到相关文件'
+            }
+        
+        # 2. 对每个文件进行代码审查 (按提交版本读取，不受工作区状态影响)
         review_results = {}
+        commit_review_results = {}
         successful_reviews = 0
+        if review_mode == 'commit':
+            # 小提交整体审查，结果按提交保存一份，各文件只引用来源提交；其余文件走下面的逐文件审查
+            review_results, commit_review_results = self._review_small_commits(
+                commits, files_to_review, review_types, commit_token_threshold
+            )
+            # 只统计至少有一项审查成功的文件
+            successful_reviews = sum(
+                1 for file_result in review_results.values()
+                if any('error' not in review_data for review_data in file_result['reviews'].values())
+            )
+        
+        if review_mode == 'diff':
+            diff_excerpts = self._build_diff_excerpts(commits, files_to_review, context_lines)
+        elif review_mode == 'net':
+            diff_excerpts = self._build_net_diff_excerpts(
+                commits, analysis_result['net_diffs'], context_lines
+            )
+        else:
+            file_revisions = self._resolve_file_revisions(
+                commits, files_to_review, analysis_result.get('head')
+            )
         
         for file_path in files_to_review:
-            print(f"\n📄 正在审查文件: {file_path}")
-            
-            # 读取文件内容
-            full_path = os.path.join(self.repo_path, file_path)
-            if not os.path.exists(full_path):
-                print(f"⚠️  文件不存在，跳过: {file_path}")
+            if file_path in review_results:
                 continue
+            print(f"\n📄 正在审查文件: {file_path}")
             
             try:
-                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    file_content = f.read()
+                # 读取文件内容 (diff/net 模式下为变更片段摘录)
+                if review_mode in ('diff', 'net'):
+                    file_content = diff_excerpts.get(file_path)
+                    if not file_content:
+                        print(f"ℹ️  文件无变更片段，跳过: {file_path}")
+                        continue
+                else:
+                    file_content = self._read_file_content(file_path, file_revisions[file_path])
+                if file_content is None:
+                    print(f"⚠️  文件不存在，跳过: {file_path}")
+                    continue
                 
                 if not file_content.strip():
                     print(f"⚠️  文件为空，跳过: {file_path}")
@@ -123,7 +244,8 @@ class SmartCodeReviewer:
                 for review_type in review_types:
                     try:
                         review_result = self._perform_single_review(
-                            file_content, language, review_type, file_path
+                            file_content, language, review_type, file_path,
+                            diff_mode=(review_mode in ('diff', 'net'))
                         )
                         file_reviews[review_type] = review_result
                         print(f"✅ {review_type} 审查完成")
@@ -144,29 +266,246 @@ class SmartCodeReviewer:
         
         # 3. 生成综合报告
         summary = self._generate_summary_report(
-            prefix, commits, review_results, successful_reviews
+            scope, commits, review_results, successful_reviews, duplicate_commits,
+            commit_review_results
         )
         
         return {
-            'prefix': prefix,
+            'prefix': scope,
             'timestamp': datetime.now().isoformat(),
+            'review_mode': review_mode,
             'commits_analyzed': len(commits),
+            'duplicate_commits': duplicate_commits,
             'files_reviewed': successful_reviews,
             'total_files_found': len(files_to_review),
             'reviews': review_results,
+            'commit_reviews': commit_review_results,
             'summary': summary,
             'git_analysis': analysis_result
         }
     
+    def _review_small_commits(self, commits: List, files: List[str],
+                              review_types: List[str],
+                              token_threshold: int) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        整体审查补丁不超过token阈值的小提交，并把结果映射回逐文件结构
+        
+        只有当修改某文件的全部匹配提交都是小提交时，该文件才由提交级审查覆盖；
+        其余文件不在返回结果中，由调用方逐文件审查。每个提交的审查意见只保存一份，
+        文件结果中的审查项通过 'commit_refs' 引用来源提交，不复制审查内容。
+        
+        Returns:
+            (文件路径 -> 与逐文件审查相同结构的结果 (附加 'commit_reviews' 记录来源提交),
+             提交哈希 -> {'message', 'files', 'reviews'} 提交级审查结果)
+        """
+        files_to_include = set(files)
+        patches = self.git_analyzer.get_commit_patches([commit.hash for commit in commits])
+        small_commits = {
+            commit.hash for commit in commits
+            if patches.get(commit.hash) and estimate_tokens(patches[commit.hash]) <= token_threshold
+        }
+        
+        covered_files = set()
+        for file_path in files_to_include:
+            touching = [commit.hash for commit in commits if file_path in commit.files_changed]
+            if touching and all(commit_hash in small_commits for commit_hash in touching):
+                covered_files.add(file_path)
+        
+        review_results: Dict[str, Dict[str, Any]] = {}
+        commit_results: Dict[str, Dict[str, Any]] = {}
+        # 按时间顺序 (最早在前) 审查
+        for commit in reversed(commits):
+            commit_files = [path for path in commit.files_changed if path in covered_files]
+            if commit.hash not in small_commits or not commit_files:
+                continue
+            
+            print(f"\n📦 正在整体审查提交: {commit.hash[:8]} {commit.message} ({len(commit_files)} 个文件)")
+            commit_reviews = {}
+            for review_type in review_types:
+                try:
+                    prompt = self.prompt_builder.build_commit_review_prompt(
+                        patch=patches[commit.hash],
+                        commit_message=commit.message,
+                        files=commit.files_changed,
+                        review_type=review_type
+                    )
+                    commit_reviews[review_type] = {
+                        'type': review_type,
+                        'commit': commit.hash,
+                        'ai_response': self.ai_router.chat(prompt, use_history=False),
+                        'timestamp': datetime.now().isoformat()
+                    }
+                    print(f"✅ {review_type} 审查完成")
+                except Exception as e:
+                    print(f"❌ {review_type} 审查失败: {e}")
+                    commit_reviews[review_type] = {'error': str(e)}
+            
+            commit_results[commit.hash] = {
+                'message': commit.message,
+                'files': commit_files,
+                'reviews': commit_reviews
+            }
+            
+            for file_path in commit_files:
+                file_result = review_results.setdefault(file_path, {
+                    'language': self._detect_language(file_path),
+                    'reviews': {},
+                    'file_size': 0,
+                    'commit_reviews': []
+                })
+                file_result['commit_reviews'].append(commit.hash)
+                file_result['file_size'] += len(patches[commit.hash])
+                
+                for review_type, review_data in commit_reviews.items():
+                    existing = file_result['reviews'].get(review_type)
+                    if 'error' in review_data:
+                        if existing is None:
+                            file_result['reviews'][review_type] = {'error': review_data['error']}
+                        continue
+                    if existing is None or 'error' in existing:
+                        existing = file_result['reviews'][review_type] = {
+                            'type': review_type,
+                            'file_path': file_path,
+                            'commit_refs': []
+                        }
+                    # 同一文件被多个小提交修改时，按时间顺序引用各提交的审查意见
+                    existing['commit_refs'].append(commit.hash)
+        
+        return review_results, commit_results
+    
+    def _build_diff_excerpts(self, commits: List, files: List[str],
+                             context_lines: int = 3) -> Dict[str, str]:
+        """
+        生成各文件的变更片段摘录
+        
+        每个匹配提交的差异片段在该提交版本的文件上扩展到所在函数/类边界，
+        同一文件的多个提交按时间顺序拼接；没有差异片段的文件 (如依赖文件) 不包含在内。
+        """
+        files_to_include = set(files)
+        hunks_by_commit = self.git_analyzer.get_diff_hunks_by_commits([commit.hash for commit in commits])
+        
+        excerpts: Dict[str, List[str]] = {}
+        # 提交按 git log 顺序排列 (最新在前)，摘录按时间顺序拼接
+        for commit in reversed(commits):
+            for file_path, hunks in hunks_by_commit.get(commit.hash, {}).items():
+                if file_path not in files_to_include or not hunks:
+                    continue
+                
+                content = self.git_analyzer.read_file_at(commit.hash, file_path)
+                if content is None:
+                    continue
+                
+                excerpt = build_review_excerpt(
+                    content, hunks, self._detect_language(file_path), context_lines
+                )
+                if excerpt:
+                    excerpts.setdefault(file_path, []).append(
+                        f"提交 {commit.hash[:8]}: {commit.message}\n{excerpt}"
+                    )
+        
+        return {file_path: '\n\n'.join(parts) for file_path, parts in excerpts.items()}
+    
+    def _build_net_diff_excerpts(self, commits: List, net_diffs: Dict[str, Dict[str, Any]],
+                                 context_lines: int = 3) -> Dict[str, str]:
+        """
+        按净差异生成各文件的变更片段摘录，每个文件只对应一份摘录
+        
+        存在交错无关提交的文件使用只重放匹配提交得到的净差异与内容；只有重放冲突
+        (没有净差异片段) 的文件才改为拼接匹配提交各自的片段。
+        """
+        excerpts = {}
+        conflicted_files = []
+        
+        for file_path, net_diff in net_diffs.items():
+            if net_diff['hunks'] is None:
+                conflicted_files.append(file_path)
+                continue
+            if not net_diff['hunks']:
+                continue
+            
+            if net_diff['content'] is not None:
+                content = net_diff['content']
+            else:
+                content = self.git_analyzer.read_file_at(net_diff['head'], file_path)
+            if content is None:
+                continue
+            
+            excerpt = build_review_excerpt(
+                content, net_diff['hunks'], self._detect_language(file_path), context_lines
+            )
+            if excerpt:
+                excerpts[file_path] = (
+                    f"净变更 {net_diff['base'][:8]}..{net_diff['head'][:8]} "
+                    f"(合并 {len(net_diff['commits'])} 个提交"
+                    f"{'，已排除交错的无关提交' if net_diff['interleaved'] else ''})\n{excerpt}"
+                )
+        
+        if conflicted_files:
+            excerpts.update(self._build_diff_excerpts(commits, conflicted_files, context_lines))
+        
+        return excerpts
+    
+    def _resolve_file_revisions(self, commits: List, files: List[str],
+                                default_revision: Optional[str] = None) -> Dict[str, str]:
+        """
+        确定每个文件的审查版本
+        
+        直接修改的文件取最近一次修改它的匹配提交，其余文件 (如依赖文件) 取 default_revision
+        (范围审查时为范围终点)，未指定时取HEAD。
+        """
+        file_revisions = {}
+        # 提交按 git log 顺序排列 (最新在前)
+        for commit in commits:
+            for file_path in commit.files_changed:
+                file_revisions.setdefault(file_path, commit.hash)
+        
+        head = default_revision
+        for file_path in files:
+            if file_path not in file_revisions:
+                if head is None:
+                    head = self.git_analyzer.resolve_revision('HEAD')
+                file_revisions[file_path] = head
+        
+        return file_revisions
+    
+    def _read_file_content(self, file_path: str, revision: Optional[str] = None) -> Optional[str]:
+        """
+        读取待审查文件内容
+        
+        Args:
+            file_path: 文件路径
+            revision: 提交哈希，指定时通过 cat-file 管道读取该版本内容，否则读取工作区文件
+            
+        Returns:
+            文件内容，文件不存在时返回None
+        """
+        if revision:
+            return self.git_analyzer.read_file_at(revision, file_path)
+        
+        full_path = os.path.join(self.repo_path, file_path)
+        if not os.path.exists(full_path):
+            return None
+        
+        with open(full_path, 'rb') as f:
+            return self.git_analyzer._decode(f.read())
+    
     def _perform_single_review(self, 
                               code: str, 
                               language: str, 
                               review_type: str,
-                              file_path: str) -> Dict[str, Any]:
-        """执行单项审查"""
+                              file_path: str,
+                              diff_mode: bool = False) -> Dict[str, Any]:
+        """执行单项审查 (diff_mode 为 True 时 code 为变更片段摘录)"""
         
         # 生成对应的提示词
-        if review_type == 'code_review':
+        if diff_mode:
+            prompt = self.prompt_builder.build_diff_review_prompt(
+                excerpt=code,
+                language=language,
+                file_path=file_path,
+                review_type=review_type
+            )
+        elif review_type == 'code_review':
             prompt = self.prompt_builder.build_review_prompt(
                 code=code,
                 language=language,
@@ -232,7 +571,9 @@ class SmartCodeReviewer:
                                 prefix: str, 
                                 commits: List, 
                                 review_results: Dict,
-                                successful_reviews: int) -> Dict[str, Any]:
+                                successful_reviews: int,
+                                duplicate_commits: Optional[Dict[str, List[str]]] = None,
+                                commit_reviews: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """生成综合报告摘要"""
         
         # 统计审查结果
@@ -240,28 +581,35 @@ class SmartCodeReviewer:
         high_priority_issues = 0
         language_stats = {}
         
+        review_entries = []
         for file_path, file_result in review_results.items():
             if 'error' in file_result:
                 continue
             
             language = file_result.get('language', 'unknown')
             language_stats[language] = language_stats.get(language, 0) + 1
+            review_entries.extend(file_result.get('reviews', {}).values())
+        
+        # 提交级审查意见每个提交只统计一次 (文件结果中只有引用)
+        for commit_result in (commit_reviews or {}).values():
+            review_entries.extend(commit_result['reviews'].values())
+        
+        # 简单的问题统计（基于关键词）
+        for review_data in review_entries:
+            if 'error' in review_data:
+                continue
             
-            # 简单的问题统计（基于关键词）
-            for review_type, review_data in file_result.get('reviews', {}).items():
-                if 'error' in review_data:
-                    continue
-                
-                response = review_data.get('ai_response', '').lower()
-                if any(keyword in response for keyword in ['错误', 'bug', '问题', '风险', '漏洞']):
-                    total_issues += 1
-                
-                if any(keyword in response for keyword in ['严重', '高风险', '紧急', '重要']):
-                    high_priority_issues += 1
+            response = review_data.get('ai_response', '').lower()
+            if any(keyword in response for keyword in ['错误', 'bug', '问题', '风险', '漏洞']):
+                total_issues += 1
+            
+            if any(keyword in response for keyword in ['严重', '高风险', '紧急', '重要']):
+                high_priority_issues += 1
         
         return {
             'prefix': prefix,
             'total_commits': len(commits),
+            'duplicate_commits': sum(len(hashes) for hashes in (duplicate_commits or {}).values()),
             'files_reviewed': successful_reviews,
             'total_issues_found': total_issues,
             'high_priority_issues': high_priority_issues,
@@ -279,40 +627,25 @@ class SmartCodeReviewer:
         
         # 获取最近的提交
         try:
-            command = ['log', '--oneline', '--pretty=format:%H|%an|%ae|%ad|%s', 
-                      '--date=iso', f'--since={since}']
-            
-            if author:
-                command.extend(['--author', author])
+            # 单次 git log 同时取得最近10个提交及其修改的文件
+            commits = self.git_analyzer.get_commits(since=since, max_count=10, author=author)
             
-            output = self.git_analyzer._run_git_command(command)
-            
-            if not output:
+            if not commits:
                 return {'message': '未找到最近的提交记录'}
             
             # 获取修改的文件
             recent_files = set()
-            commit_count = 0
             
-            for line in output.split('\n')[:10]:  # 限制最近10个提交
-                if not line.strip():
-                    continue
-                
-                commit_hash = line.split('|')[0]
-                
-                # 获取该提交修改的文件
-                files_output = self.git_analyzer._run_git_command([
-                    'show', '--name-only', '--format=', commit_hash
-                ])
-                
-                for file_path in files_output.split('\n'):
-                    if file_path.strip() and self._is_code_file(file_path.strip()):
-                        recent_files.add(file_path.strip())
-                
-                commit_count += 1
+            for commit in commits:
+                for file_path in commit.files_changed:
+                    if self._is_code_file(file_path):
+                        recent_files.add(file_path)
             
-            # 对文件进行审查
-            return self._review_files_list(list(recent_files), f"最近{days}天的变更")
+            # 对文件进行审查 (按最近一次修改它的提交版本读取)
+            file_revisions = self._resolve_file_revisions(commits, list(recent_files))
+            return self._review_files_list(
+                list(recent_files), f"最近{days}天的变更", file_revisions
+            )
             
         except Exception as e:
             return {'error': f'获取最近变更失败: {e}'}
@@ -327,22 +660,27 @@ class SmartCodeReviewer:
         extension = os.path.splitext(file_path)[1].lower()
         return extension in code_extensions
     
-    def _review_files_list(self, files: List[str], context: str) -> Dict[str, Any]:
-        """审查指定的文件列表"""
+    def _review_files_list(self, files: List[str], context: str,
+                           file_revisions: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        审查指定的文件列表
+        
+        Args:
+            files: 文件路径列表
+            context: 审查上下文描述
+            file_revisions: 文件到提交哈希的映射，未指定的文件读取工作区内容
+        """
         print(f"📂 开始审查 {len(files)} 个文件 - {context}")
         
         review_results = {}
         successful_reviews = 0
+        file_revisions = file_revisions or {}
         
         for file_path in files:
-            full_path = os.path.join(self.repo_path, file_path)
-            
-            if not os.path.exists(full_path):
-                continue
-            
             try:
-                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+                content = self._read_file_content(file_path, file_revisions.get(file_path))
+                if content is None:
+                    continue
                 
                 if len(content.strip()) < 50:  # 跳过太短的文件
                     continue
@@ -599,11 +937,20 @@ def main():
             result = reviewer.review_by_commit_prefix(prefix, since)
             print(f"审查完成，文件数: {result.get('files_reviewed', 0)}")
             reviewer.export_review_report(result)
+        elif sys.argv[1] == 'range' and len(sys.argv) > 2:
+            range_spec = sys.argv[2]
+            review_mode = sys.argv[3] if len(sys.argv) > 3 else "file"
+            
+            reviewer = SmartCodeReviewer()
+            result = reviewer.review_range(range_spec, review_mode=review_mode)
+            print(f"审查完成，文件数: {result.get('files_reviewed', 0)}")
+            reviewer.export_review_report(result)
         else:
             print("使用方法:")
             print("  python ai_code_reviewer.py demo        - 运行演示")
             print("  python ai_code_reviewer.py interactive - 交互式模式")
             print("  python ai_code_reviewer.py prefix <前缀> [时间] - 按前缀审查")
+            print("  python ai_code_reviewer.py range <base..head> [file|diff|net|commit] - 按提交范围审查")
     else:
         # 默认交互式模式
         interactive_review_menu()
@@ -308,6 +308,58 @@ class CodeReviewPromptBuilder:
         
         return self.prompt_manager.get_prompt(review_type, **prompt_kwargs)
     
+    def build_diff_review_prompt(self,
+                                 excerpt: str,
+                                 language: str,
+                                 file_path: str,
+                                 review_type: str = "code_review") -> str:
+        """
+        构建变更片段审查提示词
+        
+        只包含变更所在的函数/类及上下文，行首为行号，'+' 为新增行，'-' 为删除行
+        """
+        code = (
+            f"文件: {file_path} (仅包含变更所在的函数/类及上下文；"
+            f"行号后 '+' 表示新增行，'-' 表示被删除的行)\n{excerpt}"
+        )
+        
+        if review_type == "code_review":
+            return self.build_review_prompt(
+                code=code,
+                language=language,
+                focus_areas=[
+                    f"文件 {file_path} 中本次变更的正确性",
+                    "变更与周围代码的一致性",
+                    "可读性和可维护性",
+                    "潜在的改进机会"
+                ]
+            )
+        
+        return self.prompt_manager.get_prompt(review_type, code=code, language=language)
+    
+    def build_commit_review_prompt(self,
+                                   patch: str,
+                                   commit_message: str,
+                                   files: List[str],
+                                   review_type: str = "code_review") -> str:
+        """构建整个提交的补丁审查提示词 (一次审查提交涉及的全部文件)"""
+        files_text = "\n".join(f"- {file_path}" for file_path in files)
+        code = f"提交说明: {commit_message}\n涉及文件:\n{files_text}\n\n{patch}"
+        
+        if review_type == "code_review":
+            return self.build_review_prompt(
+                code=code,
+                language="diff",
+                focus_areas=[
+                    "本次提交整体改动的正确性",
+                    "各文件改动之间的一致性",
+                    "可读性和可维护性",
+                    "潜在的改进机会 (请注明对应的文件)"
+                ]
+            )
+        
+        return self.prompt_manager.get_prompt(review_type, code=code, language="diff")
+    
     def build_multi_file_review_prompt(self, 
                                      files: Dict[str, str], 
                                      language: str,
@@ -329,6 +381,12 @@ class CodeReviewPromptBuilder:
 
 
 # 便捷函数
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的token数 (ASCII约4字符/token，中文等非ASCII字符约1字符/token)"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
 def create_code_review_prompt(code: str, 
                             language: str, 
                             focus_areas: Optional[List[str]] = None) -> str:
@@ -0,0 +1,814 @@
+#!/usr/bin/env python3
+"""
+代码依赖分析模块
+
+为Git分析器提供精确、可缓存的依赖发现：
+- DependencyCache: 按 blob 对象ID持久化缓存提取出的导入语句
+- PythonImportResolver: 基于 ast 的Python导入提取，支持相对导入与多个包根目录
+- JSImportResolver: JS/TS 模块解析，支持 tsconfig paths/baseUrl、index 文件与 package.json exports
+- JavaImportResolver: 基于 package 声明的Java类索引 (按提交持久化，从该提交的 blob 解析)，支持多模块、通配符与静态导入
+- RevisionSource: 某个提交的文件树 (路径 -> blob)，解析器从中读取源码
+- DependencyGraph: 仓库级正向/反向依赖图，支持有界的多层展开
+"""
+
+import ast
+import json
+import os
+import posixpath
+import re
+import sqlite3
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blob_imports (
+    language TEXT NOT NULL,
+    blob TEXT NOT NULL,
+    imports TEXT NOT NULL,
+    PRIMARY KEY (language, blob)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    name TEXT PRIMARY KEY,
+    head TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+
+# 匹配 import/export ... from、副作用 import、require() 与动态 import() 中的模块说明符
+_JS_IMPORT_PATTERN = re.compile(
+    r'''(?:\bimport\s+(?:type\s+)?(?:[\w*{}\s,$]+?\s+from\s+)?|\bexport\s+(?:type\s+)?[\w*{}\s,$]+?\s+from\s+)'''
+    r'''['"]([^'"\n]+)['"]'''
+    r'''|\b(?:require|import)\s*\(\s*['"]([^'"\n]+)['"]\s*\)'''
+)
+_JS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/|(?<!:)//[^\n]*', re.DOTALL)
+_JSON_COMMENT_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|/\*.*?\*/|//[^\n]*', re.DOTALL)
+_JSON_TRAILING_COMMA_PATTERN = re.compile(r',(\s*[}\]])')
+
+_JAVA_COMMENT_PATTERN = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|/\*.*?\*/|//[^\n]*', re.DOTALL)
+_JAVA_STRING_PATTERN = re.compile(r'"(?:\\.|[^"\\\n])*"')
+_JAVA_PACKAGE_PATTERN = re.compile(r'^\s*package\s+([\w.]+)\s*;', re.MULTILINE)
+_JAVA_IMPORT_PATTERN = re.compile(r'^\s*import\s+(static\s+)?([\w.]+(?:\s*\.\s*\*)?)\s*;', re.MULTILINE)
+_JAVA_TYPE_NAME_PATTERN = re.compile(r'\b[A-Z]\w*\b')
+
+# 模块解析时依次尝试的扩展名与目录入口文件
+_JS_EXTENSIONS = ('.ts', '.tsx', '.d.ts', '.js', '.jsx', '.mjs', '.cjs')
+_JS_INDEX_FILES = tuple(f'/index{ext}' for ext in _JS_EXTENSIONS)
+# package.json exports 中按优先级选用的条件
+_PACKAGE_EXPORT_CONDITIONS = ('types', 'import', 'module', 'require', 'default')
+
+
+def _parse_jsonc(content: Optional[str]) -> Optional[dict]:
+    """解析允许注释和尾随逗号的JSON内容 (tsconfig 格式)，失败时返回 None"""
+    if content is None:
+        return None
+    try:
+        content = _JSON_COMMENT_PATTERN.sub(
+            lambda m: m.group(0) if m.group(0).startswith('"') else '', content
+        )
+        data = json.loads(_JSON_TRAILING_COMMA_PATTERN.sub(r'\1', content))
+        return data if isinstance(data, dict) else None
+    except ValueError:
+        return None
+
+
+def _join_repo_path(*parts: str) -> Optional[str]:
+    """拼接并规范化仓库内的相对路径，超出仓库根目录时返回 None"""
+    path = posixpath.normpath(posixpath.join(*[part for part in parts if part]))
+    if path == '.':
+        return ''
+    if path.startswith('../') or path == '..' or path.startswith('/'):
+        return None
+    return path
+
+
+class RevisionSource:
+    """
+    某个提交的文件树
+    
+    路径到 blob 对象ID的映射来自一次 git ls-tree，文件内容按需读取。
+    由于内容与提交一一对应，解析结果可以按 blob 缓存、按提交持久化。
+    """
+    
+    def __init__(self, revision: Optional[str], blobs: Dict[str, str],
+                 reader: Callable[[str], Optional[str]]):
+        """
+        Args:
+            revision: 提交哈希，空仓库为 None
+            blobs: 文件路径 -> blob 对象ID
+            reader: 读取该提交中文件内容的函数，文件不存在时返回 None
+        """
+        self.revision = revision
+        self.blobs = blobs
+        self.files: Set[str] = set(blobs)
+        self._reader = reader
+    
+    def read(self, file_path: str) -> Optional[str]:
+        """读取文件在该提交中的内容"""
+        if file_path not in self.blobs:
+            return None
+        return self._reader(file_path)
+
+
+class DependencyCache:
+    """
+    导入语句的持久化缓存
+    
+    以 (语言, blob 对象ID) 为键，内容相同的文件 (跨提交、跨路径) 只读取和解析一次。
+    整个表在首次使用时一次性载入内存。
+    """
+    
+    def __init__(self, cache_path: str):
+        """
+        打开 (必要时创建) 缓存数据库
+        
+        Args:
+            cache_path: SQLite 数据库路径
+        """
+        self.cache_path = cache_path
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path)
+        self._conn.executescript(_SCHEMA)
+        self._blob_entries: Optional[Dict[Tuple[str, str], list]] = None
+        self._pending_blobs: List[Tuple[str, str, str]] = []
+    
+    def get_blob_imports(self, language: str, source: RevisionSource, file_path: str,
+                         extractor: Callable[[str], list]) -> Optional[list]:
+        """
+        获取某个提交中文件的导入语句，按 blob 对象ID缓存 (内容相同即命中，与路径和提交无关)
+        
+        Args:
+            language: 语言标识 (作为缓存命名空间)
+            source: 文件所在提交的文件树
+            file_path: 相对仓库根目录的路径
+            extractor: 接收文件内容、返回可JSON序列化导入列表的函数
+        
+        Returns:
+            导入列表，文件不在该提交中时返回 None
+        """
+        blob = source.blobs.get(file_path)
+        if blob is None:
+            return None
+        
+        if self._blob_entries is None:
+            self._blob_entries = {
+                (cached_language, cached_blob): json.loads(imports)
+                for cached_language, cached_blob, imports in self._conn.execute(
+                    'SELECT language, blob, imports FROM blob_imports'
+                )
+            }
+        
+        key = (language, blob)
+        if key in self._blob_entries:
+            return self._blob_entries[key]
+        
+        content = source.read(file_path)
+        imports = extractor(content) if content is not None else []
+        self._blob_entries[key] = imports
+        self._pending_blobs.append((language, blob, json.dumps(imports)))
+        return imports
+    
+    def load_snapshot(self, name: str, head: str) -> Optional[dict]:
+        """
+        读取按 HEAD 保存的快照
+        
+        Args:
+            name: 快照名称
+            head: 当前 HEAD 提交哈希
+        
+        Returns:
+            快照数据，不存在或 HEAD 不一致时返回 None
+        """
+        row = self._conn.execute(
+            'SELECT head, data FROM snapshots WHERE name = ?', (name,)
+        ).fetchone()
+        if row is None or row[0] != head:
+            return None
+        return json.loads(row[1])
+    
+    def save_snapshot(self, name: str, head: str, data: dict):
+        """保存按 HEAD 的快照 (覆盖旧快照)"""
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)', (name, head, json.dumps(data))
+            )
+    
+    def flush(self):
+        """将新提取的结果写入数据库"""
+        if not self._pending_blobs:
+            return
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO blob_imports VALUES (?, ?, ?)', self._pending_blobs
+            )
+        self._pending_blobs = []
+    
+    def close(self):
+        """写入未保存的结果并关闭数据库"""
+        self.flush()
+        self._conn.close()
+
+
+class PythonImportResolver:
+    """基于 ast 的Python导入解析器"""
+    
+    def __init__(self, source: RevisionSource, cache: DependencyCache):
+        """
+        初始化解析器
+        
+        Args:
+            source: 解析所依据的提交文件树 (文件集合用于解析模块，无需访问文件系统)
+            cache: 导入语句缓存
+        """
+        self.source = source
+        self.repo_files = source.files
+        self.cache = cache
+        self.source_roots = self._find_source_roots()
+    
+    def _find_source_roots(self) -> List[str]:
+        """
+        查找包根目录: 仓库根目录，以及所有顶层包 (自身不在包内的含 __init__.py 目录) 的父目录，
+        从而支持 src/ 布局和多项目仓库。
+        """
+        package_dirs = {
+            os.path.dirname(path) for path in self.repo_files
+            if os.path.basename(path) == '__init__.py'
+        }
+        roots = {''}
+        for package_dir in package_dirs:
+            parent = os.path.dirname(package_dir)
+            if parent not in package_dirs:
+                roots.add(parent)
+        return sorted(roots, key=lambda root: (root != '', root))
+    
+    @staticmethod
+    def extract_imports(source: str) -> List[List]:
+        """
+        提取源码中的全部导入语句 (不受字符串与注释中 'import' 字样的干扰)
+        
+        Returns:
+            [模块名, 相对层级, 导入名称列表] 组成的列表
+        """
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError):
+            return []
+        
+        imports = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    imports.append([alias.name, 0, []])
+            elif isinstance(node, ast.ImportFrom):
+                imports.append([node.module or '', node.level, [alias.name for alias in node.names]])
+        return imports
+    
+    def _module_file(self, module_path: str) -> Optional[str]:
+        """将 'a/b' 形式的模块路径解析为仓库中的文件"""
+        for candidate in (f"{module_path}.py", f"{module_path}/__init__.py"):
+            if candidate in self.repo_files:
+                return candidate
+        return None
+    
+    def _resolve_module(self, module: str, level: int, file_path: str) -> Optional[str]:
+        """解析单个模块名 (支持相对导入)"""
+        module_parts = module.split('.') if module else []
+        
+        if level:
+            # 相对导入: 从当前文件所在的包向上回溯 level-1 层
+            package_parts = os.path.dirname(file_path).split('/') if os.path.dirname(file_path) else []
+            if level - 1 > len(package_parts):
+                return None
+            base_parts = package_parts[:len(package_parts) - (level - 1)]
+            if not base_parts and not module_parts:
+                return None
+            return self._module_file('/'.join(base_parts + module_parts))
+        
+        for root in self.source_roots:
+            module_path = '/'.join(([root] if root else []) + module_parts)
+            resolved = self._module_file(module_path)
+            if resolved:
+                return resolved
+        return None
+    
+    def resolve(self, file_path: str) -> Set[str]:
+        """
+        查找Python文件依赖的仓库内文件
+        
+        Args:
+            file_path: 相对仓库根目录的文件路径
+        
+        Returns:
+            依赖文件集合
+        """
+        imports = self.cache.get_blob_imports('python', self.source, file_path, self.extract_imports)
+        if imports is None:
+            return set()
+        
+        dependencies = set()
+        for module, level, names in imports:
+            # 'from pkg import name' 中 name 可能是子模块，也可能是 pkg 中的属性
+            submodule_names = [name for name in names if name != '*']
+            needs_module = not submodule_names
+            for name in submodule_names:
+                resolved = self._resolve_module(f"{module}.{name}" if module else name, level, file_path)
+                if resolved:
+                    dependencies.add(resolved)
+                else:
+                    needs_module = True
+            
+            if needs_module:
+                resolved = self._resolve_module(module, level, file_path)
+                if resolved:
+                    dependencies.add(resolved)
+        
+        dependencies.discard(file_path)
+        return dependencies
+
+
+class JSImportResolver:
+    """
+    JavaScript/TypeScript 模块解析器
+    
+    tsconfig/jsconfig 与 package.json 元数据只加载一次；候选文件在内存中的
+    仓库文件集合里查找，解析别名、扩展名和 index 文件时不产生文件系统调用。
+    """
+    
+    def __init__(self, source: RevisionSource, cache: DependencyCache):
+        """
+        初始化解析器
+        
+        Args:
+            source: 解析所依据的提交文件树 (配置文件同样从该提交读取)
+            cache: 导入语句缓存
+        """
+        self.source = source
+        self.repo_files = source.files
+        self.cache = cache
+        self._ts_configs: Dict[str, Tuple[Optional[str], List[Tuple[str, List[str]]]]] = {}
+        self._config_dirs = self._load_ts_configs()
+        self._packages = self._load_packages()
+        self._config_for_dir: Dict[str, Optional[str]] = {}
+    
+    def _load_ts_configs(self) -> List[str]:
+        """加载仓库中所有 tsconfig.json / jsconfig.json 的 baseUrl 与 paths"""
+        for config_file in sorted(self.repo_files):
+            if posixpath.basename(config_file) not in ('tsconfig.json', 'jsconfig.json'):
+                continue
+            config_dir = posixpath.dirname(config_file)
+            if config_dir in self._ts_configs:
+                continue
+            options = self._read_compiler_options(config_file, set())
+            
+            base_url = options.get('baseUrl')
+            base_dir = _join_repo_path(config_dir, base_url) if isinstance(base_url, str) else None
+            paths = options.get('paths') if isinstance(options.get('paths'), dict) else {}
+            # TypeScript 4.1 起 paths 可不配合 baseUrl 使用，此时相对配置文件目录解析
+            paths_dir = base_dir if base_dir is not None else config_dir
+            
+            aliases = []
+            for pattern, targets in paths.items():
+                if isinstance(targets, str):
+                    targets = [targets]
+                resolved_targets = [
+                    target for target in (_join_repo_path(paths_dir, t) for t in targets if isinstance(t, str))
+                    if target is not None
+                ]
+                aliases.append((pattern, resolved_targets))
+            # 最长前缀优先，与 TypeScript 的匹配规则一致
+            aliases.sort(key=lambda item: len(item[0].split('*')[0]), reverse=True)
+            
+            self._ts_configs[config_dir] = (base_dir, aliases)
+        
+        return sorted(self._ts_configs, key=len, reverse=True)
+    
+    def _read_compiler_options(self, config_file: str, seen: Set[str]) -> dict:
+        """读取 compilerOptions，合并 extends 链上的仓库内配置 (路径相对各自配置文件)"""
+        if config_file in seen:
+            return {}
+        seen.add(config_file)
+        
+        data = _parse_jsonc(self.source.read(config_file)) or {}
+        config_dir = posixpath.dirname(config_file)
+        options: dict = {}
+        
+        extends = data.get('extends')
+        if isinstance(extends, str) and extends.startswith('.'):
+            parent = _join_repo_path(config_dir, extends)
+            if parent is not None and not parent.endswith('.json'):
+                parent += '.json'
+            if parent in self.repo_files:
+                parent_options = self._read_compiler_options(parent, seen)
+                parent_dir = posixpath.dirname(parent)
+                # 继承来的 baseUrl 仍相对于声明它的配置文件
+                if isinstance(parent_options.get('baseUrl'), str):
+                    parent_options['baseUrl'] = posixpath.relpath(
+                        posixpath.join(parent_dir or '.', parent_options['baseUrl']),
+                        config_dir or '.'
+                    )
+                options.update(parent_options)
+        
+        compiler_options = data.get('compilerOptions')
+        if isinstance(compiler_options, dict):
+            options.update(compiler_options)
+        return options
+    
+    def _load_packages(self) -> Dict[str, Tuple[str, dict]]:
+        """加载仓库内 (monorepo 工作区) 各 package.json: 包名 -> (目录, 元数据)"""
+        packages = {}
+        for package_file in sorted(self.repo_files):
+            if posixpath.basename(package_file) != 'package.json' or '/node_modules/' in f'/{package_file}':
+                continue
+            data = _parse_jsonc(self.source.read(package_file))
+            if data and isinstance(data.get('name'), str):
+                packages.setdefault(data['name'], (posixpath.dirname(package_file), data))
+        return packages
+    
+    def _nearest_config(self, directory: str) -> Optional[str]:
+        """查找离目录最近的 tsconfig/jsconfig 所在目录"""
+        if directory not in self._config_for_dir:
+            found = None
+            for config_dir in self._config_dirs:
+                if not config_dir or directory == config_dir or directory.startswith(config_dir + '/'):
+                    found = config_dir
+                    break
+            self._config_for_dir[directory] = found
+        return self._config_for_dir[directory]
+    
+    @staticmethod
+    def extract_imports(source: str) -> List[str]:
+        """
+        提取源码中的模块说明符 (忽略注释)
+        
+        Returns:
+            模块说明符列表
+        """
+        source = _JS_COMMENT_PATTERN.sub('', source)
+        specifiers = []
+        for static_spec, call_spec in _JS_IMPORT_PATTERN.findall(source):
+            specifier = static_spec or call_spec
+            if specifier not in specifiers:
+                specifiers.append(specifier)
+        return specifiers
+    
+    def _resolve_file(self, base: str) -> Optional[str]:
+        """按 原路径 / 补全扩展名 / 目录 index 文件 的顺序解析模块文件"""
+        if base in self.repo_files:
+            return base
+        for ext in _JS_EXTENSIONS:
+            if base + ext in self.repo_files:
+                return base + ext
+        # TypeScript ESM 写法: import './a.js' 实际对应 a.ts
+        stem, ext = posixpath.splitext(base)
+        if ext in ('.js', '.jsx', '.mjs', '.cjs'):
+            for ts_ext in ('.ts', '.tsx', '.mts', '.cts'):
+                if stem + ts_ext in self.repo_files:
+                    return stem + ts_ext
+        for index_file in _JS_INDEX_FILES:
+            if base + index_file in self.repo_files:
+                return base + index_file
+        return None
+    
+    def _resolve_alias(self, specifier: str, aliases: List[Tuple[str, List[str]]]) -> Optional[str]:
+        """按 tsconfig paths 解析别名"""
+        for pattern, targets in aliases:
+            if '*' in pattern:
+                prefix, suffix = pattern.split('*', 1)
+                if not (specifier.startswith(prefix) and specifier.endswith(suffix)
+                        and len(specifier) >= len(prefix) + len(suffix)):
+                    continue
+                wildcard = specifier[len(prefix):len(specifier) - len(suffix)]
+            elif specifier == pattern:
+                wildcard = ''
+            else:
+                continue
+            
+            for target in targets:
+                resolved = self._resolve_file(target.replace('*', wildcard))
+                if resolved:
+                    return resolved
+        return None
+    
+    @staticmethod
+    def _select_export(entry) -> Optional[str]:
+        """从 exports 条目中按条件优先级选出目标路径"""
+        if isinstance(entry, str):
+            return entry
+        if isinstance(entry, list):
+            for item in entry:
+                selected = JSImportResolver._select_export(item)
+                if selected:
+                    return selected
+        if isinstance(entry, dict):
+            for condition in _PACKAGE_EXPORT_CONDITIONS:
+                if condition in entry:
+                    selected = JSImportResolver._select_export(entry[condition])
+                    if selected:
+                        return selected
+        return None
+    
+    def _resolve_package(self, specifier: str) -> Optional[str]:
+        """解析指向仓库内工作区包的裸模块说明符 (支持 exports / module / main)"""
+        parts = specifier.split('/')
+        name_length = 2 if specifier.startswith('@') else 1
+        name = '/'.join(parts[:name_length])
+        if name not in self._packages:
+            return None
+        
+        package_dir, metadata = self._packages[name]
+        subpath = '/'.join(parts[name_length:])
+        exports = metadata.get('exports')
+        
+        if exports is not None:
+            if isinstance(exports, dict) and any(key.startswith('.') for key in exports):
+                export_key = f'./{subpath}' if subpath else '.'
+                target = None
+                if export_key in exports:
+                    target = self._select_export(exports[export_key])
+                else:
+                    for key, entry in exports.items():
+                        if '*' in key:
+                            prefix, suffix = key.split('*', 1)
+                            if export_key.startswith(prefix) and export_key.endswith(suffix):
+                                wildcard = export_key[len(prefix):len(export_key) - len(suffix)]
+                                selected = self._select_export(entry)
+                                target = selected.replace('*', wildcard) if selected else None
+                                break
+            else:
+                target = self._select_export(exports) if not subpath else None
+            if target:
+                resolved_target = _join_repo_path(package_dir, target)
+                resolved = self._resolve_file(resolved_target) if resolved_target is not None else None
+                if resolved:
+                    return resolved
+        
+        if subpath:
+            return self._resolve_file(_join_repo_path(package_dir, subpath) or '')
+        
+        for field_name in ('types', 'module', 'main'):
+            entry = metadata.get(field_name)
+            if isinstance(entry, str):
+                resolved_entry = _join_repo_path(package_dir, entry)
+                resolved = self._resolve_file(resolved_entry) if resolved_entry is not None else None
+                if resolved:
+                    return resolved
+        return self._resolve_file(_join_repo_path(package_dir, 'index') or 'index')
+    
+    def _resolve_specifier(self, specifier: str, file_path: str) -> Optional[str]:
+        """解析单个模块说明符"""
+        file_dir = posixpath.dirname(file_path)
+        
+        if specifier.startswith('.'):
+            base = _join_repo_path(file_dir, specifier)
+            return self._resolve_file(base) if base else None
+        if specifier.startswith('/'):
+            return None
+        
+        config_dir = self._nearest_config(file_dir)
+        if config_dir is not None:
+            base_dir, aliases = self._ts_configs[config_dir]
+            resolved = self._resolve_alias(specifier, aliases)
+            if resolved:
+                return resolved
+            if base_dir is not None:
+                base = _join_repo_path(base_dir, specifier)
+                resolved = self._resolve_file(base) if base is not None else None
+                if resolved:
+                    return resolved
+        
+        return self._resolve_package(specifier)
+    
+    def resolve(self, file_path: str) -> Set[str]:
+        """
+        查找JavaScript/TypeScript文件依赖的仓库内文件
+        
+        Args:
+            file_path: 相对仓库根目录的文件路径
+        
+        Returns:
+            依赖文件集合
+        """
+        specifiers = self.cache.get_blob_imports('js', self.source, file_path, self.extract_imports)
+        if specifiers is None:
+            return set()
+        
+        dependencies = set()
+        for specifier in specifiers:
+            resolved = self._resolve_specifier(specifier.split('?')[0], file_path)
+            if resolved:
+                dependencies.add(resolved)
+        
+        dependencies.discard(file_path)
+        return dependencies
+
+
+class JavaImportResolver:
+    """
+    Java 依赖解析器
+    
+    依据各文件的 package 声明建立 '全限定类名 -> 文件' 索引 (与源码根目录、
+    Maven/Gradle 多模块布局无关)；之后每个导入都是一次字典查找。
+    源码从指定提交的 blob 读取，因此包索引可以按该提交持久化，不受工作区未提交修改的影响。
+    支持单类型导入、通配符导入、静态导入以及同包内按类名的引用。
+    """
+    
+    def __init__(self, source: RevisionSource, cache: DependencyCache):
+        """
+        初始化解析器
+        
+        Args:
+            source: 解析所依据的提交文件树
+            cache: 导入语句缓存 (同时保存按提交持久化的包索引)
+        """
+        self.source = source
+        self.repo_files = source.files
+        self.cache = cache
+        self._classes: Optional[Dict[str, List[str]]] = None
+        self._packages: Dict[str, List[str]] = {}
+    
+    @staticmethod
+    def extract_imports(source: str) -> List:
+        """
+        提取 package 声明、导入语句和引用到的类型名
+        
+        Returns:
+            [包名, [[导入名, 是否静态, 是否通配符], ...], 大写开头的标识符列表]
+        """
+        source = _JAVA_COMMENT_PATTERN.sub(
+            lambda m: m.group(0) if m.group(0)[0] in '"\'' else ' ', source
+        )
+        package_match = _JAVA_PACKAGE_PATTERN.search(source)
+        imports = [
+            [name.replace(' ', ''), bool(static), name.rstrip().endswith('*')]
+            for static, name in _JAVA_IMPORT_PATTERN.findall(source)
+        ]
+        # 同包类无需 import，按出现的类型名匹配
+        code = _JAVA_STRING_PATTERN.sub('""', source)
+        identifiers = sorted(set(_JAVA_TYPE_NAME_PATTERN.findall(code)))
+        return [package_match.group(1) if package_match else '', imports, identifiers]
+    
+    def _parse(self, file_path: str) -> Optional[List]:
+        return self.cache.get_blob_imports('java', self.source, file_path, self.extract_imports)
+    
+    def _build_index(self):
+        """建立 (或从按提交的快照加载) 包名索引"""
+        java_files = sorted(path for path in self.repo_files if path.endswith('.java'))
+        revision = self.source.revision
+        
+        file_packages = self.cache.load_snapshot('java_packages', revision) if revision else None
+        if file_packages is None or set(file_packages) != set(java_files):
+            file_packages = {file_path: self._parse(file_path)[0] for file_path in java_files}
+            if revision:
+                self.cache.save_snapshot('java_packages', revision, file_packages)
+        
+        classes: Dict[str, List[str]] = {}
+        packages: Dict[str, List[str]] = {}
+        for file_path, package in sorted(file_packages.items()):
+            class_name = posixpath.splitext(posixpath.basename(file_path))[0]
+            qualified_name = f"{package}.{class_name}" if package else class_name
+            classes.setdefault(qualified_name, []).append(file_path)
+            packages.setdefault(package, []).append(file_path)
+        
+        self._classes = classes
+        self._packages = packages
+    
+    @staticmethod
+    def _closest(candidates: List[str], file_path: str) -> str:
+        """同名类存在于多个模块时，选择与引用方路径公共前缀最长的文件"""
+        if len(candidates) == 1:
+            return candidates[0]
+        return max(candidates, key=lambda candidate: len(posixpath.commonpath([candidate, file_path])))
+    
+    def _resolve_class(self, name: str, file_path: str) -> Optional[str]:
+        """解析全限定类名，依次去掉末尾部分以支持内部类和静态成员"""
+        parts = name.split('.')
+        while parts:
+            candidates = self._classes.get('.'.join(parts))
+            if candidates:
+                return self._closest(candidates, file_path)
+            parts.pop()
+        return None
+    
+    def resolve(self, file_path: str) -> Set[str]:
+        """
+        查找Java文件依赖的仓库内文件
+        
+        Args:
+            file_path: 相对仓库根目录的文件路径
+        
+        Returns:
+            依赖文件集合
+        """
+        if self._classes is None:
+            self._build_index()
+        
+        parsed = self._parse(file_path)
+        if parsed is None:
+            return set()
+        package, imports, identifiers = parsed
+        dependencies = set()
+        
+        for name, is_static, is_wildcard in imports:
+            target = name[:-2] if is_wildcard else name
+            if is_wildcard and not is_static and target in self._packages:
+                dependencies.update(self._packages[target])
+                continue
+            resolved = self._resolve_class(target, file_path)
+            if resolved:
+                dependencies.add(resolved)
+        
+        identifier_set = set(identifiers)
+        for same_package_file in self._packages.get(package, []):
+            class_name = posixpath.splitext(posixpath.basename(same_package_file))[0]
+            if class_name in identifier_set:
+                dependencies.add(same_package_file)
+        
+        dependencies.discard(file_path)
+        return dependencies
+
+
+class DependencyGraph:
+    """
+    仓库级的文件依赖图
+    
+    正向边 (文件 -> 其导入的文件) 按需解析并记忆；反向边 (文件 -> 导入它的文件)
+    在首次需要时扫描全部源文件一次性构建。配合 DependencyCache，重复构建时
+    内容未变的文件 (blob 相同) 不再读取。
+    """
+    
+    DIRECTIONS = ('forward', 'reverse', 'both')
+    
+    def __init__(self, source_files: Set[str], resolver: Callable[[str], Set[str]]):
+        """
+        初始化依赖图
+        
+        Args:
+            source_files: 参与依赖分析的源文件集合
+            resolver: 解析单个文件正向依赖的函数
+        """
+        self.source_files = source_files
+        self._resolver = resolver
+        self._forward: Dict[str, Set[str]] = {}
+        self._reverse: Optional[Dict[str, Set[str]]] = None
+    
+    def dependencies_of(self, file_path: str) -> Set[str]:
+        """获取文件直接导入的文件"""
+        if file_path not in self._forward:
+            if file_path in self.source_files:
+                self._forward[file_path] = self._resolver(file_path)
+            else:
+                self._forward[file_path] = set()
+        return self._forward[file_path]
+    
+    def dependents_of(self, file_path: str) -> Set[str]:
+        """获取直接导入该文件的文件"""
+        if self._reverse is None:
+            reverse: Dict[str, Set[str]] = {}
+            for source in sorted(self.source_files):
+                for target in self.dependencies_of(source):
+                    reverse.setdefault(target, set()).add(source)
+            self._reverse = reverse
+        return self._reverse.get(file_path, set())
+    
+    def expand(self, files: Set[str], depth: int = 1, direction: str = 'forward',
+               max_files: Optional[int] = None) -> Tuple[Set[str], bool]:
+        """
+        从给定文件出发按层展开依赖 (有界传递闭包)
+        
+        Args:
+            files: 起始文件集合
+            depth: 展开层数，1 表示只取直接依赖
+            direction: 'forward' (被导入的文件)、'reverse' (导入方) 或 'both'
+            max_files: 展开文件数量上限，防止核心模块被大量导入时审查范围爆炸
+        
+        Returns:
+            (新增的相关文件集合 (不含起始文件), 是否因达到上限而截断)
+        """
+        if direction not in self.DIRECTIONS:
+            raise ValueError(f"不支持的依赖方向: {direction} (可选: {', '.join(self.DIRECTIONS)})")
+        
+        visited = set(files)
+        related: Set[str] = set()
+        frontier = sorted(files)
+        
+        for _ in range(max(depth, 0)):
+            next_frontier = []
+            for file_path in frontier:
+                neighbors: Set[str] = set()
+                if direction in ('forward', 'both'):
+                    neighbors |= self.dependencies_of(file_path)
+                if direction in ('reverse', 'both'):
+                    neighbors |= self.dependents_of(file_path)
+                
+                for neighbor in sorted(neighbors - visited):
+                    if max_files is not None and len(related) >= max_files:
+                        return related, True
+                    visited.add(neighbor)
+                    related.add(neighbor)
+                    next_frontier.append(neighbor)
+            
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        
+        return related, False
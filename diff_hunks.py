@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+差异片段 (diff hunk) 提取与扩展模块
+
+将提交的统一差异格式解析为片段，并把每个片段扩展到所在函数/类的边界，
+生成只包含变更区域的审查摘录，替代整文件审查：
+- parse_unified_diff: 解析 git 输出的统一差异
+- build_review_excerpt: 扩展片段并渲染为带行号与增删标记的摘录
+"""
+
+import ast
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+
+_HUNK_HEADER_PATTERN = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+_OCTAL_ESCAPE_PATTERN = re.compile(r'\\([0-7]{3}|.)')
+_C_ESCAPES = {'n': '\n', 't': '\t', '"': '"', '\\': '\\', 'a': '\a', 'b': '\b',
+              'f': '\f', 'r': '\r', 'v': '\v'}
+
+# 花括号语言中视为函数/类声明的行 (排除控制语句)
+_DECLARATION_KEYWORDS = re.compile(
+    r'\b(class|interface|enum|struct|record|trait|impl|object|function|func|fn|def|namespace)\b'
+)
+_CONTROL_KEYWORDS = re.compile(
+    r'^\s*(\}\s*)?(if|else|for|foreach|while|do|switch|case|catch|try|finally|synchronized|return|with)\b'
+)
+_CALLABLE_SIGNATURE = re.compile(r'\w[\w<>\[\],.?\s]*\([^;]*\)\s*(?:[:\w<>\[\],.?\s]*|=>\s*)?\{?\s*$')
+
+
+@dataclass
+class DiffHunk:
+    """统一差异中的一个片段"""
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    lines: List[str] = field(default_factory=list)  # 带 ' ' / '+' / '-' 前缀的原始行
+    
+    @property
+    def new_range(self) -> Tuple[int, int]:
+        """片段在新版本文件中覆盖的行范围 (纯删除时为删除位置前后的两行)"""
+        if self.new_count:
+            return self.new_start, self.new_start + self.new_count - 1
+        return max(self.new_start, 1), self.new_start + 1
+
+
+def _unquote_path(path: str) -> str:
+    """还原 git 对特殊字符路径的 C 风格引号转义"""
+    if not (path.startswith('"') and path.endswith('"')):
+        return path
+    
+    def replace(match):
+        escape = match.group(1)
+        if len(escape) == 3:
+            return chr(int(escape, 8))
+        return _C_ESCAPES.get(escape, escape)
+    
+    # 八进制转义对应 UTF-8 字节，先按 latin-1 还原字节再解码
+    raw = _OCTAL_ESCAPE_PATTERN.sub(replace, path[1:-1])
+    return raw.encode('latin-1', errors='ignore').decode('utf-8', errors='replace')
+
+
+def parse_unified_diff(diff_text: str) -> Dict[str, List[DiffHunk]]:
+    """
+    解析统一差异输出
+    
+    Args:
+        diff_text: git diff / git show 的补丁输出 (需使用 a/ b/ 前缀)
+    
+    Returns:
+        新路径到片段列表的映射 (已删除文件与二进制文件不包含在内)
+    """
+    files: Dict[str, List[DiffHunk]] = {}
+    current_path: Optional[str] = None
+    hunk: Optional[DiffHunk] = None
+    old_left = new_left = 0
+    
+    for line in diff_text.split('\n'):
+        # 片段内容按行数计数消费，避免把以 '---' 开头的删除行误认为文件头
+        if hunk is not None and (old_left > 0 or new_left > 0):
+            tag = line[:1]
+            if tag == ' ' or (tag == '' and line == ''):
+                old_left -= 1
+                new_left -= 1
+                line = line or ' '
+            elif tag == '-':
+                old_left -= 1
+            elif tag == '+':
+                new_left -= 1
+            elif tag != '\\':
+                hunk = None
+            if hunk is not None:
+                hunk.lines.append(line)
+                continue
+        
+        if line.startswith('diff --git '):
+            current_path = None
+            hunk = None
+        elif line.startswith('+++ '):
+            path = _unquote_path(line[4:].rstrip('\t'))
+            current_path = path[2:] if path.startswith('b/') else None
+        elif line.startswith('@@') and current_path is not None:
+            match = _HUNK_HEADER_PATTERN.match(line)
+            if not match:
+                continue
+            old_start, old_count, new_start, new_count = match.groups()
+            hunk = DiffHunk(
+                old_start=int(old_start),
+                old_count=int(old_count) if old_count is not None else 1,
+                new_start=int(new_start),
+                new_count=int(new_count) if new_count is not None else 1
+            )
+            old_left, new_left = hunk.old_count, hunk.new_count
+            files.setdefault(current_path, []).append(hunk)
+    
+    return files
+
+
+def _line_markers(hunks: List[DiffHunk]) -> Tuple[Set[int], Dict[int, List[str]]]:
+    """计算新版本中的新增行号，以及每个行号之前被删除的行"""
+    added: Set[int] = set()
+    removed_before: Dict[int, List[str]] = {}
+    
+    for hunk in hunks:
+        line_no = hunk.new_start if hunk.new_count else hunk.new_start + 1
+        for line in hunk.lines:
+            tag, text = line[:1], line[1:]
+            if tag == ' ':
+                line_no += 1
+            elif tag == '+':
+                added.add(line_no)
+                line_no += 1
+            elif tag == '-':
+                removed_before.setdefault(line_no, []).append(text)
+    
+    return added, removed_before
+
+
+def _python_blocks(content: str) -> Optional[List[Tuple[int, int]]]:
+    """用 ast 获取Python文件中所有函数/类的行范围 (含装饰器)"""
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+    
+    blocks = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            end = getattr(node, 'end_lineno', None)
+            if end is not None:
+                blocks.append((start, end))
+    return blocks
+
+
+def _is_declaration(lines: List[str], index: int) -> bool:
+    """判断开括号所在行是否为函数/类声明 (开括号独占一行时看上一行)"""
+    stripped = lines[index].strip()
+    if stripped.startswith('{') and index > 0:
+        stripped = lines[index - 1].strip()
+    if not stripped or _CONTROL_KEYWORDS.match(stripped):
+        return False
+    return bool(_DECLARATION_KEYWORDS.search(stripped) or _CALLABLE_SIGNATURE.search(stripped))
+
+
+def _brace_block(lines: List[str], start: int, end: int) -> Optional[Tuple[int, int]]:
+    """花括号语言的启发式: 向上寻找包含变更的最内层函数/类声明块，再向下匹配闭括号"""
+    depth = 0
+    for index in range(start - 1, -1, -1):
+        line = lines[index]
+        # 从行尾向行首扫描，保证同一行内括号的相对顺序
+        for char in reversed(line):
+            if char == '}':
+                depth += 1
+            elif char == '{':
+                if depth == 0:
+                    if _is_declaration(lines, index):
+                        block = _match_closing_brace(lines, index, end)
+                        if block:
+                            return block
+                else:
+                    depth -= 1
+    return None
+
+
+def _match_closing_brace(lines: List[str], open_index: int, end: int) -> Optional[Tuple[int, int]]:
+    """从声明行向下匹配闭括号，块未覆盖到 end 行时返回 None"""
+    depth = 0
+    for index in range(open_index, len(lines)):
+        depth += lines[index].count('{') - lines[index].count('}')
+        if depth <= 0:
+            if index + 1 < end:
+                return None
+            # 声明行上方的注解/装饰器行一并纳入
+            block_start = open_index
+            while block_start > 0 and lines[block_start - 1].strip().startswith('@'):
+                block_start -= 1
+            return block_start + 1, index + 1
+    return None
+
+
+def _indent_block(lines: List[str], start: int, end: int) -> Optional[Tuple[int, int]]:
+    """按缩进的启发式: 找到缩进小于变更行的最近声明行，块延伸到缩进回落为止"""
+    def indent_of(text: str) -> int:
+        return len(text) - len(text.lstrip())
+    
+    changed = [lines[i] for i in range(start - 1, min(end, len(lines))) if lines[i].strip()]
+    if not changed:
+        return None
+    base_indent = min(indent_of(text) for text in changed)
+    
+    for index in range(start - 2, -1, -1):
+        text = lines[index]
+        if text.strip() and indent_of(text) < base_indent and _DECLARATION_KEYWORDS.search(text):
+            header_indent = indent_of(text)
+            block_end = index + 1
+            for follow in range(index + 1, len(lines)):
+                if lines[follow].strip():
+                    if indent_of(lines[follow]) <= header_indent:
+                        break
+                    block_end = follow + 1
+            return index + 1, max(block_end, end)
+    return None
+
+
+def _enclosing_block(lines: List[str], language: str, start: int, end: int,
+                     python_blocks: Optional[List[Tuple[int, int]]]) -> Optional[Tuple[int, int]]:
+    """查找包含 [start, end] 的最内层函数/类"""
+    if python_blocks is not None:
+        containing = [block for block in python_blocks if block[0] <= start and block[1] >= end]
+        return min(containing, key=lambda block: block[1] - block[0]) if containing else None
+    if language in ('python', 'yaml', 'ruby'):
+        return _indent_block(lines, start, end)
+    return _brace_block(lines, start, end)
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def expand_hunk_ranges(content: str, hunks: List[DiffHunk], language: str,
+                       context_lines: int = 3, max_block_lines: int = 200) -> List[Tuple[int, int]]:
+    """
+    将片段扩展到所在函数/类的边界
+    
+    Args:
+        content: 新版本文件内容
+        hunks: 该文件的差异片段
+        language: 编程语言
+        context_lines: 上下文行数 (块外或块过大时使用，也追加在块的两端)
+        max_block_lines: 所在块超过该行数时不扩展到整个块，只保留上下文
+    
+    Returns:
+        合并后的行范围列表 (1 起始，闭区间)
+    """
+    lines = content.splitlines()
+    line_count = len(lines)
+    if not line_count:
+        return []
+    
+    python_blocks = _python_blocks(content) if language == 'python' else None
+    ranges = []
+    
+    for hunk in hunks:
+        start, end = hunk.new_range
+        start, end = min(max(start, 1), line_count), min(max(end, 1), line_count)
+        
+        block = _enclosing_block(lines, language, start, end, python_blocks)
+        if block and block[1] - block[0] + 1 <= max_block_lines:
+            start, end = block
+        
+        ranges.append((max(start - context_lines, 1), min(end + context_lines, line_count)))
+    
+    return _merge_ranges(ranges)
+
+
+def build_review_excerpt(content: str, hunks: List[DiffHunk], language: str,
+                         context_lines: int = 3, max_block_lines: int = 200) -> str:
+    """
+    生成审查摘录: 扩展后的区域带行号，新增行标记 '+'，被删除的行以 '-' 插入原位置
+    
+    Args:
+        content: 新版本文件内容
+        hunks: 该文件的差异片段
+        language: 编程语言
+        context_lines: 上下文行数
+        max_block_lines: 函数/类扩展的最大行数
+    
+    Returns:
+        摘录文本，没有可展示的片段时返回空字符串
+    """
+    lines = content.splitlines()
+    added, removed_before = _line_markers(hunks)
+    output = []
+    
+    for start, end in expand_hunk_ranges(content, hunks, language, context_lines, max_block_lines):
+        output.append(f"@@ 第 {start}-{end} 行 @@")
+        for line_no in range(start, end + 2):
+            for removed in removed_before.get(line_no, []):
+                output.append(f"{'':>6} - {removed}")
+            if line_no <= end:
+                marker = '+' if line_no in added else ' '
+                output.append(f"{line_no:>6} {marker} {lines[line_no - 1]}")
+    
+    # 文件末尾的删除
+    if not lines:
+        for removed in removed_before.get(1, []):
+            output.append(f"{'':>6} - {removed}")
+    
+    return '\n'.join(output)
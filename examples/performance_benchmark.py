@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+⏱️ 智能代码审查系统 - 性能基准测试
+
+本文件提供Git分析模块关键路径的性能基准，包括：
+- 多前缀匹配: 编译后的前缀树 vs 逐前缀 startswith 循环
+- 提交记录内存: __slots__ 记录 + 字符串驻留 + 整数时间戳 vs 普通 dataclass
+- Git后端: 命令行 (subprocess) vs 进程内 (pygit2) 的提交遍历、文件变更与文件读取
+- 后端一致性: 进程内 (pygit2) 后端的提交、文件变更与文件内容是否与命令行后端一致
+- 分片遍历: 1/2/4/... 个时间分片 (进程) 遍历同一时间窗口的耗时与加速比，并检查结果与单次遍历一致
+
+基准使用合成数据或只读访问仓库 (Git后端、后端一致性与分片遍历默认使用本项目仓库，可通过
+环境变量 BENCHMARK_REPO 指定，分片遍历的时间窗口由 BENCHMARK_SINCE 指定，
+默认 '1 year ago')，不需要AI配置，也不会修改任何仓库。
+"""
+
+import sys
+import os
+import random
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+
+# 添加父目录到路径，以便导入主模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diff_hunks import parse_unified_diff
+from git_commit_analyzer import GitAnalyzer, GitCommit, GitFileChange, PrefixMatcher
+
+
+def _time_it(func, repeat: int = 3) -> float:
+    """多次运行取最短耗时 (秒)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _legacy_prefix_match(messages, prefixes):
+    """逐提交、逐前缀 startswith 的原始匹配循环 (作为对照组)"""
+    normalized_prefixes = {prefix.rstrip(': ').lower(): prefix for prefix in prefixes}
+    results = []
+    
+    for message in messages:
+        normalized_message = message.lower().strip()
+        matched_prefixes = []
+        for norm_prefix, original_prefix in normalized_prefixes.items():
+            prefix_matches = normalized_message.startswith(norm_prefix)
+            
+            if not prefix_matches and len(norm_prefix) > 10:
+                key_parts = norm_prefix.split()[:2]
+                if len(key_parts) >= 2:
+                    key_prefix = ' '.join(key_parts)
+                    prefix_matches = normalized_message.startswith(key_prefix)
+            
+            if prefix_matches:
+                matched_prefixes.append(original_prefix)
+        results.append(matched_prefixes)
+    
+    return results
+
+
+def benchmark_prefix_matcher(commit_count: int = 100000, prefix_count: int = 40):
+    """多前缀匹配基准: 前缀树 vs 原始循环"""
+    
+    print(f"\n🏷️ 多前缀匹配: {commit_count} 条提交 × {prefix_count} 个前缀")
+    
+    rng = random.Random(42)
+    prefixes = [f"PROJ-{i}:" for i in range(prefix_count - 2)]
+    prefixes += ["需求描述：WPS鸿蒙版（OH）弹窗管理开发", "feat: "]
+    
+    subjects = ["fix: 修复空指针", "feat: 新增导出功能", "chore: 升级依赖", "refactor 模块拆分"]
+    messages = []
+    for _ in range(commit_count):
+        roll = rng.random()
+        if roll < 0.3:
+            messages.append(f"PROJ-{rng.randrange(prefix_count * 2)}: 调整逻辑")
+        elif roll < 0.35:
+            messages.append("需求描述：WPS鸿蒙版（OH）好评弹窗")
+        else:
+            messages.append(rng.choice(subjects))
+    
+    matcher = PrefixMatcher(prefixes)
+    
+    legacy_results = _legacy_prefix_match(messages, prefixes)
+    trie_results = [matcher.match(message) for message in messages]
+    assert legacy_results == trie_results, "前缀树匹配结果与原始循环不一致"
+    
+    legacy_time = _time_it(lambda: _legacy_prefix_match(messages, prefixes))
+    trie_time = _time_it(lambda: [matcher.match(message) for message in messages])
+    
+    matched = sum(1 for result in trie_results if result)
+    print(f"   匹配提交数: {matched}")
+    print(f"   原始循环:   {legacy_time * 1000:.1f} ms")
+    print(f"   前缀树:     {trie_time * 1000:.1f} ms")
+    print(f"   加速比:     {legacy_time / trie_time:.1f}x")
+
+
+@dataclass
+class _LegacyFileChange:
+    """原始的 dataclass 文件变更记录 (作为对照组)"""
+    file_path: str
+    change_type: str
+    additions: int
+    deletions: int
+    old_path: Optional[str] = None
+
+
+@dataclass
+class _LegacyCommit:
+    """原始的 dataclass 提交记录 (作为对照组)"""
+    hash: str
+    author: str
+    email: str
+    date: datetime
+    message: str
+    files_changed: List[str]
+    additions: int
+    deletions: int
+    file_changes: List[_LegacyFileChange] = field(default_factory=list)
+    committed_at: int = 0
+
+
+def _build_commits(commit_class, change_class, commit_count: int, files_per_commit: int):
+    """按解析器的方式构造提交: 每条记录的作者、路径都是新切分出的字符串对象"""
+    rng = random.Random(7)
+    commits = []
+    for i in range(commit_count):
+        author_id = rng.randrange(200)
+        record = f"{i:040x}\x00dev{author_id}\x00dev{author_id}@example.com\x00feat: change {i}"
+        commit_hash, author, email, message = record.split('\x00')
+        changes = [
+            change_class(f"src/module{rng.randrange(300)}/file{rng.randrange(40)}.py", 'M', 3, 1)
+            for _ in range(files_per_commit)
+        ]
+        if commit_class is _LegacyCommit:
+            # 原始实现为每个提交解析出独立的 datetime 对象
+            time_fields = {'date': datetime.fromtimestamp(1704067200 + i, timezone.utc)}
+        else:
+            time_fields = {'authored_at': 1704067200 + i, 'author_tz': 0}
+        commits.append(commit_class(
+            hash=commit_hash, author=author, email=email, message=message, **time_fields,
+            files_changed=[change.file_path for change in changes],
+            additions=3 * files_per_commit, deletions=files_per_commit,
+            file_changes=changes, committed_at=1704067200 + i
+        ))
+    return commits
+
+
+def _measure_memory(build) -> int:
+    """返回构造结果存活时占用的内存 (字节)"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def benchmark_commit_memory(commit_count: int = 100000, files_per_commit: int = 4):
+    """提交记录内存基准: __slots__ + 驻留字符串 + 元组 + 整数时间戳 vs dataclass + 列表 + datetime"""
+    
+    print(f"\n🧠 提交记录内存: {commit_count} 个提交 × {files_per_commit} 个文件")
+    
+    legacy_bytes = _measure_memory(
+        lambda: _build_commits(_LegacyCommit, _LegacyFileChange, commit_count, files_per_commit)
+    )
+    compact_bytes = _measure_memory(
+        lambda: _build_commits(GitCommit, GitFileChange, commit_count, files_per_commit)
+    )
+    
+    print(f"   dataclass:  {legacy_bytes / 1024 / 1024:.1f} MB")
+    print(f"   __slots__:  {compact_bytes / 1024 / 1024:.1f} MB")
+    print(f"   内存降低:   {(1 - compact_bytes / legacy_bytes) * 100:.0f}%")
+
+
+def _backend_workload(analyzer: GitAnalyzer, commit_count: int, blob_count: int):
+    """同一组操作: 遍历提交 (含文件变更)、补齐文件变更、读取文件"""
+    commits = list(analyzer.iter_commits(max_count=commit_count))
+    hashes = [commit.hash for commit in commits]
+    analyzer.backend.get_commits_changes(hashes)
+    
+    reads = 0
+    for commit in commits:
+        for file_path in commit.files_changed:
+            if reads >= blob_count:
+                return len(commits), reads
+            analyzer.read_file_at(commit.hash, file_path)
+            reads += 1
+    return len(commits), reads
+
+
+def benchmark_git_backends(commit_count: int = 2000, blob_count: int = 500):
+    """Git后端基准: 在同一仓库上比较命令行与进程内后端"""
+    
+    repo_path = os.environ.get('BENCHMARK_REPO') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"\n🔌 Git后端: {repo_path} (最多 {commit_count} 个提交, {blob_count} 次文件读取)")
+    
+    timings = {}
+    for backend in ('subprocess', 'pygit2'):
+        try:
+            analyzer = GitAnalyzer(repo_path, backend=backend)
+            analyzer.backend
+        except ImportError as e:
+            print(f"   {backend:<11} 跳过: {e}")
+            continue
+        
+        with analyzer:
+            # 每轮使用新的读取器缓存，避免命中上一轮的结果
+            def run():
+                analyzer.close()
+                return _backend_workload(analyzer, commit_count, blob_count)
+            
+            commits, reads = run()
+            timings[backend] = _time_it(run)
+        print(f"   {backend:<11} {timings[backend] * 1000:.1f} ms ({commits} 个提交, {reads} 次读取)")
+    
+    if len(timings) == 2:
+        print(f"   加速比:     {timings['subprocess'] / timings['pygit2']:.1f}x")
+
+
+def _patch_lines(patch: str):
+    """
+    补丁中每个文件净删除/净新增的行
+    
+    两种实现的哈希缩写长度与差异块对齐方式可能不同 (都是合法的差异)，
+    因此只比较抵消同一行删除后又新增之后的行集合。
+    """
+    result = {}
+    for file_path, hunks in parse_unified_diff(patch).items():
+        lines = [line for hunk in hunks for line in hunk.lines]
+        removed = Counter(line[1:] for line in lines if line.startswith('-'))
+        added = Counter(line[1:] for line in lines if line.startswith('+'))
+        result[file_path] = (sorted((removed - added).elements()), sorted((added - removed).elements()))
+    return result
+
+
+def check_backend_equivalence(commit_count: int = 500) -> bool:
+    """后端一致性检查: 进程内后端的结果必须与命令行后端一致 (未安装 pygit2 时跳过)"""
+    
+    repo_path = os.environ.get('BENCHMARK_REPO') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"\n🧪 后端一致性: {repo_path} (最多 {commit_count} 个提交)")
+    
+    try:
+        import pygit2  # noqa: F401
+    except ImportError:
+        print("   跳过: 未安装 pygit2")
+        return True
+    
+    results = {}
+    for backend in ('subprocess', 'pygit2'):
+        with GitAnalyzer(repo_path, backend=backend) as analyzer:
+            commits = list(analyzer.iter_commits(max_count=commit_count))
+            hashes = [commit.hash for commit in commits]
+            changes = analyzer.backend.get_commits_changes(hashes)
+            base, head = (hashes[-1], hashes[0]) if hashes else ('HEAD', 'HEAD')
+            blobs = {path: analyzer.read_file_at(head, path)
+                     for commit in commits[:20] for path in commit.files_changed}
+            results[backend] = {
+                '提交顺序': hashes,
+                '提交信息': [(c.author, c.email, c.authored_at, c.author_tz, c.committed_at, c.message) for c in commits],
+                '提交文件变更': [list(commit.file_changes) for commit in commits],
+                '批量文件变更': {commit_hash: list(items) for commit_hash, items in changes.items()},
+                '区间文件变更': list(analyzer.backend.diff_changes(base, head)),
+                '区间差异行': _patch_lines(analyzer.backend.diff_patch(base, head)),
+                '文件内容': blobs,
+            }
+    
+    mismatches = [key for key in results['subprocess'] if results['subprocess'][key] != results['pygit2'][key]]
+    for key in mismatches:
+        print(f"   ❌ {key} 不一致")
+    if not mismatches:
+        print(f"   ✅ {len(results['subprocess']['提交顺序'])} 个提交的结果一致")
+    return not mismatches
+
+
+def benchmark_history_shards(since: Optional[str] = None, max_shards: int = 0) -> bool:
+    """分片遍历基准: 同一时间窗口按不同分片数遍历历史，观察随CPU核数的扩展"""
+    
+    repo_path = os.environ.get('BENCHMARK_REPO') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    since = since or os.environ.get('BENCHMARK_SINCE', '1 year ago')
+    cpu_count = os.cpu_count() or 1
+    max_shards = max_shards or max(cpu_count, 2)
+    print(f"\n🧩 分片遍历: {repo_path} (since={since}, {cpu_count} 个CPU核)")
+    if cpu_count == 1:
+        print("   ℹ️  只有1个CPU核，分片在同一个工作进程中依次执行，无法体现并行加速")
+    
+    shard_counts = [1]
+    while shard_counts[-1] * 2 <= max_shards:
+        shard_counts.append(shard_counts[-1] * 2)
+    
+    timings = {}
+    baseline = None
+    consistent = True
+    for shards in shard_counts:
+        with GitAnalyzer(repo_path, history_shards=shards) as analyzer:
+            commits = [(commit.hash, commit.file_changes) for commit in analyzer.get_commits(since=since)]
+            timings[shards] = _time_it(lambda: analyzer.get_commits(since=since))
+        if baseline is None:
+            baseline = commits
+        elif commits != baseline:
+            print(f"   ❌ {shards} 个分片的结果与单次遍历不一致")
+            consistent = False
+        speedup = timings[1] / timings[shards]
+        print(f"   {shards:>2} 个分片  {timings[shards] * 1000:.1f} ms ({len(commits)} 个提交, 加速比 {speedup:.1f}x)")
+    return consistent
+
+
+BENCHMARKS = {
+    'prefix': benchmark_prefix_matcher,
+    'memory': benchmark_commit_memory,
+    'backend': benchmark_git_backends,
+    'equivalence': check_backend_equivalence,
+    'shards': benchmark_history_shards,
+}
+
+
+def main():
+    """命令行入口: python performance_benchmark.py [基准名称...]"""
+    
+    print("⏱️ 智能代码审查系统 - 性能基准测试")
+    print("=" * 40)
+    
+    names = sys.argv[1:] or list(BENCHMARKS)
+    failed = False
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ 未知的基准: {name} (可选: {', '.join(BENCHMARKS)})")
+            continue
+        # 检查类条目返回 False 表示结果不一致
+        if BENCHMARKS[name]() is False:
+            failed = True
+    
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
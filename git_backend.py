@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Git访问后端
+
+GitAnalyzer 的提交遍历、树差异与文件读取通过后端接口完成：
+- SubprocessBackend: 默认后端，调用 git 命令行 (git log / git diff / cat-file 管道)
+- Pygit2Backend: 基于 libgit2 的进程内后端，直接读取对象库，不启动子进程
+
+进程内后端需要安装 pygit2 (pip install pygit2)。补丁文本、patch-id 等其余操作
+仍由 git 命令行完成。
+"""
+
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Optional, Set, TYPE_CHECKING
+
+from git_commit_analyzer import GitCommit, GitFileChange, _EMPTY_TREE
+
+if TYPE_CHECKING:
+    from git_commit_analyzer import GitAnalyzer
+
+
+class GitBackend(ABC):
+    """Git访问后端接口"""
+    
+    name = 'base'
+    
+    @abstractmethod
+    def resolve_revision(self, revision: str) -> str:
+        """将版本标识解析为提交哈希，无法解析时抛出 RuntimeError"""
+    
+    @abstractmethod
+    def read_blob(self, revision: str, path: str) -> Optional[str]:
+        """读取指定版本的文件内容，文件不存在时返回None"""
+    
+    @abstractmethod
+    def iter_commits(self, revisions: Optional[List[str]] = None,
+                     since: Optional[str] = None,
+                     until: Optional[str] = None,
+                     author: Optional[str] = None,
+                     message_filter: Optional[Callable[[str], bool]] = None,
+                     grep_patterns: Optional[List[str]] = None) -> Iterator[GitCommit]:
+        """
+        按 git log 顺序 (最新在前) 遍历提交
+        
+        Args:
+            revisions: 起点与 '^排除' 修订；未指定时为HEAD (分析器启用 all_refs 时为所有引用)
+            since: 开始时间
+            until: 结束时间
+            author: 作者正则，匹配 'name <email>'
+            message_filter: 提交标题过滤函数，未通过的提交不计算文件变更
+            grep_patterns: 与 message_filter 等价或更宽松的 ERE 模式 (后端可用于预过滤)
+        
+        Returns:
+            带文件变更的提交迭代器 (遵循分析器的路径范围与合并提交策略)
+        """
+    
+    @abstractmethod
+    def get_commits_changes(self, commit_hashes: List[str]) -> Dict[str, List[GitFileChange]]:
+        """批量获取提交的文件变更，键为传入的修订"""
+    
+    @abstractmethod
+    def diff_changes(self, base: str, head: str) -> List[GitFileChange]:
+        """两个修订之间的文件变更 (遵循分析器的路径范围)"""
+    
+    @abstractmethod
+    def diff_patch(self, base: str, head: str, paths: Optional[List[str]] = None) -> str:
+        """两个修订之间不含上下文行的统一差异 (a/ b/ 前缀，检测重命名)"""
+    
+    def close(self):
+        """释放后端资源"""
+
+
+class SubprocessBackend(GitBackend):
+    """默认后端: 复用 GitAnalyzer 中基于 git 命令行的实现"""
+    
+    name = 'subprocess'
+    
+    def __init__(self, analyzer: 'GitAnalyzer'):
+        self.analyzer = analyzer
+    
+    def resolve_revision(self, revision: str) -> str:
+        return self.analyzer._run_git_command(['rev-parse', '--verify', f'{revision}^{{commit}}'])
+    
+    def read_blob(self, revision: str, path: str) -> Optional[str]:
+        return self.analyzer.blob_reader.read(revision, path)
+    
+    def iter_commits(self, revisions: Optional[List[str]] = None,
+                     since: Optional[str] = None,
+                     until: Optional[str] = None,
+                     author: Optional[str] = None,
+                     message_filter: Optional[Callable[[str], bool]] = None,
+                     grep_patterns: Optional[List[str]] = None) -> Iterator[GitCommit]:
+        analyzer = self.analyzer
+        log_args = list(revisions or [])
+        if analyzer.all_refs and not revisions:
+            log_args.append('--all')
+        if author:
+            log_args.extend(['--author', author])
+        elif analyzer.grep_pushdown and grep_patterns:
+            # -i 同时作用于 --author，因此只在没有作者过滤时下推
+            log_args.extend(['-E', '-i'])
+            log_args.extend(f'--grep={pattern}' for pattern in grep_patterns)
+        if analyzer.history_shards > 1 and since:
+            return analyzer._iter_sharded_log_commits(since, until, log_args, message_filter)
+        return analyzer._iter_log_commits(analyzer._build_log_args(since, until) + log_args, message_filter)
+    
+    def get_commits_changes(self, commit_hashes: List[str]) -> Dict[str, List[GitFileChange]]:
+        return self.analyzer._get_commits_changes_batch(commit_hashes)
+    
+    def diff_changes(self, base: str, head: str) -> List[GitFileChange]:
+        analyzer = self.analyzer
+        return analyzer._parse_raw_numstat(analyzer._run_git_bytes([
+            'diff', '-z', '--raw', '--numstat', '--no-ext-diff', base, head
+        ] + analyzer._pathspec_args()))
+    
+    def diff_patch(self, base: str, head: str, paths: Optional[List[str]] = None) -> str:
+        analyzer = self.analyzer
+        command = ['diff', '-U0', '-M', '--no-color', '--no-ext-diff', '--src-prefix=a/', '--dst-prefix=b/',
+                   base, head]
+        command += ['--'] + list(paths) if paths else analyzer._pathspec_args()
+        # 保留原始补丁的结尾换行与空白上下文行 (_run_git_command 会去除首尾空白)
+        return analyzer._decode(analyzer._run_git_bytes(command))
+
+
+class Pygit2Backend(GitBackend):
+    """
+    基于 pygit2 (libgit2) 的进程内后端
+    
+    提交遍历、树差异与文件读取都在进程内完成。与命令行后端的差异:
+    - 路径范围按字面目录前缀匹配，不支持通配符等 pathspec 魔术
+    - since 按提交者时间排序遍历，遇到早于下限的提交即停止 (与 git log 的截断方式一致)
+    - grep 预过滤不适用，消息过滤全部在 Python 侧完成
+    - history_shards 不适用，遍历始终在当前进程内完成
+    - since/until 等时间表达式仍交给 git rev-parse 解析 (每次查询一次)
+    - 重命名检测使用 libgit2 的相似度算法，极小文件的相似度评分可能与 git 不同
+    """
+    
+    name = 'pygit2'
+    
+    def __init__(self, analyzer: 'GitAnalyzer'):
+        try:
+            import pygit2
+        except ImportError:
+            raise ImportError("进程内Git后端需要安装 pygit2: pip install pygit2")
+        
+        self._pygit2 = pygit2
+        self.analyzer = analyzer
+        self._repo = pygit2.Repository(analyzer.repo_path)
+        # 按时间排序且保证子提交先于父提交 (提交时间相同时与 git log 的顺序一致)；
+        # 新版 pygit2 将常量移入 enums.SortMode
+        if hasattr(pygit2, 'GIT_SORT_TIME'):
+            self._sort = pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_TIME
+        else:
+            self._sort = pygit2.enums.SortMode.TOPOLOGICAL | pygit2.enums.SortMode.TIME
+    
+    def _commit(self, revision: str):
+        """解析修订为提交对象"""
+        try:
+            return self._repo.revparse_single(revision).peel(self._pygit2.Commit)
+        except (KeyError, ValueError, self._pygit2.GitError) as e:
+            raise RuntimeError(f"无法解析修订 {revision}: {e}")
+    
+    def _tree(self, revision: str):
+        """修订对应的树对象，空树返回None"""
+        if revision == _EMPTY_TREE:
+            return None
+        return self._commit(revision).tree
+    
+    def resolve_revision(self, revision: str) -> str:
+        return str(self._commit(revision).id)
+    
+    def read_blob(self, revision: str, path: str) -> Optional[str]:
+        try:
+            entry = self._commit(revision).tree[path]
+        except (KeyError, RuntimeError):
+            return None
+        blob = self._repo[entry.id]
+        if not isinstance(blob, self._pygit2.Blob):
+            return None
+        return self.analyzer._decode(blob.data)
+    
+    def _in_scope(self, path: str) -> bool:
+        """路径是否在分析器的路径范围内 (字面目录前缀)"""
+        def matches(pathspec: str) -> bool:
+            prefix = pathspec.strip('/')
+            return prefix in ('', '.') or path == prefix or path.startswith(prefix + '/')
+        
+        include_paths = self.analyzer.include_paths
+        if include_paths and not any(matches(pathspec) for pathspec in include_paths):
+            return False
+        return not any(matches(pathspec) for pathspec in self.analyzer.exclude_paths)
+    
+    def _tree_changes(self, old_tree, new_tree) -> List[GitFileChange]:
+        """比较两棵树 (检测重命名)，old_tree 为None时与空树比较"""
+        if old_tree is None:
+            if new_tree is None:
+                return []
+            diff = new_tree.diff_to_tree(swap=True)
+        elif new_tree is None:
+            diff = old_tree.diff_to_tree()
+        else:
+            diff = old_tree.diff_to_tree(new_tree)
+        diff.find_similar()
+        
+        changes = []
+        for patch in diff:
+            delta = patch.delta
+            file_path = delta.new_file.path
+            if not self._in_scope(file_path):
+                continue
+            status = delta.status_char()
+            # 二进制文件与 --numstat 的 '-' 一致记为0
+            _, additions, deletions = (0, 0, 0) if delta.is_binary else patch.line_stats
+            changes.append(GitFileChange(
+                file_path=file_path,
+                change_type=status,
+                additions=additions,
+                deletions=deletions,
+                old_path=delta.old_file.path if status in 'RC' else None
+            ))
+        return changes
+    
+    def _commit_changes(self, commit) -> List[GitFileChange]:
+        """按合并提交策略计算单个提交的文件变更"""
+        parents = commit.parents
+        policy = self.analyzer.merge_policy
+        if len(parents) <= 1 or policy == 'first-parent':
+            return self._tree_changes(parents[0].tree if parents else None, commit.tree)
+        if policy == 'combined':
+            # 只保留与每个父提交都不同的文件，统计相对第一父提交
+            per_parent = [self._tree_changes(parent.tree, commit.tree) for parent in parents]
+            common: Set[str] = set.intersection(*({change.file_path for change in changes}
+                                                  for changes in per_parent))
+            return [change for change in per_parent[0] if change.file_path in common]
+        # 默认策略下合并提交不带文件变更 (与 git log --raw 一致)
+        return []
+    
+    @staticmethod
+    def _subject(commit) -> str:
+        """与 git log 的 %s 一致: 提交消息第一段落合并为一行"""
+        return ' '.join(commit.message.split('\n\n', 1)[0].split())
+    
+    def _to_git_commit(self, commit, file_changes: List[GitFileChange]) -> GitCommit:
+        return GitCommit(
+            hash=str(commit.id),
+            author=commit.author.name,
+            email=commit.author.email,
+            authored_at=commit.author.time,
+            author_tz=commit.author.offset,
+            message=self._subject(commit),
+            files_changed=[change.file_path for change in file_changes],
+            additions=sum(change.additions for change in file_changes),
+            deletions=sum(change.deletions for change in file_changes),
+            file_changes=file_changes,
+            committed_at=commit.commit_time
+        )
+    
+    def _walker(self, revisions: Optional[List[str]]):
+        """按修订列表 (含 '^排除') 创建遍历器，未指定修订时按 all_refs 设置从HEAD或所有引用开始"""
+        include = [revision for revision in revisions or [] if not revision.startswith('^')]
+        exclude = [revision[1:] for revision in revisions or [] if revision.startswith('^')]
+        
+        start_ids = [self._commit(revision).id for revision in include]
+        if not start_ids:
+            start_ids.append(self._commit('HEAD').id)
+        if self.analyzer.all_refs and not revisions:
+            for reference in self._repo.references:
+                try:
+                    start_ids.append(self._repo.lookup_reference(reference).peel(self._pygit2.Commit).id)
+                except (ValueError, self._pygit2.GitError):
+                    continue
+        
+        walker = self._repo.walk(start_ids[0], self._sort)
+        for commit_id in start_ids[1:]:
+            walker.push(commit_id)
+        for revision in exclude:
+            walker.hide(self._commit(revision).id)
+        if self.analyzer.merge_policy == 'first-parent':
+            walker.simplify_first_parent()
+        return walker
+    
+    def iter_commits(self, revisions: Optional[List[str]] = None,
+                     since: Optional[str] = None,
+                     until: Optional[str] = None,
+                     author: Optional[str] = None,
+                     message_filter: Optional[Callable[[str], bool]] = None,
+                     grep_patterns: Optional[List[str]] = None) -> Iterator[GitCommit]:
+        since_ts, until_ts = self.analyzer.resolve_time_bounds(since, until)
+        author_regex = re.compile(author) if author else None
+        skip_merges = self.analyzer.merge_policy == 'no-merges'
+        scoped = self.analyzer.is_path_scoped
+        
+        for commit in self._walker(revisions):
+            if since_ts is not None and commit.commit_time < since_ts:
+                break
+            if until_ts is not None and commit.commit_time > until_ts:
+                continue
+            if skip_merges and len(commit.parent_ids) > 1:
+                continue
+            if author_regex and not author_regex.search(f"{commit.author.name} <{commit.author.email}>"):
+                continue
+            if message_filter is not None and not message_filter(self._subject(commit)):
+                continue
+            
+            file_changes = self._commit_changes(commit)
+            if scoped and not file_changes:
+                continue
+            yield self._to_git_commit(commit, file_changes)
+    
+    def get_commits_changes(self, commit_hashes: List[str]) -> Dict[str, List[GitFileChange]]:
+        changes_info = {}
+        for commit_hash in dict.fromkeys(commit_hashes):
+            try:
+                changes_info[commit_hash] = self._commit_changes(self._commit(commit_hash))
+            except RuntimeError as e:
+                print(f"警告: 获取提交 {commit_hash} 的文件变更失败: {e}")
+                changes_info[commit_hash] = []
+        return changes_info
+    
+    def diff_changes(self, base: str, head: str) -> List[GitFileChange]:
+        return self._tree_changes(self._tree(base), self._tree(head))
+    
+    def diff_patch(self, base: str, head: str, paths: Optional[List[str]] = None) -> str:
+        old_tree, new_tree = self._tree(base), self._tree(head)
+        if old_tree is None:
+            diff = new_tree.diff_to_tree(context_lines=0, swap=True)
+        else:
+            diff = old_tree.diff_to_tree(new_tree, context_lines=0)
+        diff.find_similar()
+        
+        selected = set(paths) if paths else None
+        patches = []
+        for patch in diff:
+            file_path = patch.delta.new_file.path
+            if (file_path in selected) if selected is not None else self._in_scope(file_path):
+                patches.append(patch.text)
+        return ''.join(patches)
+
+
+_BACKENDS = {
+    'subprocess': SubprocessBackend,
+    'pygit2': Pygit2Backend,
+}
+
+
+def create_backend(name: str, analyzer: 'GitAnalyzer') -> GitBackend:
+    """
+    按名称创建后端
+    
+    Args:
+        name: 'subprocess' 或 'pygit2'
+        analyzer: 所属的Git分析器
+    
+    Returns:
+        后端实例
+    """
+    if name not in _BACKENDS:
+        raise ValueError(f"不支持的Git后端: {name} (可选: {', '.join(_BACKENDS)})")
+    return _BACKENDS[name](analyzer)
@@ -1,54 +1,810 @@
+import codecs
 import subprocess
 import os
 import re
-from typing import List, Dict, Set, Optional, Tuple, Any
-from dataclasses import dataclass
-from datetime import datetime
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Dict, Set, Optional, Tuple, Any, Callable, Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from operator import attrgetter
 import json
 
+from diff_hunks import DiffHunk, parse_unified_diff
 
-@dataclass
-class GitCommit:
-    """Git提交信息数据类"""
-    hash: str
-    author: str
-    email: str
-    date: datetime
-    message: str
-    files_changed: List[str]
-    additions: int
-    deletions: int
 
+# 单次 git log 摄取格式: 每条记录以 \x1e 开头，头部字段以 \x00 分隔，
+# 之后紧跟 -z 模式下的 --raw 与 --numstat 输出
+_LOG_RECORD_SEP = '\x1e'
+_LOG_RECORD_SEP_BYTES = _LOG_RECORD_SEP.encode()
+# 作者时间以 --date=raw 输出为 '<Unix时间戳> <时区>'，提交者时间为 %ct 时间戳
+_LOG_FORMAT = '--format=%x1e%H%x00%an%x00%ae%x00%ad%x00%ct%x00%s%x00'
 
-@dataclass
-class GitFileChange:
-    """Git文件变更信息"""
-    file_path: str
-    change_type: str  # A(新增), M(修改), D(删除), R(重命名)
-    additions: int
-    deletions: int
-    old_path: Optional[str] = None  # 重命名时的原路径
+# Git 的空树对象，根提交的净差异以它为基准
+_EMPTY_TREE = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+# 完整的提交哈希 (SHA-1 或 SHA-256)
+_FULL_HASH_RE = re.compile(r'[0-9a-f]{40}(?:[0-9a-f]{24})?')
+
+# 合并提交策略 -> git log 参数
+# first-parent 只沿第一父提交遍历，合并提交按与第一父提交的差异记录 (即整个被合入的分支)；
+# combined 以合并差异 (--cc) 记录合并提交，只保留与每个父提交都不同的文件 (冲突解决的改动)
+_MERGE_POLICY_ARGS = {
+    'default': [],
+    'first-parent': ['--first-parent'],
+    'no-merges': ['--no-merges'],
+    'combined': ['--cc'],
+}
+
+# 默认的工单/需求编号格式 (JIRA 风格，如 'PROJ-123')
+_DEFAULT_TICKET_PATTERNS = [r'\b[A-Z][A-Z0-9_]*-\d+\b']
+
+# 参与依赖分析的源文件扩展名
+_JS_SOURCE_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs')
+_DEPENDENCY_SOURCE_EXTENSIONS = ('.py', '.java') + _JS_SOURCE_EXTENSIONS
+
+
+class _SlotsRecord:
+    """
+    紧凑只读记录的基类
+    
+    字段存放在 __slots__ 中 (实例没有 __dict__)，按字段值实现 repr、比较与哈希；
+    记录创建后不可修改，需要改动时用 _replace() 生成副本。pickle 时按构造参数重建，
+    可在进程间传递。
+    """
+    __slots__ = ()
+    
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def _replace(self, **changes):
+        """返回替换了部分字段的新记录"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 为只读记录，请使用 _replace() 生成修改后的副本")
+    
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} 为只读记录")
+    
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+    
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+    
+    def __hash__(self) -> int:
+        return hash(self._values())
+    
+    def __reduce__(self):
+        return type(self), self._values()
+
+
+class GitFileChange(_SlotsRecord):
+    """Git文件变更信息 (路径字符串经 sys.intern 驻留，同一路径在全部提交间共享一个对象)"""
+    __slots__ = ('file_path', 'change_type', 'additions', 'deletions', 'old_path')
+    
+    def __init__(self, file_path: str, change_type: str, additions: int, deletions: int,
+                 old_path: Optional[str] = None):
+        set_field = object.__setattr__
+        set_field(self, 'file_path', sys.intern(file_path))
+        set_field(self, 'change_type', sys.intern(change_type))  # A(新增), M(修改), D(删除), R(重命名)
+        set_field(self, 'additions', additions)
+        set_field(self, 'deletions', deletions)
+        set_field(self, 'old_path', sys.intern(old_path) if old_path else old_path)  # 重命名时的原路径
+
+
+@lru_cache(maxsize=None)
+def _fixed_timezone(offset_minutes: int) -> timezone:
+    """按分钟偏移复用时区对象"""
+    return timezone(timedelta(minutes=offset_minutes))
+
+
+class GitCommit(_SlotsRecord):
+    """
+    Git提交信息
+    
+    作者、邮箱与路径字符串驻留后在提交间共享，文件列表以元组保存。
+    时间以整数保存: authored_at 为作者时间 (Unix时间戳)，author_tz 为作者时区的分钟偏移；
+    committed_at 为提交者时间，与 git log --since/--until 的过滤口径一致。
+    带时区的 datetime 只在访问 date 时构建。
+    """
+    __slots__ = ('hash', 'author', 'email', 'authored_at', 'author_tz', 'message', 'files_changed',
+                 'additions', 'deletions', 'file_changes', 'committed_at')
+    
+    def __init__(self, hash: str, author: str, email: str, authored_at: int, author_tz: int,
+                 message: str, files_changed: Iterable[str], additions: int, deletions: int,
+                 file_changes: Iterable[GitFileChange] = (), committed_at: int = 0):
+        set_field = object.__setattr__
+        set_field(self, 'hash', hash)
+        set_field(self, 'author', sys.intern(author))
+        set_field(self, 'email', sys.intern(email))
+        set_field(self, 'authored_at', authored_at)
+        set_field(self, 'author_tz', author_tz)
+        set_field(self, 'message', message)
+        set_field(self, 'files_changed', tuple(sys.intern(path) for path in files_changed))
+        set_field(self, 'additions', additions)
+        set_field(self, 'deletions', deletions)
+        set_field(self, 'file_changes', tuple(file_changes))
+        set_field(self, 'committed_at', committed_at)
+    
+    @property
+    def date(self) -> datetime:
+        """作者时间 (带作者时区)"""
+        return datetime.fromtimestamp(self.authored_at, _fixed_timezone(self.author_tz))
+
+
+def _commit_time_range(commits: List[GitCommit]) -> Dict[str, Optional[datetime]]:
+    """在整数作者时间上求最早与最晚提交，只为这两个提交构建 datetime"""
+    if not commits:
+        return {'start': None, 'end': None}
+    by_time = attrgetter('authored_at')
+    return {'start': min(commits, key=by_time).date, 'end': max(commits, key=by_time).date}
+
+
+# POSIX 扩展正则 (git log -E --grep) 中需要转义的字符
+_ERE_SPECIAL_CHARS = set('\\.^$*+?()[]{}|')
+
+
+def _is_case_safe(text: str) -> bool:
+    """
+    文本是否可安全交给 git -i 做大小写无关匹配
+    
+    git 的 -i 只保证 ASCII 字母的大小写折叠；含非ASCII大小写字母时
+    git 可能漏掉 Python str.lower() 能匹配的提交。
+    """
+    return all(char.isascii() or char.lower() == char.upper() for char in text)
+
+
+def escape_grep_literal(text: str) -> str:
+    """将字面文本转义为 POSIX 扩展正则"""
+    return ''.join(f'\\{char}' if char in _ERE_SPECIAL_CHARS else char for char in text)
+
+
+def python_regex_to_grep(pattern: str) -> Optional[str]:
+    """
+    将 Python 正则转换为等价或更宽松的 git -E -i --grep 模式
+    
+    只转换字面字符、基本元字符与转义标点组成的模式；含 \\d、\\w 等字符类、
+    (?...) 扩展语法、惰性量词或匹配空串的模式无法保证不漏匹配，返回None。
+    
+    Returns:
+        git --grep 模式，无法安全下推时返回None
+    """
+    try:
+        if re.search(pattern, '', re.IGNORECASE):
+            # 匹配空串的模式匹配所有提交，下推没有意义
+            return None
+    except re.error:
+        return None
+    
+    if not _is_case_safe(pattern) or '(?' in pattern:
+        return None
+    
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            # 字符类内部的反斜杠在 ERE 中是字面字符；字母数字转义 (\\d, \\b 等) 无对应语法
+            if in_class or i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                return None
+            i += 2
+            continue
+        if in_class:
+            if char == ']':
+                in_class = False
+        elif char == '[':
+            in_class = True
+            # 紧跟在 '[' 或 '[^' 之后的 ']' 是字面字符
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1
+        elif char == '{' and not re.match(r'\{\d+(,\d*)?\}', pattern[i:]):
+            # Python 中不构成量词的 '{' 是字面字符，在 ERE 中则是语法错误
+            return None
+        elif char in '*+?}' and pattern[i + 1:i + 2] == '?':
+            # 惰性量词
+            return None
+        i += 1
+    
+    return pattern
+
+
+class PrefixMatcher:
+    """
+    编译后的多前缀匹配器 (前缀树)
+    
+    所有前缀构建为一棵字符前缀树，每条提交消息只需从头扫描一次即可得到全部
+    匹配的前缀，代价与消息开头的匹配长度相关，而与前缀数量无关。
+    
+    匹配语义与逐前缀 startswith 一致：前缀先移除结尾的冒号和空格并转为小写；
+    长度超过10的前缀额外以其前两个词作为匹配键。
+    """
+    
+    _TERMINAL = None  # 前缀树节点中存放匹配前缀列表的键
+    
+    def __init__(self, prefixes: List[str]):
+        """
+        编译前缀列表
+        
+        Args:
+            prefixes: 原始前缀列表 (标准化后相同的前缀以最后一个为准)
+        """
+        normalized_prefixes = {prefix.rstrip(': ').lower(): prefix for prefix in prefixes}
+        self.prefixes = list(normalized_prefixes.values())
+        self._order = {prefix: i for i, prefix in enumerate(self.prefixes)}
+        self._root: Dict[Any, Any] = {}
+        
+        for norm_prefix, original_prefix in normalized_prefixes.items():
+            for key in self.match_keys(norm_prefix):
+                node = self._root
+                for char in key:
+                    node = node.setdefault(char, {})
+                node.setdefault(self._TERMINAL, []).append(original_prefix)
+    
+    @staticmethod
+    def match_keys(norm_prefix: str) -> List[str]:
+        """获取标准化前缀对应的所有匹配键"""
+        keys = [norm_prefix]
+        
+        # 对于长前缀，尝试匹配前面的关键部分
+        if len(norm_prefix) > 10:
+            key_parts = norm_prefix.split()[:2]  # 取前两个词
+            if len(key_parts) >= 2:
+                keys.append(' '.join(key_parts))
+        
+        return keys
+    
+    def match(self, message: str) -> List[str]:
+        """
+        单次扫描提交消息，返回所有匹配的原始前缀 (按前缀列表顺序)
+        """
+        node = self._root
+        matched = list(node.get(self._TERMINAL, ()))
+        
+        for char in message.lower().strip():
+            node = node.get(char)
+            if node is None:
+                break
+            if self._TERMINAL in node:
+                matched.extend(node[self._TERMINAL])
+        
+        if len(matched) > 1:
+            matched = sorted(set(matched), key=self._order.__getitem__)
+        return matched
+    
+    def grep_patterns(self) -> Optional[List[str]]:
+        """
+        生成可下推给 git log -E -i --grep 的模式列表 (多个模式之间为"或"关系)
+        
+        模式不加行首锚点，只保证不漏掉任何匹配提交，精确的前缀语义由 match()
+        在 Python 侧复核。存在空前缀或含非ASCII大小写字母的前缀时返回None。
+        """
+        keys = set()
+        for norm_prefix in {prefix.rstrip(': ').lower() for prefix in self.prefixes}:
+            for key in self.match_keys(norm_prefix):
+                if not key or not _is_case_safe(key):
+                    return None
+                keys.add(key)
+        
+        # 只保留最短的匹配键: 包含较短键的长键不会带来额外的筛选效果
+        patterns = [key for key in keys if not any(other != key and other in key for other in keys)]
+        return sorted(escape_grep_literal(key) for key in patterns)
+    
+    def index_keys(self) -> Optional[List[str]]:
+        """
+        生成可下推给持久化索引的匹配键 (标准化提交消息必须以其中之一开头)
+        
+        与 match() 使用相同的标准化方式 (小写、去除首尾空白)，由索引按范围查询预先筛选。
+        存在空前缀时返回None (所有提交都可能匹配)。
+        """
+        keys = set()
+        for norm_prefix in {prefix.rstrip(': ').lower() for prefix in self.prefixes}:
+            for key in self.match_keys(norm_prefix):
+                if not key:
+                    return None
+                keys.add(key)
+        
+        # 以较短键开头的长键已被较短键的范围覆盖
+        return sorted(key for key in keys if not any(other != key and key.startswith(other) for other in keys))
+
+
+class TicketExtractor:
+    """
+    从完整提交消息 (标题与正文) 中提取工单/需求编号
+    
+    编号可以出现在消息的任意位置。模式含捕获组时以第一个捕获组为编号，
+    否则为整个匹配；编号统一转为大写，查询时按同样方式标准化。
+    """
+    
+    def __init__(self, patterns: Optional[List[str]] = None):
+        """
+        编译编号模式
+        
+        Args:
+            patterns: 编号的正则表达式列表，默认为 JIRA 风格的 'PROJ-123'
+        """
+        self.patterns = list(patterns or _DEFAULT_TICKET_PATTERNS)
+        self._regexes = [re.compile(pattern) for pattern in self.patterns]
+    
+    @staticmethod
+    def normalize(ticket: str) -> str:
+        """标准化编号 (去除首尾空白并转为大写)"""
+        return ticket.strip().upper()
+    
+    def extract(self, message: str) -> Set[str]:
+        """提取消息中出现的全部编号"""
+        tickets = set()
+        for regex in self._regexes:
+            for match in regex.finditer(message):
+                ticket = match.group(1) if regex.groups else match.group(0)
+                if ticket:
+                    tickets.add(self.normalize(ticket))
+        return tickets
+    
+    def is_ticket(self, text: str) -> bool:
+        """文本本身是否为一个可被模式识别的编号"""
+        return self.normalize(text) in self.extract(text)
+
+
+class GitBlobReader:
+    """
+    常驻的 git cat-file --batch 读取器
+    
+    通过单个管道按 '<rev>:<path>' 读取任意版本的文件内容，避免每个文件
+    启动一个子进程；按仓库编码策略解码后的内容保存在有界LRU缓存中。
+    """
+    
+    def __init__(self, repo_path: str, cache_size: int = 256,
+                 encoding: str = 'utf-8', encoding_errors: str = 'replace'):
+        """
+        初始化读取器
+        
+        Args:
+            repo_path: Git仓库路径 (支持裸仓库)
+            cache_size: LRU缓存的最大条目数
+            encoding: 路径与文件内容的编码 (与 GitAnalyzer 的编码策略一致)
+            encoding_errors: 解码失败时的处理方式
+        """
+        self.repo_path = repo_path
+        self.cache_size = cache_size
+        self.encoding = encoding
+        self.encoding_errors = encoding_errors
+        self._cache: OrderedDict = OrderedDict()
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+    
+    def _ensure_process(self) -> subprocess.Popen:
+        """按需启动 cat-file 子进程"""
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ['git', 'cat-file', '--batch'],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        return self._process
+    
+    def read(self, revision: str, path: str) -> Optional[str]:
+        """
+        读取指定版本的文件内容
+        
+        Args:
+            revision: 提交哈希或其他版本标识 (缓存按原样作为键，建议传入不可变的提交哈希)
+            path: 相对仓库根目录的文件路径
+            
+        Returns:
+            文件内容，文件在该版本不存在时返回None
+        """
+        spec = f"{revision}:{path}"
+        
+        with self._lock:
+            if spec in self._cache:
+                self._cache.move_to_end(spec)
+                return self._cache[spec]
+            
+            content = self._read_object(spec)
+            
+            self._cache[spec] = content
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return content
+    
+    def _read_object(self, spec: str) -> Optional[str]:
+        """通过 cat-file 管道读取单个对象"""
+        if '\n' in spec:
+            return None
+        
+        process = self._ensure_process()
+        try:
+            process.stdin.write(spec.encode(self.encoding, self.encoding_errors) + b'\n')
+            process.stdin.flush()
+            
+            header = process.stdout.readline().split()
+            if len(header) != 3 or not header[2].isdigit():
+                # '<spec> missing' 或 '<spec> ambiguous'
+                return None
+            
+            _, object_type, size = header
+            object_type = object_type.decode('ascii', 'replace')
+            data = process.stdout.read(int(size))
+            process.stdout.read(1)  # 对象内容后的换行符
+        except (OSError, ValueError) as e:
+            self.close()
+            raise RuntimeError(f"读取Git对象失败 {spec}: {e}")
+        
+        if object_type != 'blob':
+            return None
+        return data.decode(self.encoding, self.encoding_errors)
+    
+    def close(self):
+        """关闭 cat-file 子进程"""
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+            self._process.stdout.close()
+            self._process = None
 
 
 class GitAnalyzer:
     """Git仓库分析器"""
     
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, blob_cache_size: int = 256,
+                 use_index: bool = False, index_path: Optional[str] = None,
+                 grep_pushdown: bool = False, max_workers: Optional[int] = None,
+                 all_refs: bool = False, dedupe_patches: bool = False,
+                 include_paths: Optional[List[str]] = None,
+                 exclude_paths: Optional[List[str]] = None,
+                 merge_policy: str = 'default', backend: str = 'subprocess',
+                 encoding: str = 'utf-8', encoding_errors: str = 'replace',
+                 history_shards: int = 1, ticket_patterns: Optional[List[str]] = None):
         """
         初始化Git分析器
         
         Args:
-            repo_path: Git仓库根目录路径
+            repo_path: Git仓库根目录路径 (支持裸仓库)
+            blob_cache_size: 按版本读取文件时的LRU缓存条目数
+            use_index: 是否使用持久化的提交索引回答查询 (见 git_commit_index.CommitIndex)
+            index_path: 索引数据库路径，默认存放在 .git/code_reviewer/ 下
+            grep_pushdown: 是否将前缀/正则过滤下推为 git log --grep 参数，
+                由git在输出前丢弃不匹配的提交 (Python侧仍按原语义复核)
+            max_workers: 并发执行逐提交Git查询时的最大线程数，默认为 min(8, CPU核数)
+            all_refs: 是否遍历所有分支与标签 (git log --all)，而不只是 HEAD 的历史；
+                索引以 HEAD 为键，启用时查询直接走 git log
+            dedupe_patches: 是否按 git patch-id 合并内容相同的提交 (cherry-pick、变基副本)
+            include_paths: 只分析这些路径 (git pathspec，如 'services/billing')，作为 '-- <pathspec>'
+                传给所有提交查询，只返回修改了这些路径的提交及其中的文件变更
+            exclude_paths: 排除这些路径 (以 ':(exclude)' 形式追加到 pathspec)；
+                索引记录的是整个仓库的历史，限定路径时查询直接走 git log
+            merge_policy: 合并提交策略，'default' 遍历所有父提交且合并提交不带文件变更；
+                'first-parent' 只遍历第一父提交；'no-merges' 跳过合并提交；
+                'combined' 以合并差异审查合并提交。非默认策略的查询直接走 git log
+            backend: 提交遍历、树差异与文件读取使用的后端 (见 git_backend)，
+                'subprocess' 调用 git 命令行；'pygit2' 在进程内读取对象库 (需要安装 pygit2)
+            encoding: 仓库的编码策略，git log 以该编码输出提交信息 (--encoding)，
+                路径等其余输出也按该编码解码
+            encoding_errors: 解码失败时的处理方式 (同 bytes.decode 的 errors 参数)
+            history_shards: 历史遍历的分片数，大于1且指定 since 时把时间窗口按提交者时间等分为
+                多个分片，每个分片在独立进程中执行自己的 git log 并解析，按时间顺序合并 (命令行后端)
+            ticket_patterns: 从提交标题与正文中提取工单/需求编号的正则表达式列表
+                (见 TicketExtractor)，索引据此维护编号到提交的倒排表
         """
+        if merge_policy not in _MERGE_POLICY_ARGS:
+            raise ValueError(f"不支持的合并提交策略: {merge_policy}")
+        if history_shards < 1:
+            raise ValueError(f"历史分片数必须为正整数: {history_shards}")
+        codecs.lookup(encoding)
+        codecs.lookup_error(encoding_errors)
+        self.encoding = encoding
+        self.encoding_errors = encoding_errors
+        
         self.repo_path = os.path.abspath(repo_path)
         self._validate_git_repo()
+        self.blob_cache_size = blob_cache_size
+        self._blob_reader: Optional[GitBlobReader] = None
+        self.use_index = use_index
+        self.index_path = index_path
+        self._commit_index = None
+        self._git_dir: Optional[str] = None
+        self.grep_pushdown = grep_pushdown
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.all_refs = all_refs
+        self.dedupe_patches = dedupe_patches
+        self.include_paths = list(include_paths or [])
+        self.exclude_paths = list(exclude_paths or [])
+        self.merge_policy = merge_policy
+        self.backend_name = backend
+        self.history_shards = history_shards
+        self.ticket_extractor = TicketExtractor(ticket_patterns)
+        self._backend = None
+        self._dependency_source = None
+        self._dependency_cache = None
+        self._python_resolver = None
+        self._js_resolver = None
+        self._java_resolver = None
+        self._dependency_graph = None
+        self._dependency_graph_head: Optional[str] = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def _validate_git_repo(self):
-        """验证是否为有效的Git仓库"""
+        """验证是否为有效的Git仓库 (工作区仓库或裸仓库)"""
         git_dir = os.path.join(self.repo_path, '.git')
-        if not os.path.exists(git_dir):
+        is_bare = (os.path.isfile(os.path.join(self.repo_path, 'HEAD'))
+                   and os.path.isdir(os.path.join(self.repo_path, 'objects')))
+        if not os.path.exists(git_dir) and not is_bare:
             raise ValueError(f"'{self.repo_path}' 不是一个有效的Git仓库")
     
+    @property
+    def blob_reader(self) -> GitBlobReader:
+        """按需创建的常驻 cat-file 读取器"""
+        if self._blob_reader is None:
+            self._blob_reader = GitBlobReader(
+                self.repo_path, self.blob_cache_size, self.encoding, self.encoding_errors
+            )
+        return self._blob_reader
+    
+    @property
+    def backend(self):
+        """按需创建的Git访问后端"""
+        if self._backend is None:
+            from git_backend import create_backend
+            self._backend = create_backend(self.backend_name, self)
+        return self._backend
+    
+    def read_file_at(self, revision: str, file_path: str) -> Optional[str]:
+        """
+        读取指定版本中的文件内容 (不依赖工作区状态)
+        
+        Args:
+            revision: 提交哈希
+            file_path: 相对仓库根目录的文件路径
+            
+        Returns:
+            文件内容，文件在该版本不存在时返回None
+        """
+        return self.backend.read_blob(revision, file_path)
+    
+    def resolve_revision(self, revision: str = 'HEAD') -> str:
+        """将分支名、HEAD等版本标识解析为提交哈希"""
+        return self.backend.resolve_revision(revision)
+    
+    @property
+    def git_dir(self) -> str:
+        """仓库的 .git 目录 (裸仓库即仓库本身，工作树为其公共目录)"""
+        if self._git_dir is None:
+            self._git_dir = self._run_git_command(['rev-parse', '--absolute-git-dir'])
+        return self._git_dir
+    
+    @property
+    def commit_index(self):
+        """按需打开的持久化提交索引"""
+        if self._commit_index is None:
+            from git_commit_index import CommitIndex
+            self._commit_index = CommitIndex(self, self.index_path)
+        return self._commit_index
+    
+    @property
+    def dependency_cache(self):
+        """按需打开的导入语句持久化缓存"""
+        if self._dependency_cache is None:
+            from dependency_graph import DependencyCache
+            self._dependency_cache = DependencyCache(
+                os.path.join(self.git_dir, 'code_reviewer', 'dependency_cache.sqlite')
+            )
+        return self._dependency_cache
+    
+    @property
+    def dependency_source(self):
+        """依赖分析所依据的 HEAD 文件树 (随依赖图在 HEAD 变化时重建)"""
+        if self._dependency_source is None:
+            self._dependency_source = self.revision_source('HEAD')
+        return self._dependency_source
+    
+    @property
+    def python_resolver(self):
+        """按需创建的Python导入解析器 (从 HEAD 的 blob 解析)"""
+        if self._python_resolver is None:
+            from dependency_graph import PythonImportResolver
+            self._python_resolver = PythonImportResolver(self.dependency_source, self.dependency_cache)
+        return self._python_resolver
+    
+    @property
+    def js_resolver(self):
+        """按需创建的JavaScript/TypeScript模块解析器 (从 HEAD 的 blob 解析)"""
+        if self._js_resolver is None:
+            from dependency_graph import JSImportResolver
+            self._js_resolver = JSImportResolver(self.dependency_source, self.dependency_cache)
+        return self._js_resolver
+    
+    @property
+    def java_resolver(self):
+        """按需创建的Java依赖解析器 (从 HEAD 的 blob 解析，包索引按 HEAD 持久化)"""
+        if self._java_resolver is None:
+            from dependency_graph import JavaImportResolver
+            self._java_resolver = JavaImportResolver(self.dependency_source, self.dependency_cache)
+        return self._java_resolver
+    
+    def revision_source(self, revision: str = 'HEAD'):
+        """
+        获取某个版本的文件树 (见 dependency_graph.RevisionSource)
+        
+        一次 git ls-tree 取得全部路径与 blob 对象ID，文件内容经 cat-file 读取器按该提交读取，
+        不依赖工作区 (裸仓库同样可用)。
+        
+        Args:
+            revision: 版本标识
+            
+        Returns:
+            文件树，版本不存在 (如空仓库的 HEAD) 时为空
+        """
+        from dependency_graph import RevisionSource
+        try:
+            commit = self.resolve_revision(revision)
+        except RuntimeError:
+            return RevisionSource(None, {}, lambda file_path: None)
+        
+        blobs = {}
+        for entry in self._run_git_bytes(['ls-tree', '-r', '-z', '--full-tree', commit]).split(b'\x00'):
+            meta, _, path = entry.partition(b'\t')
+            fields = meta.split(b' ')
+            # 子模块等非 blob 条目没有可读取的内容
+            if len(fields) == 3 and fields[1] == b'blob':
+                blobs[self._decode(path)] = fields[2].decode('ascii')
+        return RevisionSource(commit, blobs, lambda file_path: self.read_file_at(commit, file_path))
+    
+    @property
+    def dependency_graph(self):
+        """
+        仓库级依赖图，每个 HEAD 构建一次
+        
+        文件集合与源码都取自 HEAD 提交 (与被审查的提交历史一致，不受工作区未提交修改影响，
+        裸仓库同样可用)。HEAD 变化后文件树、解析器和依赖图一并失效重建；
+        已提取的导入语句仍由持久化缓存按 blob 复用。空仓库的依赖图为空。
+        """
+        try:
+            head = self.resolve_revision('HEAD')
+        except RuntimeError:
+            head = None
+        
+        if self._dependency_graph is None or head != self._dependency_graph_head:
+            from dependency_graph import DependencyGraph
+            self._dependency_source = None
+            self._python_resolver = None
+            self._js_resolver = None
+            self._java_resolver = None
+            source_files = {
+                path for path in self.dependency_source.files
+                if path.endswith(_DEPENDENCY_SOURCE_EXTENSIONS)
+            }
+            self._dependency_graph = DependencyGraph(source_files, self._resolve_file_dependencies)
+            self._dependency_graph_head = head
+        return self._dependency_graph
+    
+    @property
+    def is_path_scoped(self) -> bool:
+        """是否限定了分析路径"""
+        return bool(self.include_paths or self.exclude_paths)
+    
+    def _pathspec_args(self) -> List[str]:
+        """限定路径时追加到 git log/diff 末尾的 '-- <pathspec>' 参数"""
+        if not self.is_path_scoped:
+            return []
+        # 只有排除项时以仓库根目录为正向范围 (兼容不支持纯排除 pathspec 的旧版本git)
+        pathspecs = self.include_paths or ['.']
+        return ['--'] + pathspecs + [f':(exclude){path}' for path in self.exclude_paths]
+    
+    def write_commit_graph(self, changed_paths: bool = True) -> bool:
+        """
+        维护步骤: 写入 commit-graph 文件，可选附带修改路径 Bloom 过滤器
+        
+        带 --changed-paths 的 commit-graph 让按路径限定的 git log 跳过未修改这些路径的提交，
+        不必逐个比较树对象，团队子目录范围的分析耗时与子目录的历史成比例。Bloom 过滤器
+        只对字面路径生效，含通配符或 ':(exclude)' 的 pathspec 仍逐个比较。
+        
+        Args:
+            changed_paths: 是否计算修改路径 Bloom 过滤器
+            
+        Returns:
+            是否写入成功 (git 版本过旧或仓库只读时返回 False)
+        """
+        command = ['commit-graph', 'write', '--reachable']
+        if changed_paths:
+            command.append('--changed-paths')
+        try:
+            self._run_git_command(command)
+            return True
+        except RuntimeError as e:
+            print(f"警告: 写入 commit-graph 失败: {e}")
+            return False
+    
+    def resolve_time_bounds(self, since: Optional[str] = None,
+                            until: Optional[str] = None) -> Tuple[Optional[int], Optional[int]]:
+        """
+        使用Git自身的日期解析将 since/until 转换为Unix时间戳
+        
+        Returns:
+            (起始时间戳, 结束时间戳)，未指定的一端为None
+        """
+        if not since and not until:
+            return None, None
+        
+        command = ['rev-parse']
+        if since:
+            command.append(f'--since={since}')
+        if until:
+            command.append(f'--until={until}')
+        
+        since_ts = until_ts = None
+        for line in self._run_git_command(command).split('\n'):
+            if line.startswith('--max-age='):
+                since_ts = int(line[len('--max-age='):])
+            elif line.startswith('--min-age='):
+                until_ts = int(line[len('--min-age='):])
+        return since_ts, until_ts
+    
+    def close(self):
+        """释放常驻的Git子进程、后端与索引连接"""
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+        if self._blob_reader is not None:
+            self._blob_reader.close()
+            self._blob_reader = None
+        if self._commit_index is not None:
+            self._commit_index.close()
+            self._commit_index = None
+        if self._dependency_cache is not None:
+            self._dependency_cache.close()
+            self._dependency_cache = None
+            self._dependency_source = None
+            self._python_resolver = None
+            self._js_resolver = None
+            self._java_resolver = None
+        self._dependency_graph = None
+    
+    def _decode(self, data: bytes) -> str:
+        """按仓库编码策略解码Git输出"""
+        return data.decode(self.encoding, self.encoding_errors)
+    
+    def _run_git_bytes(self, command: List[str], stdin_data: Optional[bytes] = None,
+                       env: Optional[Dict[str, str]] = None) -> bytes:
+        """
+        执行Git命令并返回未解码的输出
+        
+        Args:
+            command: Git命令列表
+            stdin_data: 写入标准输入的字节
+            env: 追加到当前进程环境变量中的变量
+            
+        Returns:
+            标准输出的原始字节
+        """
+        result = subprocess.run(['git'] + command, cwd=self.repo_path, capture_output=True, input=stdin_data,
+                                env=dict(os.environ, **env) if env else None)
+        if result.returncode != 0:
+            raise RuntimeError(f"Git命令执行失败: {self._decode(result.stderr)}")
+        return result.stdout
+    
     def _run_git_command(self, command: List[str]) -> str:
         """
         执行Git命令
@@ -57,29 +813,421 @@ class GitAnalyzer:
             command: Git命令列表
             
         Returns:
-            命令输出结果
+            按仓库编码策略解码并去除首尾空白的输出
         """
+        return self._decode(self._run_git_bytes(command)).strip()
+    
+    def _stream_git_records(self, command: List[str], separator: bytes,
+                            chunk_size: int = 64 * 1024,
+                            stdin_data: Optional[str] = None) -> Iterator[bytes]:
+        """
+        通过管道增量读取Git命令的字节输出，并按记录分隔符逐条产出
+        
+        内存占用只与单条记录大小相关；调用方提前停止迭代时立即终止子进程。
+        记录保持为字节，由调用方只解码需要的字段。
+        
+        Args:
+            command: Git命令列表
+            separator: 记录分隔符
+            chunk_size: 每次从管道读取的字节数
+            stdin_data: 写入子进程标准输入的数据 (如 --stdin 的提交列表)
+            
+        Returns:
+            记录迭代器 (不含分隔符)
+        """
+        process = subprocess.Popen(
+            ['git'] + command,
+            cwd=self.repo_path,
+            stdin=subprocess.PIPE if stdin_data is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        
+        if stdin_data is not None:
+            # git 在开始输出前会读完全部修订参数，先写完再读输出不会死锁
+            process.stdin.write(stdin_data.encode(self.encoding))
+            process.stdin.close()
+        
+        finished = False
         try:
-            result = subprocess.run(
-                ['git'] + command,
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                check=True
-            )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Git命令执行失败: {e.stderr}")
-        except UnicodeDecodeError:
-            # 处理中文编码问题
-            result = subprocess.run(
-                ['git'] + command,
-                cwd=self.repo_path,
-                capture_output=True,
-                check=True
-            )
-            return result.stdout.decode('utf-8', errors='ignore').strip()
+            # 未完成的记录留在缓冲区中，跨多个块的大记录不会被反复拼接
+            buffer = bytearray()
+            while True:
+                chunk = process.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                
+                scan_from = len(buffer)
+                buffer += chunk
+                start = 0
+                position = buffer.find(separator, scan_from)
+                while position != -1:
+                    if position > start:
+                        yield bytes(buffer[start:position])
+                    start = position + len(separator)
+                    position = buffer.find(separator, start)
+                del buffer[:start]
+            
+            if buffer:
+                yield bytes(buffer)
+            finished = True
+        finally:
+            if not finished and process.poll() is None:
+                # 提前终止: 不再需要后续输出
+                process.kill()
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            returncode = process.wait()
+        
+        if returncode != 0:
+            raise RuntimeError(f"Git命令执行失败: {self._decode(stderr)}")
+    
+    def _build_log_args(self, since: Optional[str] = None,
+                        until: Optional[str] = None,
+                        max_count: Optional[int] = None) -> List[str]:
+        """构建 git log 的时间范围与数量参数"""
+        log_args = []
+        if since:
+            log_args.extend(['--since', since])
+        if until:
+            log_args.extend(['--until', until])
+        if max_count:
+            log_args.extend(['-n', str(max_count)])
+        return log_args
+    
+    def _iter_log_commits(self, log_args: List[str],
+                          message_filter: Optional[Callable[[str], bool]] = None,
+                          stdin_revisions: Optional[List[str]] = None,
+                          scoped: bool = True) -> Iterator[GitCommit]:
+        """
+        单次 git log 摄取: 一个子进程同时取得提交头部、--raw 状态与 --numstat 统计
+        
+        Args:
+            log_args: 追加到 git log 的参数 (时间范围、提交哈希等)
+            message_filter: 提交消息过滤函数，未通过的记录不解析文件变更部分
+            stdin_revisions: 通过 --stdin 传入的修订列表 (避免命令行长度限制)
+            scoped: 是否应用分析器的查询范围，即路径限定与合并提交策略
+                (持久化索引摄取完整历史时为 False)
+            
+        Returns:
+            完整填充 files_changed 与 file_changes 的提交迭代器
+        """
+        command = ['log', '-z', '--raw', '--numstat', '--date=raw', f'--encoding={self.encoding}',
+                   _LOG_FORMAT] + log_args
+        if scoped:
+            command += _MERGE_POLICY_ARGS[self.merge_policy]
+        stdin_data = None
+        if stdin_revisions is not None:
+            command.append('--stdin')
+            stdin_data = ''.join(f"{revision}\n" for revision in stdin_revisions)
+        if scoped:
+            command += self._pathspec_args()
+        
+        # 流式读取字节记录，逐条解析，不缓存完整的 git log 输出；
+        # 先只解码提交标题，未通过过滤的提交不再解码其余字段
+        decode = self._decode
+        records = self._stream_git_records(command, _LOG_RECORD_SEP_BYTES, stdin_data=stdin_data)
+        try:
+            for record in records:
+                parts = record.split(b'\x00', 6)
+                if len(parts) != 7:
+                    continue
+                
+                commit_hash, author, email, date_raw, committed_at, subject, diff_output = parts
+                message = decode(subject)
+                if message_filter is not None and not message_filter(message):
+                    continue
+                
+                file_changes = self._parse_raw_numstat(diff_output)
+                committed_ts = int(committed_at) if committed_at.isdigit() else 0
+                authored_at, author_tz = self._parse_raw_date(date_raw.decode('ascii', 'replace'), committed_ts)
+                yield GitCommit(
+                    hash=commit_hash.decode('ascii'),
+                    author=decode(author),
+                    email=decode(email),
+                    authored_at=authored_at,
+                    author_tz=author_tz,
+                    message=message,
+                    files_changed=[change.file_path for change in file_changes],
+                    additions=sum(change.additions for change in file_changes),
+                    deletions=sum(change.deletions for change in file_changes),
+                    file_changes=file_changes,
+                    committed_at=committed_ts
+                )
+        finally:
+            records.close()
+    
+    def _iter_sharded_log_commits(self, since: str, until: Optional[str],
+                                  log_args: List[str],
+                                  message_filter: Optional[Callable[[str], bool]] = None
+                                  ) -> Iterator[GitCommit]:
+        """
+        按时间分片并行的历史遍历，结果与带 since/until 的 _iter_log_commits 相同
+        
+        since/until 解析为时间戳后，把窗口按提交者时间等分为 history_shards 个互不重叠的
+        分片 (两端都包含，与 git 的 --since/--until 一致)。每个分片在独立进程中以
+        --since=@<起> --until=@<止> 执行自己的 git log 并解析，父进程不预先列出提交，
+        只按从新到旧的分片顺序合并结果并应用消息过滤。调用方提前停止迭代时
+        (达到数量上限或前缀配额用尽)，尚未开始的分片被取消。
+        
+        与单次遍历一样，分片的下限依赖 git 按提交者时间截断遍历，
+        提交者时间严重倒挂的历史可能与单次遍历有差异。
+        
+        Args:
+            since: 开始时间
+            until: 结束时间，为空时最新的分片不设上限
+            log_args: 追加到各分片 git log 的其余参数 (修订、作者、grep 等，不含时间范围)
+            message_filter: 提交消息过滤函数，在父进程合并时应用 (过滤条件可能随已产出的
+                提交变化，如前缀配额，因此不交给子进程)
+            
+        Returns:
+            提交迭代器
+        """
+        since_ts, until_ts = self.resolve_time_bounds(since, until)
+        upper_ts = until_ts if until_ts is not None else int(time.time())
+        shard_count = max(1, min(self.history_shards, upper_ts - since_ts + 1))
+        
+        # 从新到旧划分窗口，最新的分片在未指定 until 时不设上限 (包含时间戳在未来的提交)
+        shard_args = []
+        span = upper_ts - since_ts + 1
+        for i in range(shard_count):
+            lower = since_ts + span * (shard_count - 1 - i) // shard_count
+            upper = since_ts + span * (shard_count - i) // shard_count - 1
+            window = [f'--since=@{lower}']
+            if i > 0 or until_ts is not None:
+                window.append(f'--until=@{upper}')
+            shard_args.append(window + log_args)
+        
+        options = {
+            'repo_path': self.repo_path,
+            'include_paths': self.include_paths,
+            'exclude_paths': self.exclude_paths,
+            'merge_policy': self.merge_policy,
+            'encoding': self.encoding,
+            'encoding_errors': self.encoding_errors,
+        }
+        # 进程数不超过CPU核数，多出的分片排队，提前停止时可以取消
+        executor = ProcessPoolExecutor(max_workers=min(shard_count, os.cpu_count() or 1))
+        futures = [executor.submit(_walk_history_shard, options, args) for args in shard_args]
+        try:
+            for future in futures:
+                for commit in future.result():
+                    if message_filter is None or message_filter(commit.message):
+                        yield commit
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def _walk_args(self) -> List[str]:
+        """只列出提交 (不输出差异) 时的合并提交策略参数 (--cc 会隐含 -p，列出时不带)"""
+        return [] if self.merge_policy == 'combined' else _MERGE_POLICY_ARGS[self.merge_policy]
+    
+    @staticmethod
+    def _parse_raw_date(date_str: str, fallback_ts: int = 0) -> Tuple[int, int]:
+        """
+        解析 --date=raw 格式的时间 ('1700000000 +0800')
+        
+        Returns:
+            (Unix时间戳, 时区分钟偏移)；格式异常时使用 fallback_ts 与 UTC，而不是当前时间
+        """
+        timestamp, _, offset = date_str.partition(' ')
+        try:
+            seconds = int(timestamp)
+        except ValueError:
+            return fallback_ts, 0
+        
+        if len(offset) == 5 and offset[1:].isdigit():
+            minutes = int(offset[1:3]) * 60 + int(offset[3:])
+            return seconds, -minutes if offset[0] == '-' else minutes
+        return seconds, 0
+    
+    
+    def _parse_raw_numstat(self, diff_output: bytes) -> List[GitFileChange]:
+        """
+        解析 -z 模式下的 --raw 与 --numstat 字节输出
+        
+        raw 条目形如 ':100644 100644 <sha> <sha> M\\0path\\0'，重命名/复制时
+        状态后跟旧路径与新路径两个字段；numstat 条目形如 'a\\td\\tpath\\0'，
+        重命名时路径为空并后跟旧路径与新路径。二者按新路径的原始字节配对，
+        路径只在生成变更记录时解码一次；二进制文件的 '-' 统计记为0。
+        """
+        tokens = diff_output.lstrip(b'\x00\n').split(b'\x00')
+        raw_entries = []  # (change_type, file_path, old_path)
+        numstats = {}
+        
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            i += 1
+            if not token:
+                continue
+            
+            if token.startswith(b':'):
+                status = token.rsplit(b' ', 1)[-1]
+                change_type = status[:1].decode('ascii')
+                if change_type in ('R', 'C') and i + 1 < len(tokens):
+                    old_path, file_path = tokens[i], tokens[i + 1]
+                    i += 2
+                else:
+                    old_path, file_path = None, tokens[i] if i < len(tokens) else b''
+                    i += 1
+                raw_entries.append((change_type, file_path, old_path))
+            elif b'\t' in token:
+                added, deleted, file_path = token.split(b'\t', 2)
+                if not file_path and i + 1 < len(tokens):
+                    file_path = tokens[i + 1]
+                    i += 2
+                numstats[file_path] = (
+                    int(added) if added.isdigit() else 0,
+                    int(deleted) if deleted.isdigit() else 0
+                )
+        
+        decode = self._decode
+        changes = []
+        for change_type, file_path, old_path in raw_entries:
+            additions, deletions = numstats.get(file_path, (0, 0))
+            changes.append(GitFileChange(
+                file_path=decode(file_path),
+                change_type=change_type,
+                additions=additions,
+                deletions=deletions,
+                old_path=decode(old_path) if old_path is not None else None
+            ))
+        
+        return changes
+    
+    def iter_commits(self, since: Optional[str] = None,
+                     until: Optional[str] = None,
+                     prefixes: Optional[List[str]] = None,
+                     max_count: Optional[int] = None,
+                     author: Optional[str] = None) -> Iterator[GitCommit]:
+        """
+        流式迭代提交记录，逐条读取并解析 git log 输出
+        
+        Args:
+            since: 开始时间
+            until: 结束时间
+            prefixes: 提交消息前缀列表，为空时不做前缀过滤
+            max_count: 最大返回数量；指定前缀时为每个前缀的配额，
+                所有配额填满后立即终止 git 子进程
+            author: 作者过滤
+            
+        Returns:
+            提交记录迭代器
+        """
+        if prefixes:
+            for commit, _ in self._iter_prefix_matches(prefixes, since, until, max_count, author):
+                yield commit
+            return
+        
+        commits = self._iter_commit_source(since, until, author)
+        try:
+            for i, commit in enumerate(commits):
+                if max_count and i >= max_count:
+                    break
+                yield commit
+        finally:
+            commits.close()
+    
+    def _index_applicable(self) -> bool:
+        """查询能否由持久化索引回答 (索引只记录 HEAD 的完整历史与默认合并提交策略)"""
+        return (self.use_index and not self.all_refs and not self.is_path_scoped
+                and self.merge_policy == 'default')
+    
+    def _iter_commit_source(self, since: Optional[str] = None,
+                            until: Optional[str] = None,
+                            author: Optional[str] = None,
+                            message_filter: Optional[Callable[[str], bool]] = None,
+                            grep_patterns: Optional[List[str]] = None,
+                            index_keys: Optional[List[str]] = None) -> Iterator[GitCommit]:
+        """
+        所有提交查询的统一数据源
+        
+        启用索引时先增量刷新索引再从索引读取，否则由后端遍历历史
+        (遍历所有引用、限定路径或使用非默认合并提交策略时不使用索引)。
+        
+        Args:
+            since: 开始时间
+            until: 结束时间
+            author: 作者过滤
+            message_filter: 提交消息过滤函数 (决定最终结果)
+            grep_patterns: 与 message_filter 等价或更宽松的 ERE 模式，
+                启用 grep_pushdown 时交给 git 预先过滤 (命令行后端)
+            index_keys: 与 message_filter 等价或更宽松的标准化消息前缀，
+                使用索引时在 SQL 中预先筛选 (见 PrefixMatcher.index_keys)
+        """
+        if self._index_applicable():
+            index = self.commit_index
+            index.refresh()
+            since_ts, until_ts = self.resolve_time_bounds(since, until)
+            return index.iter_commits(since_ts, until_ts, author, message_filter, subject_keys=index_keys)
+        
+        return self.backend.iter_commits(
+            since=since, until=until, author=author,
+            message_filter=message_filter, grep_patterns=grep_patterns
+        )
+    
+    def _iter_prefix_matches(self, prefixes: List[str],
+                             since: Optional[str] = None,
+                             until: Optional[str] = None,
+                             max_count: Optional[int] = None,
+                             author: Optional[str] = None) -> Iterator[Tuple[GitCommit, List[str]]]:
+        """
+        流式匹配多个前缀，产出 (提交, 仍有配额的匹配前缀列表)
+        
+        每个前缀最多接收 max_count 个提交，全部前缀配额用尽后停止读取，
+        生成器关闭时 git 子进程随之终止。
+        """
+        # 编译所有前缀，每条提交消息只需扫描一次
+        matcher = PrefixMatcher(prefixes)
+        remaining = {prefix: max_count for prefix in matcher.prefixes}
+        
+        def open_prefixes_of(message: str) -> List[str]:
+            return [
+                original_prefix
+                for original_prefix in matcher.match(message)
+                if remaining[original_prefix] != 0
+            ]
+        
+        commits = self._iter_commit_source(
+            since, until, author,
+            message_filter=lambda message: bool(open_prefixes_of(message)),
+            grep_patterns=matcher.grep_patterns(),
+            index_keys=matcher.index_keys()
+        )
+        try:
+            for commit in commits:
+                matched_prefixes = open_prefixes_of(commit.message)
+                if max_count:
+                    for prefix in matched_prefixes:
+                        remaining[prefix] -= 1
+                
+                yield commit, matched_prefixes
+                
+                if max_count and not any(remaining.values()):
+                    break
+        finally:
+            commits.close()
+    
+    def get_commits(self, since: Optional[str] = None,
+                    until: Optional[str] = None,
+                    max_count: Optional[int] = None,
+                    author: Optional[str] = None) -> List[GitCommit]:
+        """
+        获取时间范围内的提交记录 (不做消息过滤)
+        
+        Args:
+            since: 开始时间
+            until: 结束时间
+            max_count: 最大返回数量
+            author: 作者过滤
+            
+        Returns:
+            提交记录列表
+        """
+        return list(self.iter_commits(since, until, max_count=max_count, author=author))
     
     def get_commits_by_prefix(self, prefix: str, 
                             since: Optional[str] = None,
@@ -92,254 +1240,473 @@ class GitAnalyzer:
             prefix: 提交消息前缀 (如: 'feat:', 'fix:', 'JIRA-123:')
             since: 开始时间 (如: '2023-01-01', '1 week ago')
             until: 结束时间
-            max_count: 最大返回数量
+            max_count: 最大返回数量 (达到后立即停止读取历史)
             
         Returns:
             匹配的提交记录列表
         """
-        command = ['log', '--oneline', '--pretty=format:%H|%an|%ae|%ad|%s', 
-                  '--date=iso']
+        return list(self.iter_commits(since, until, prefixes=[prefix], max_count=max_count))
         
-        if since:
-            command.extend(['--since', since])
-        if until:
-            command.extend(['--until', until])
-        if max_count:
-            command.extend(['-n', str(max_count)])
+    def get_commits_by_multiple_prefixes_fast(self, prefixes: List[str], 
+                                            since: Optional[str] = None,
+                                            until: Optional[str] = None,
+                                            max_count: Optional[int] = None) -> Dict[str, List[GitCommit]]:
+        """
+        根据多个提交消息前缀查找提交记录 (极速优化版本)
+        单次流式 git log 同时获取所有提交的详情，各前缀配额填满后提前结束
+        
+        Args:
+            prefixes: 提交消息前缀列表
+            since: 开始时间
+            until: 结束时间
+            max_count: 每个前缀的最大返回数量
+            
+        Returns:
+            前缀到提交记录列表的映射
+        """
+        if not prefixes:
+            return {}
+        
+        results = {prefix: [] for prefix in prefixes}
+        
+        for commit_obj, matched_prefixes in self._iter_prefix_matches(prefixes, since, until, max_count):
+            # 将提交添加到所有匹配的前缀中
+            for prefix in matched_prefixes:
+                results[prefix].append(commit_obj)
+        
+        # 过滤空结果
+        return {prefix: commits for prefix, commits in results.items() if commits}
+    
+    def get_commits_by_ticket(self, ticket_id: str,
+                              since: Optional[str] = None,
+                              until: Optional[str] = None) -> List[GitCommit]:
+        """
+        查找标题或正文中任意位置引用了工单/需求编号的提交
+        
+        启用索引时直接查询编号倒排表；否则由 git 按编号字面量预先过滤 (--grep -F)，
+        再用 ticket_extractor 在完整消息上复核，只为命中的提交解析文件变更。
+        
+        Args:
+            ticket_id: 工单/需求编号 (如 'PROJ-123')
+            since: 开始时间
+            until: 结束时间
+            
+        Returns:
+            提交记录列表 (git log 顺序)
+        """
+        ticket = self.ticket_extractor.normalize(ticket_id)
+        if self._index_applicable():
+            index = self.commit_index
+            index.refresh()
+            since_ts, until_ts = self.resolve_time_bounds(since, until)
+            return list(index.iter_commits(since_ts, until_ts, ticket=ticket))
+        
+        command = ['log', f'--encoding={self.encoding}', '--format=%x1e%H%x00%B']
+        command += self._build_log_args(since, until)
+        if self.all_refs:
+            command.append('--all')
+        if _is_case_safe(ticket):
+            command.extend(['-F', '-i', f'--grep={ticket}'])
+        command += self._walk_args() + self._pathspec_args()
+        
+        revisions = []
+        for record in self._stream_git_records(command, _LOG_RECORD_SEP_BYTES):
+            commit_hash, _, message = record.partition(b'\x00')
+            if ticket in self.ticket_extractor.extract(self._decode(message)):
+                revisions.append(commit_hash.decode('ascii'))
+        
+        if not revisions:
+            return []
+        return list(self._iter_log_commits(['--no-walk=unsorted'], stdin_revisions=revisions))
+    
+    def _get_commits_changes_batch(self, commit_hashes: List[str],
+                                   batch_size: int = 500) -> Dict[str, List[GitFileChange]]:
+        """
+        批量获取多个提交的文件变更
+        
+        每批提交只启动一个 git log --no-walk --stdin -z --raw --numstat 进程，
+        按 NUL 分隔同时解析状态、重命名路径与增删行数；多个批次在有界线程池中并发执行。
+        某一批失败时逐个提交重试，单个提交失败只影响该提交，结果为空列表。
+        
+        Args:
+            commit_hashes: 提交哈希列表
+            batch_size: 每个 git 进程处理的提交数
+            
+        Returns:
+            提交哈希到文件变更列表的映射
+        """
+        if not commit_hashes:
+            return {}
         
-        output = self._run_git_command(command)
-        if not output:
-            return []
+        def fetch(batch: List[str]) -> Dict[str, List[GitFileChange]]:
+            return {
+                commit.hash: commit.file_changes
+                for commit in self._iter_log_commits(['--no-walk'], stdin_revisions=batch)
+            }
         
-        commits = []
-        # 标准化前缀：移除结尾的冒号和空格，转为小写比较
-        normalized_prefix = prefix.rstrip(': ').lower()
+        changes_info = {}
+        unique_hashes = list(dict.fromkeys(commit_hashes))
+        batches = [unique_hashes[i:i + batch_size] for i in range(0, len(unique_hashes), batch_size)]
         
-        for line in output.split('\n'):
-            if not line.strip():
-                continue
-                
-            parts = line.split('|', 4)
-            if len(parts) != 5:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(fetch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    changes_info.update(future.result())
+                except Exception:
+                    for commit_hash in batch:
+                        try:
+                            changes_info.update(fetch([commit_hash]))
+                        except Exception as e:
+                            print(f"警告: 获取提交 {commit_hash} 的文件变更失败: {e}")
+                            changes_info[commit_hash] = []
+        
+        # 完整哈希缺失表示该提交在分析范围内没有变更 (被路径过滤)；
+        # 只有短哈希、引用名等输入才需要解析后按原样映射
+        for commit_hash in unique_hashes:
+            if commit_hash in changes_info:
                 continue
-                
-            commit_hash, author, email, date_str, message = parts
-            
-            # 简化前缀匹配逻辑：检查提交消息是否包含指定前缀
-            normalized_message = message.lower().strip()
-            
-            # 方法1：直接前缀匹配
-            prefix_matches = normalized_message.startswith(normalized_prefix)
-            
-            # 方法2：如果前缀包含特殊字符，也尝试部分匹配
-            if not prefix_matches and len(normalized_prefix) > 10:
-                # 对于长前缀，尝试匹配前面的关键部分
-                key_parts = normalized_prefix.split()[:2]  # 取前两个词
-                if len(key_parts) >= 2:
-                    key_prefix = ' '.join(key_parts)
-                    prefix_matches = normalized_message.startswith(key_prefix)
-            
-            if prefix_matches:
-                
+            if _FULL_HASH_RE.fullmatch(commit_hash):
+                changes_info[commit_hash] = []
+            else:
                 try:
-                    commit_date = datetime.fromisoformat(date_str.replace(' ', 'T', 1))
-                except ValueError:
-                    # 处理日期解析失败
-                    commit_date = datetime.now()
-                
-                # 获取详细的提交信息
-                detailed_commit = self._get_commit_details(commit_hash)
-                commits.append(detailed_commit)
+                    changes_info[commit_hash] = changes_info.get(self.resolve_revision(commit_hash), [])
+                except RuntimeError:
+                    changes_info[commit_hash] = []
         
-        return commits
-        
-    def get_commits_by_multiple_prefixes_fast(self, prefixes: List[str], 
-                                            since: Optional[str] = None,
-                                            until: Optional[str] = None,
-                                            max_count: Optional[int] = None) -> Dict[str, List[GitCommit]]:
+        return changes_info
+    
+    def get_commit_patches(self, commit_hashes: List[str], context_lines: int = 3,
+                           paths: Optional[List[str]] = None) -> Dict[str, str]:
         """
-        根据多个提交消息前缀查找提交记录 (极速优化版本)
-        批量获取提交详情，大幅提升性能
+        批量获取多个提交的补丁文本
+        
+        所有提交通过 --stdin 交给同一个 git log --no-walk -p 进程。
         
         Args:
-            prefixes: 提交消息前缀列表
-            since: 开始时间
-            until: 结束时间
-            max_count: 每个前缀的最大返回数量
+            commit_hashes: 提交哈希列表
+            context_lines: 补丁上下文行数 (-U)
+            paths: 只获取这些路径的差异 (为空时获取分析范围内的全部文件)
             
         Returns:
-            前缀到提交记录列表的映射
+            提交哈希 -> 统一差异格式的补丁
         """
-        if not prefixes:
+        if not commit_hashes:
             return {}
         
-        # 第一步：获取所有提交的基本信息
-        command = ['log', '--oneline', '--pretty=format:%H|%an|%ae|%ad|%s', 
-                  '--date=iso']
+        command = ['log', '--no-walk', '-p', f'-U{context_lines}', '--no-color', '--no-ext-diff',
+                   '--src-prefix=a/', '--dst-prefix=b/', '--format=%x1e%H',
+                   '--stdin'] + _MERGE_POLICY_ARGS[self.merge_policy]
+        command += ['--'] + list(paths) if paths else self._pathspec_args()
         
-        if since:
-            command.extend(['--since', since])
-        if until:
-            command.extend(['--until', until])
+        patches = {}
+        stdin_data = ''.join(f"{commit_hash}\n" for commit_hash in dict.fromkeys(commit_hashes))
+        for record in self._stream_git_records(command, _LOG_RECORD_SEP_BYTES, stdin_data=stdin_data):
+            commit_hash, _, patch = record.partition(b'\n')
+            patches[commit_hash.strip().decode('ascii')] = self._decode(patch).strip('\n')
         
-        output = self._run_git_command(command)
-        if not output:
-            return {}
+        return patches
+    
+    def get_diff_hunks_by_commits(self, commit_hashes: List[str],
+                                  paths: Optional[List[str]] = None) -> Dict[str, Dict[str, List[DiffHunk]]]:
+        """
+        批量获取多个提交的差异片段
         
-        # 标准化所有前缀
-        normalized_prefixes = {prefix.rstrip(': ').lower(): prefix for prefix in prefixes}
-        matching_commits = {}  # hash -> (prefix_list, basic_info)
+        片段不带上下文 (-U0)，由调用方按函数/类边界自行扩展。
         
-        # 第二步：在内存中进行前缀匹配，收集所有匹配的提交哈希
-        for line in output.split('\n'):
-            if not line.strip():
-                continue
-                
-            parts = line.split('|', 4)
-            if len(parts) != 5:
-                continue
-                
-            commit_hash, author, email, date_str, message = parts
-            normalized_message = message.lower().strip()
-            
-            matched_prefixes = []
-            for norm_prefix, original_prefix in normalized_prefixes.items():
-                prefix_matches = normalized_message.startswith(norm_prefix)
-                
-                if not prefix_matches and len(norm_prefix) > 10:
-                    key_parts = norm_prefix.split()[:2]
-                    if len(key_parts) >= 2:
-                        key_prefix = ' '.join(key_parts)
-                        prefix_matches = normalized_message.startswith(key_prefix)
-                
-                if prefix_matches:
-                    matched_prefixes.append(original_prefix)
+        Args:
+            commit_hashes: 提交哈希列表
+            paths: 只获取这些路径的差异 (为空时获取全部文件)
             
-            if matched_prefixes:
-                matching_commits[commit_hash] = (matched_prefixes, parts)
+        Returns:
+            提交哈希 -> {文件路径: 差异片段列表}
+        """
+        patches = self.get_commit_patches(commit_hashes, context_lines=0, paths=paths)
+        return {
+            commit_hash: parse_unified_diff(patch + '\n')
+            for commit_hash, patch in patches.items()
+        }
+    
+    def get_net_file_diffs(self, commits: List[GitCommit],
+                           files: Optional[Set[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        计算匹配提交集合在每个文件上的净差异 (相当于把这些提交压缩为一个)
         
-        if not matching_commits:
-            return {prefix: [] for prefix in prefixes}
+        文件的净差异为 '最早修改它的匹配提交的父提交' 到 '最晚修改它的匹配提交' 之间的差异，
+        中间被后续提交改写的状态不会出现。若这段区间内还有不属于匹配集合的提交修改了同一文件
+        (交错的无关改动)，直接比较会混入无关内容，此时标记 interleaved，并把匹配提交对该文件的
+        改动依次重放到基准版本上 (见 _replay_file_commits)，净差异与 content 均取自重放结果；
+        重放冲突 (匹配改动依赖无关改动) 时不给出片段，由调用方改用逐提交差异。
         
-        # 第三步：批量获取所有匹配提交的详细信息
-        commit_hashes = list(matching_commits.keys())
+        Args:
+            commits: 匹配的提交列表 (git log 顺序，最新在前)
+            files: 只计算这些文件 (默认为提交修改的全部文件)
+            
+        Returns:
+            文件路径 -> {'base': 基准修订, 'head': 最新匹配提交, 'commits': 修改该文件的匹配提交,
+                        'interleaved': 是否存在交错的无关提交, 'hunks': 净差异片段 (重放冲突时为 None),
+                        'content': 重放得到的文件内容 (仅 interleaved 时给出，否则为 None，内容取 head 版本)}
+        """
+        if not commits:
+            return {}
         
-        # 批量获取文件变更信息
-        files_info = self._get_commits_files_batch(commit_hashes)
+        # 一次遍历区间内的全部提交 (拓扑顺序，最新在前) 及其修改的文件
+        range_args = ['--topo-order'] + [commit.hash for commit in commits]
+        try:
+            range_args.append('^' + self.resolve_revision(f'{commits[-1].hash}^'))
+        except RuntimeError:
+            pass
+        
+        # 同一次遍历记录每个提交的第一父提交 (%P)，基准修订无需逐文件 rev-parse
+        positions: Dict[str, int] = {}
+        first_parents: Dict[str, str] = {}
+        touched_by: Dict[str, List[int]] = {}
+        command = ['log', '-z', '--name-only', '--format=%x1e%H%x00%P%x00'] + range_args
+        for position, record in enumerate(self._stream_git_records(command, _LOG_RECORD_SEP_BYTES)):
+            commit_hash, parents, names = record.split(b'\x00', 2)
+            commit_hash = commit_hash.decode('ascii')
+            positions[commit_hash] = position
+            first_parents[commit_hash] = parents.decode('ascii').split(' ', 1)[0] or _EMPTY_TREE
+            for file_path in names.strip(b'\n\x00').split(b'\x00'):
+                if file_path:
+                    touched_by.setdefault(self._decode(file_path), []).append(position)
+        
+        # 文件 -> 修改它的匹配提交 (最新在前)；在匹配提交中被重命名的文件记录其原路径
+        file_commits: Dict[str, List[str]] = {}
+        old_paths: Dict[str, str] = {}
+        for commit in commits:
+            for change in commit.file_changes:
+                file_path = change.file_path
+                if files is None or file_path in files:
+                    file_commits.setdefault(file_path, []).append(commit.hash)
+                    if change.old_path:
+                        # 提交按最新在前遍历，最终保留最早一次重命名的原路径
+                        old_paths[file_path] = change.old_path
+        
+        matched_positions = {positions[commit.hash] for commit in commits if commit.hash in positions}
+        net_diffs: Dict[str, Dict[str, Any]] = {}
+        ranges: Dict[Tuple[str, str], List[str]] = {}
+        for file_path, hashes in file_commits.items():
+            ordered = sorted(hashes, key=lambda commit_hash: positions.get(commit_hash, -1))
+            head, first = ordered[0], ordered[-1]
+            
+            interleaved = any(commit_hash not in positions for commit_hash in hashes)
+            if not interleaved:
+                newest, oldest = positions[head], positions[first]
+                interleaved = any(
+                    newest < position < oldest and position not in matched_positions
+                    for position in touched_by.get(file_path, [])
+                )
+            
+            base = first_parents.get(first)
+            if base is None:
+                try:
+                    base = self.resolve_revision(f'{first}^')
+                except RuntimeError:
+                    base = _EMPTY_TREE
+            
+            net_diffs[file_path] = {
+                'base': base,
+                'head': head,
+                'commits': ordered,
+                'interleaved': interleaved,
+                'hunks': None,
+                'content': None
+            }
+            if not interleaved:
+                ranges.setdefault((base, head), []).append(file_path)
+                continue
+            
+            # 按时间顺序 (最早在前) 重放匹配提交，跳过无关提交的改动
+            steps = []
+            for commit_hash in reversed(ordered):
+                parent = first_parents.get(commit_hash)
+                if parent is None:
+                    try:
+                        parent = self.resolve_revision(f'{commit_hash}^')
+                    except RuntimeError:
+                        parent = _EMPTY_TREE
+                steps.append((parent, commit_hash))
+            paths = list(dict.fromkeys([file_path, old_paths.get(file_path, file_path)]))
+            replayed = self._replay_file_commits(base, steps, paths)
+            if replayed is not None:
+                net_diffs[file_path]['hunks'] = replayed[0].get(file_path, [])
+                net_diffs[file_path]['content'] = replayed[1]
+        
+        # 基准与终点相同的文件共用一次 git diff；重命名文件连同原路径一起比较，
+        # 由 -M 识别为重命名，片段相对原文件给出而不是整个文件新增
+        for (base, head), paths in ranges.items():
+            diff_paths = paths + [old_paths[file_path] for file_path in paths if file_path in old_paths]
+            hunks_by_file = self.get_diff_hunks_between(base, head, list(dict.fromkeys(diff_paths)))
+            for file_path in paths:
+                net_diffs[file_path]['hunks'] = hunks_by_file.get(file_path, [])
+        
+        return net_diffs
+    
+    def _replay_file_commits(self, base: str, steps: List[Tuple[str, str]],
+                             paths: List[str]) -> Optional[Tuple[Dict[str, List[DiffHunk]], Optional[str]]]:
+        """
+        把若干提交对指定路径的改动依次重放到基准版本上，得到只含这些提交的净差异
         
-        # 批量获取统计信息
-        stats_info = self._get_commits_stats_batch(commit_hashes)
+        在临时索引中放入基准版本的这些路径，逐个提交以 git apply --cached --3way 应用
+        其在这些路径上的补丁，再比较基准与重放结果。新对象写入临时对象目录 (仓库对象作为
+        备用目录只读访问)，不会改动仓库。
         
-        # 第四步：构建结果
-        results = {prefix: [] for prefix in prefixes}
+        Args:
+            base: 基准修订
+            steps: (父提交, 提交) 列表，按应用顺序排列
+            paths: 参与重放的路径 (含重命名前的原路径)，第一个为结果文件路径
         
-        for commit_hash, (matched_prefixes, basic_parts) in matching_commits.items():
-            commit_hash, author, email, date_str, message = basic_parts
+        Returns:
+            (文件路径 -> 净差异片段, 重放后的文件内容)；补丁无法应用 (冲突) 时返回None
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            env = {
+                'GIT_INDEX_FILE': os.path.join(temp_dir, 'index'),
+                'GIT_OBJECT_DIRECTORY': os.path.join(temp_dir, 'objects'),
+                'GIT_ALTERNATE_OBJECT_DIRECTORIES': os.path.join(self.git_dir, 'objects'),
+            }
+            os.makedirs(env['GIT_OBJECT_DIRECTORY'])
             
-            try:
-                commit_date = datetime.fromisoformat(date_str.replace(' ', 'T', 1))
-            except ValueError:
-                commit_date = datetime.now()
+            def run(command: List[str], stdin_data: Optional[bytes] = None) -> bytes:
+                return self._run_git_bytes(command, stdin_data=stdin_data, env=env)
             
-            files_changed = files_info.get(commit_hash, [])
-            additions, deletions = stats_info.get(commit_hash, (0, 0))
+            # ls-tree -z 的输出即 update-index --index-info 的输入格式
+            entries = run(['ls-tree', '-z', base, '--'] + paths)
+            run(['update-index', '-z', '--index-info'], stdin_data=entries)
             
-            commit_obj = GitCommit(
-                hash=commit_hash,
-                author=author,
-                email=email,
-                date=commit_date,
-                message=message,
-                files_changed=files_changed,
-                additions=additions,
-                deletions=deletions
-            )
+            for parent, commit_hash in steps:
+                patch = run(['diff', '--full-index', '--binary', '-M', '--no-color', '--no-ext-diff',
+                             '--src-prefix=a/', '--dst-prefix=b/', parent, commit_hash, '--'] + paths)
+                if not patch:
+                    continue
+                try:
+                    run(['apply', '--cached', '--3way'], stdin_data=patch)
+                except RuntimeError:
+                    return None
             
-            # 将提交添加到所有匹配的前缀中
-            for prefix in matched_prefixes:
-                results[prefix].append(commit_obj)
-                
-                # 应用最大数量限制
-                if max_count and len(results[prefix]) >= max_count:
-                    break
+            tree = run(['write-tree']).decode('ascii').strip()
+            patch = run(['diff', '-U0', '-M', '--no-color', '--no-ext-diff', '--src-prefix=a/', '--dst-prefix=b/',
+                         base, tree, '--'] + paths)
+            try:
+                content = self._decode(run(['cat-file', 'blob', f'{tree}:{paths[0]}']))
+            except RuntimeError:
+                # 文件被匹配提交删除
+                content = None
+            return parse_unified_diff(self._decode(patch)), content
+    
+    def get_diff_hunks_between(self, base: str, head: str,
+                               paths: Optional[List[str]] = None) -> Dict[str, List[DiffHunk]]:
+        """
+        获取两个修订之间的差异片段 (不含上下文行)
         
-        # 过滤空结果
-        return {prefix: commits for prefix, commits in results.items() if commits}
+        Args:
+            base: 基准修订
+            head: 终点修订
+            paths: 只比较这些路径 (默认为分析范围内的全部文件)
+            
+        Returns:
+            文件路径 -> 差异片段列表
+        """
+        return parse_unified_diff(self.backend.diff_patch(base, head, paths))
     
-    def _get_commits_files_batch(self, commit_hashes: List[str]) -> Dict[str, List[str]]:
-        """批量获取多个提交的文件变更信息"""
-        if not commit_hashes:
-            return {}
+    def get_patch_ids(self, commit_hashes: List[str]) -> Dict[str, str]:
+        """
+        批量计算提交的 patch-id (git patch-id --stable)
         
-        files_info = {}
+        git log --no-walk --stdin -p 的输出直接通过管道交给 git patch-id，
+        两个进程各启动一次。合并提交和空提交没有 patch-id，不出现在结果中。
         
-        # 分批处理，避免命令行过长
-        batch_size = 50
-        for i in range(0, len(commit_hashes), batch_size):
-            batch_hashes = commit_hashes[i:i + batch_size]
+        Args:
+            commit_hashes: 提交哈希列表
             
-            try:
-                # 使用 git show --name-only 批量获取文件信息
-                for commit_hash in batch_hashes:
-                    output = self._run_git_command([
-                        'show', '--name-only', '--format=', commit_hash
-                    ])
-                    files_changed = [line.strip() for line in output.split('\n') if line.strip()]
-                    files_info[commit_hash] = files_changed
-                    
-            except Exception as e:
-                print(f"警告: 批量获取文件信息失败: {e}")
-                # 降级到单个处理
-                for commit_hash in batch_hashes:
-                    try:
-                        output = self._run_git_command([
-                            'show', '--name-only', '--format=', commit_hash
-                        ])
-                        files_changed = [line.strip() for line in output.split('\n') if line.strip()]
-                        files_info[commit_hash] = files_changed
-                    except:
-                        files_info[commit_hash] = []
-        
-        return files_info
-    
-    def _get_commits_stats_batch(self, commit_hashes: List[str]) -> Dict[str, Tuple[int, int]]:
-        """批量获取多个提交的统计信息"""
+        Returns:
+            提交哈希 -> patch-id
+        """
         if not commit_hashes:
             return {}
         
-        stats_info = {}
+        log_process = subprocess.Popen(
+            ['git', 'log', '--no-walk', '--stdin', '-p', '--no-color', '--no-ext-diff',
+             '--format=commit %H'],
+            cwd=self.repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        patch_id_process = subprocess.Popen(
+            ['git', 'patch-id', '--stable'],
+            cwd=self.repo_path,
+            stdin=log_process.stdout,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        # 由 patch-id 进程独占读取端，log 进程才能在下游退出时收到 SIGPIPE
+        log_process.stdout.close()
+        
+        # git log 在输出前会读完全部修订参数，先写完再等待输出不会死锁
+        log_process.stdin.write(''.join(f"{commit_hash}\n" for commit_hash in dict.fromkeys(commit_hashes)).encode())
+        log_process.stdin.close()
+        
+        output, patch_id_stderr = patch_id_process.communicate()
+        log_stderr = log_process.stderr.read()
+        log_process.stderr.close()
+        if log_process.wait() != 0:
+            raise RuntimeError(f"Git命令执行失败: {self._decode(log_stderr)}")
+        if patch_id_process.returncode != 0:
+            raise RuntimeError(f"Git命令执行失败: {self._decode(patch_id_stderr)}")
+        
+        patch_ids = {}
+        for line in self._decode(output).splitlines():
+            parts = line.split()
+            if len(parts) == 2:
+                patch_id, commit_hash = parts
+                patch_ids[commit_hash] = patch_id
+        return patch_ids
+    
+    def collapse_duplicate_commits(self, commits: List[GitCommit],
+                                   patch_ids: Optional[Dict[str, str]] = None
+                                   ) -> Tuple[List[GitCommit], Dict[str, List[str]]]:
+        """
+        合并 patch-id 相同的提交 (cherry-pick 到其他分支、变基产生的副本)
+        
+        每组等价提交保留最早的一个 (通常为原始提交)，其余作为它的重复项记录。
         
-        # 分批处理
-        batch_size = 50
-        for i in range(0, len(commit_hashes), batch_size):
-            batch_hashes = commit_hashes[i:i + batch_size]
+        Args:
+            commits: 提交列表 (git log 顺序，最新在前)
+            patch_ids: 预先计算的 patch-id，未提供时批量计算
             
-            try:
-                for commit_hash in batch_hashes:
-                    output = self._run_git_command([
-                        'show', '--stat', '--format=', commit_hash
-                    ])
-                    additions, deletions = self._parse_stats(output)
-                    stats_info[commit_hash] = (additions, deletions)
-                    
-            except Exception as e:
-                print(f"警告: 批量获取统计信息失败: {e}")
-                # 降级到单个处理
-                for commit_hash in batch_hashes:
-                    try:
-                        output = self._run_git_command([
-                            'show', '--stat', '--format=', commit_hash
-                        ])
-                        additions, deletions = self._parse_stats(output)
-                        stats_info[commit_hash] = (additions, deletions)
-                    except:
-                        stats_info[commit_hash] = (0, 0)
+        Returns:
+            (去重后的提交列表 (保持原顺序), 保留提交哈希 -> 被合并的重复提交哈希列表)
+        """
+        if patch_ids is None:
+            patch_ids = self.get_patch_ids([commit.hash for commit in commits])
         
-        return stats_info
+        canonical: Dict[str, GitCommit] = {}
+        for commit in reversed(commits):
+            patch_id = patch_ids.get(commit.hash)
+            if patch_id is not None:
+                canonical.setdefault(patch_id, commit)
+        
+        unique_commits = []
+        duplicates: Dict[str, List[str]] = {}
+        for commit in commits:
+            patch_id = patch_ids.get(commit.hash)
+            kept = canonical.get(patch_id) if patch_id is not None else None
+            if kept is not None and kept.hash != commit.hash:
+                duplicates.setdefault(kept.hash, []).append(commit.hash)
+                continue
+            unique_commits.append(commit)
+        
+        return unique_commits, duplicates
     
     def get_files_by_commit_prefix(self, prefix: str, 
                                  include_dependencies: bool = True,
-                                 since: Optional[str] = None) -> Dict[str, Any]:
+                                 since: Optional[str] = None,
+                                 dependency_depth: int = 1,
+                                 direction: str = 'forward',
+                                 max_dependency_files: Optional[int] = 200) -> Dict[str, Any]:
         """
         根据提交前缀获取相关的所有文件
         
@@ -347,12 +1714,18 @@ class GitAnalyzer:
             prefix: 提交消息前缀
             include_dependencies: 是否包含依赖文件
             since: 时间范围限制
+            dependency_depth: 依赖展开层数
+            direction: 依赖方向，'forward' (被导入的文件)、'reverse' (导入方) 或 'both'
+            max_dependency_files: 依赖展开文件数量上限，None 表示不限制
             
         Returns:
             包含相关文件和分析结果的字典
         """
-        # 1. 查找相关提交
+        # 1. 查找相关提交 (启用时合并 cherry-pick/变基产生的重复提交)
         commits = self.get_commits_by_prefix(prefix, since=since)
+        duplicate_commits: Dict[str, List[str]] = {}
+        if self.dedupe_patches and commits:
+            commits, duplicate_commits = self.collapse_duplicate_commits(commits)
         
         if not commits:
             return {
@@ -361,6 +1734,7 @@ class GitAnalyzer:
                 'direct_files': set(),
                 'related_files': set(),
                 'file_changes': {},
+                'duplicate_commits': duplicate_commits,
                 'summary': {
                     'total_commits': 0,
                     'total_files': 0,
@@ -383,8 +1757,12 @@ class GitAnalyzer:
         
         # 4. 查找相关文件 (如果启用依赖分析)
         related_files = set(direct_files)
+        dependencies_truncated = False
         if include_dependencies:
-            related_files.update(self._find_dependency_files(direct_files))
+            dependency_files, dependencies_truncated = self.expand_dependency_files(
+                direct_files, dependency_depth, direction, max_dependency_files
+            )
+            related_files.update(dependency_files)
         
         return {
             'prefix': prefix,
@@ -392,80 +1770,106 @@ class GitAnalyzer:
             'direct_files': direct_files,
             'related_files': related_files,
             'file_changes': file_changes,
+            'dependencies_truncated': dependencies_truncated,
+            'duplicate_commits': duplicate_commits,
             'summary': {
                 'total_commits': len(commits),
                 'total_files': len(related_files),
                 'total_additions': total_additions,
                 'total_deletions': total_deletions,
-                'time_range': {
-                    'start': min(c.date for c in commits) if commits else None,
-                    'end': max(c.date for c in commits) if commits else None
-                }
+                'time_range': _commit_time_range(commits)
             }
         }
     
-    def _get_commit_details(self, commit_hash: str) -> GitCommit:
+    def resolve_range(self, range_spec: str) -> Tuple[str, str, str]:
         """
-        获取提交的详细信息
+        解析提交范围
+        
+        'base..head' 与 'base...head' 都按拉取请求的视角处理: 审查 head 上有而 base 上没有的提交，
+        净变更以二者的合并基准为起点 (base 分支上的后续提交不会混入)。只给出 'base' 时 head 为HEAD。
         
         Args:
-            commit_hash: 提交哈希值
+            range_spec: 提交范围 (如 'origin/main..HEAD')
             
         Returns:
-            详细的提交信息
-        """
-        # 获取基本信息
-        basic_info = self._run_git_command([
-            'show', '--pretty=format:%H|%an|%ae|%ad|%s', '--date=iso', 
-            '--name-only', commit_hash
-        ])
-        
-        lines = basic_info.split('\n')
-        header = lines[0].split('|', 4)
-        
-        commit_hash, author, email, date_str, message = header
-        commit_date = datetime.fromisoformat(date_str.replace(' ', 'T', 1))
-        
-        # 获取变更的文件列表 - 修复：应该从第1行开始，而不是第2行
-        files_changed = [line.strip() for line in lines[1:] if line.strip()]
-        
-        # 获取统计信息
-        stats = self._run_git_command(['show', '--stat', '--format=', commit_hash])
-        additions, deletions = self._parse_stats(stats)
-        
-        return GitCommit(
-            hash=commit_hash,
-            author=author,
-            email=email,
-            date=commit_date,
-            message=message,
-            files_changed=files_changed,
-            additions=additions,
-            deletions=deletions
-        )
+            (base 提交哈希, head 提交哈希, 合并基准哈希)，历史不相交时合并基准为空树
+        """
+        for separator in ('...', '..'):
+            if separator in range_spec:
+                base_rev, head_rev = range_spec.split(separator, 1)
+                break
+        else:
+            base_rev, head_rev = range_spec, ''
+        
+        base = self.resolve_revision(base_rev or 'HEAD')
+        head = self.resolve_revision(head_rev or 'HEAD')
+        try:
+            merge_base = self._run_git_command(['merge-base', base, head]) or _EMPTY_TREE
+        except RuntimeError:
+            merge_base = _EMPTY_TREE
+        return base, head, merge_base
     
-    def _parse_stats(self, stats_output: str) -> Tuple[int, int]:
-        """解析Git统计信息"""
-        additions = deletions = 0
+    def get_files_by_range(self, range_spec: str,
+                           include_dependencies: bool = True,
+                           dependency_depth: int = 1,
+                           direction: str = 'forward',
+                           max_dependency_files: Optional[int] = 200) -> Dict[str, Any]:
+        """
+        获取提交范围内的提交与变更文件
         
-        # 查找统计行，格式如: "2 files changed, 10 insertions(+), 5 deletions(-)"
-        pattern = r'(\d+)\s+insertion.*?(\d+)\s+deletion'
-        match = re.search(pattern, stats_output)
+        提交由一次 'git log head ^base' 枚举，变更文件由一次合并基准到 head 的 git diff 得到，
+        不按时间窗口扫描历史。范围内新增后又删除的文件不在变更文件中。
         
-        if match:
-            additions = int(match.group(1))
-            deletions = int(match.group(2))
-        else:
-            # 单独查找插入和删除
-            insert_match = re.search(r'(\d+)\s+insertion', stats_output)
-            delete_match = re.search(r'(\d+)\s+deletion', stats_output)
+        Args:
+            range_spec: 提交范围 (见 resolve_range)
+            include_dependencies: 是否包含依赖文件
+            dependency_depth: 依赖展开层数
+            direction: 依赖方向，'forward'、'reverse' 或 'both'
+            max_dependency_files: 依赖展开文件数量上限，None 表示不限制
             
-            if insert_match:
-                additions = int(insert_match.group(1))
-            if delete_match:
-                deletions = int(delete_match.group(1))
+        Returns:
+            与 get_files_by_commit_prefix 结构相同的字典，另含 'range'、'base'、'head'、'merge_base'
+        """
+        base, head, merge_base = self.resolve_range(range_spec)
+        
+        commits = list(self.backend.iter_commits([head, f'^{base}']))
+        duplicate_commits: Dict[str, List[str]] = {}
+        if self.dedupe_patches and commits:
+            commits, duplicate_commits = self.collapse_duplicate_commits(commits)
+        
+        # 合并基准到 head 的净变更 (命令行后端一次 git diff 取得 raw 与 numstat)
+        net_changes = self.backend.diff_changes(merge_base, head)
+        direct_files = {change.file_path for change in net_changes}
+        
+        related_files = set(direct_files)
+        dependencies_truncated = False
+        if include_dependencies and direct_files:
+            dependency_files, dependencies_truncated = self.expand_dependency_files(
+                direct_files, dependency_depth, direction, max_dependency_files
+            )
+            related_files.update(dependency_files)
         
-        return additions, deletions
+        return {
+            'prefix': range_spec,
+            'range': range_spec,
+            'base': base,
+            'head': head,
+            'merge_base': merge_base,
+            'commits': commits,
+            'direct_files': direct_files,
+            'related_files': related_files,
+            'file_changes': self.get_file_changes_by_commits(commits),
+            'net_changes': net_changes,
+            'dependencies_truncated': dependencies_truncated,
+            'duplicate_commits': duplicate_commits,
+            'summary': {
+                'total_commits': len(commits),
+                'total_files': len(related_files),
+                'total_additions': sum(change.additions for change in net_changes),
+                'total_deletions': sum(change.deletions for change in net_changes),
+                'time_range': _commit_time_range(commits)
+            }
+        }
     
     def get_file_changes_by_commits(self, commits: List[GitCommit]) -> Dict[str, List[GitFileChange]]:
         """
@@ -479,8 +1883,12 @@ class GitAnalyzer:
         """
         file_changes = {}
         
+        # 单次摄取得到的提交已带有文件变更详情；其余提交由后端批量补齐
+        missing_hashes = [commit.hash for commit in commits if not commit.file_changes]
+        fetched_changes = self.backend.get_commits_changes(missing_hashes)
+        
         for commit in commits:
-            commit_changes = self._get_commit_file_changes(commit.hash)
+            commit_changes = commit.file_changes or fetched_changes.get(commit.hash, [])
             
             for change in commit_changes:
                 if change.file_path not in file_changes:
@@ -489,63 +1897,6 @@ class GitAnalyzer:
         
         return file_changes
     
-    def _get_commit_file_changes(self, commit_hash: str) -> List[GitFileChange]:
-        """获取单个提交的文件变更"""
-        try:
-            # 使用 --numstat 获取详细的变更统计
-            output = self._run_git_command([
-                'show', '--numstat', '--name-status', '--format=', commit_hash
-            ])
-            
-            changes = []
-            lines = [line.strip() for line in output.split('\n') if line.strip()]
-            
-            # 解析numstat输出 (格式: additions deletions filename)
-            numstat_lines = []
-            namestatus_lines = []
-            
-            for line in lines:
-                if '\t' in line and line.split('\t')[0].isdigit():
-                    numstat_lines.append(line)
-                elif line[0] in 'AMDRC':
-                    namestatus_lines.append(line)
-            
-            # 合并numstat和name-status信息
-            for i, numstat_line in enumerate(numstat_lines):
-                parts = numstat_line.split('\t')
-                if len(parts) >= 3:
-                    additions = int(parts[0]) if parts[0] != '-' else 0
-                    deletions = int(parts[1]) if parts[1] != '-' else 0
-                    file_path = parts[2]
-                    
-                    # 查找对应的状态信息
-                    change_type = 'M'  # 默认为修改
-                    old_path = None
-                    
-                    if i < len(namestatus_lines):
-                        status_line = namestatus_lines[i]
-                        change_type = status_line[0]
-                        
-                        if change_type == 'R':  # 重命名
-                            status_parts = status_line.split('\t')
-                            if len(status_parts) >= 3:
-                                old_path = status_parts[1]
-                                file_path = status_parts[2]
-                    
-                    changes.append(GitFileChange(
-                        file_path=file_path,
-                        change_type=change_type,
-                        additions=additions,
-                        deletions=deletions,
-                        old_path=old_path
-                    ))
-            
-            return changes
-            
-        except Exception as e:
-            print(f"警告: 无法获取提交 {commit_hash} 的文件变更: {e}")
-            return []
-    
     def get_related_files_by_requirement(self, requirement_pattern: str,
                                        include_dependencies: bool = True,
                                        since: Optional[str] = None) -> Dict[str, Any]:
@@ -606,10 +1957,7 @@ class GitAnalyzer:
                 'total_files': len(related_files),
                 'total_additions': total_additions,
                 'total_deletions': total_deletions,
-                'time_range': {
-                    'start': min(c.date for c in commits) if commits else None,
-                    'end': max(c.date for c in commits) if commits else None
-                }
+                'time_range': _commit_time_range(commits)
             }
         }
     
@@ -644,48 +1992,15 @@ class GitAnalyzer:
         """
         使用正则表达式模式匹配获取文件 (原有逻辑)
         """
-        command = ['log', '--oneline', '--pretty=format:%H|%an|%ae|%ad|%s', 
-                  '--date=iso']
-        
-        if since:
-            command.extend(['--since', since])
-        
-        output = self._run_git_command(command)
-        if not output:
-            return {
-                'commits': [],
-                'direct_files': set(),
-                'related_files': set(),
-                'file_changes': {},
-                'summary': {
-                    'total_commits': 0,
-                    'total_files': 0,
-                    'total_additions': 0,
-                    'total_deletions': 0
-                }
-            }
-        
-        commits = []
         pattern_regex = re.compile(pattern, re.IGNORECASE)
-        
-        for line in output.split('\n'):
-            if not line.strip():
-                continue
-                
-            parts = line.split('|', 4)
-            if len(parts) != 5:
-                continue
-                
-            commit_hash, author, email, date_str, message = parts
-            
-            if pattern_regex.search(message):
-                try:
-                    commit_date = datetime.fromisoformat(date_str.replace(' ', 'T', 1))
-                except ValueError:
-                    commit_date = datetime.now()
-                
-                detailed_commit = self._get_commit_details(commit_hash)
-                commits.append(detailed_commit)
+        grep_pattern = python_regex_to_grep(pattern)
+        commits = list(self._iter_commit_source(
+            since, message_filter=lambda message: bool(pattern_regex.search(message)),
+            grep_patterns=[grep_pattern] if grep_pattern else None
+        ))
+        duplicate_commits: Dict[str, List[str]] = {}
+        if self.dedupe_patches and commits:
+            commits, duplicate_commits = self.collapse_duplicate_commits(commits)
         
         if not commits:
             return {
@@ -693,6 +2008,7 @@ class GitAnalyzer:
                 'direct_files': set(),
                 'related_files': set(),
                 'file_changes': {},
+                'duplicate_commits': duplicate_commits,
                 'summary': {
                     'total_commits': 0,
                     'total_files': 0,
@@ -723,167 +2039,218 @@ class GitAnalyzer:
             'direct_files': direct_files,
             'related_files': related_files,
             'file_changes': file_changes,
+            'duplicate_commits': duplicate_commits,
             'summary': {
                 'total_commits': len(commits),
                 'total_files': len(related_files),
                 'total_additions': total_additions,
                 'total_deletions': total_deletions,
-                'time_range': {
-                    'start': min(c.date for c in commits) if commits else None,
-                    'end': max(c.date for c in commits) if commits else None
-                }
+                'time_range': _commit_time_range(commits)
             }
         }
 
-    def _find_dependency_files(self, files: Set[str]) -> Set[str]:
+    def _find_dependency_files(self, files: Set[str], depth: int = 1,
+                               direction: str = 'forward',
+                               max_files: Optional[int] = None) -> Set[str]:
         """
-        查找依赖文件 (简单实现，可根据项目类型扩展)
+        查找依赖文件
         
         Args:
             files: 直接修改的文件集合
+            depth: 依赖展开层数
+            direction: 'forward' (被导入的文件)、'reverse' (导入方) 或 'both'
+            max_files: 展开文件数量上限
             
         Returns:
             依赖文件集合
         """
-        dependencies = set()
+        return self.expand_dependency_files(files, depth, direction, max_files)[0]
+    
+    def expand_dependency_files(self, files: Set[str], depth: int = 1,
+                                direction: str = 'forward',
+                                max_files: Optional[int] = None) -> Tuple[Set[str], bool]:
+        """
+        基于仓库依赖图展开相关文件
         
-        for file_path in files:
-            if not os.path.exists(os.path.join(self.repo_path, file_path)):
-                continue
-                
-            # 根据文件类型查找依赖
-            if file_path.endswith('.py'):
-                dependencies.update(self._find_python_dependencies(file_path))
-            elif file_path.endswith(('.js', '.ts')):
-                dependencies.update(self._find_js_dependencies(file_path))
-            elif file_path.endswith(('.java')):
-                dependencies.update(self._find_java_dependencies(file_path))
+        Args:
+            files: 起始文件集合
+            depth: 依赖展开层数，1 表示只取直接依赖
+            direction: 'forward' (被导入的文件)、'reverse' (导入方) 或 'both'
+            max_files: 展开文件数量上限，None 表示不限制
+            
+        Returns:
+            (依赖文件集合, 是否因达到上限而截断)
+        """
+        dependencies, truncated = self.dependency_graph.expand(
+            files, depth=depth, direction=direction, max_files=max_files
+        )
         
-        return dependencies
+        # 保存本次新解析的导入语句，下次运行直接命中缓存
+        if self._dependency_cache is not None:
+            self._dependency_cache.flush()
+        
+        return dependencies, truncated
+    
+    def _resolve_file_dependencies(self, file_path: str) -> Set[str]:
+        """根据文件类型解析单个文件直接依赖的仓库内文件 (文件不在 HEAD 中时为空)"""
+        if file_path not in self.dependency_source.blobs:
+            return set()
+        
+        if file_path.endswith('.py'):
+            return self._find_python_dependencies(file_path)
+        elif file_path.endswith(_JS_SOURCE_EXTENSIONS):
+            return self._find_js_dependencies(file_path)
+        elif file_path.endswith(('.java')):
+            return self._find_java_dependencies(file_path)
+        return set()
     
     def _find_python_dependencies(self, file_path: str) -> Set[str]:
-        """查找Python文件的依赖"""
-        dependencies = set()
-        full_path = os.path.join(self.repo_path, file_path)
+        """
+        查找Python文件的依赖
         
+        基于 ast 提取导入 (忽略字符串和注释)，解析相对导入与包根目录，
+        源码取自 HEAD 提交，提取结果按 blob 持久化缓存。
+        """
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 查找import语句
-            import_pattern = r'from\s+(\S+)\s+import|import\s+(\S+)'
-            matches = re.findall(import_pattern, content)
-            
-            for match in matches:
-                module = match[0] or match[1]
-                if module and not module.startswith('.'):
-                    # 尝试找到对应的本地文件
-                    possible_paths = [
-                        f"{module.replace('.', '/')}.py",
-                        f"{module.replace('.', '/')}/__init__.py"
-                    ]
-                    
-                    for possible_path in possible_paths:
-                        if os.path.exists(os.path.join(self.repo_path, possible_path)):
-                            dependencies.add(possible_path)
-            
+            return self.python_resolver.resolve(file_path)
         except Exception as e:
             print(f"警告: 无法分析文件 {file_path} 的依赖: {e}")
-        
-        return dependencies
+            return set()
     
     def _find_js_dependencies(self, file_path: str) -> Set[str]:
-        """查找JavaScript/TypeScript文件的依赖"""
-        dependencies = set()
-        full_path = os.path.join(self.repo_path, file_path)
+        """
+        查找JavaScript/TypeScript文件的依赖
         
+        支持相对路径、tsconfig paths/baseUrl 别名、目录 index 文件以及
+        工作区包的 package.json exports，候选文件在内存中的仓库文件列表里查找。
+        """
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 查找import/require语句
-            import_patterns = [
-                r'import.*from\s+[\'"]([^\'"]+)[\'"]',
-                r'require\s*\(\s*[\'"]([^\'"]+)[\'"]\s*\)'
-            ]
-            
-            for pattern in import_patterns:
-                matches = re.findall(pattern, content)
-                for match in matches:
-                    if match.startswith('.'):
-                        # 相对路径导入
-                        base_dir = os.path.dirname(file_path)
-                        resolved_path = os.path.normpath(
-                            os.path.join(base_dir, match)
-                        )
-                        
-                        # 尝试不同的扩展名
-                        for ext in ['.js', '.ts', '.jsx', '.tsx']:
-                            test_path = f"{resolved_path}{ext}"
-                            if os.path.exists(os.path.join(self.repo_path, test_path)):
-                                dependencies.add(test_path)
-                                break
-        
+            return self.js_resolver.resolve(file_path)
         except Exception as e:
             print(f"警告: 无法分析文件 {file_path} 的依赖: {e}")
-        
-        return dependencies
+            return set()
     
     def _find_java_dependencies(self, file_path: str) -> Set[str]:
-        """查找Java文件的依赖"""
-        dependencies = set()
-        full_path = os.path.join(self.repo_path, file_path)
+        """
+        查找Java文件的依赖
         
+        基于 package 声明建立的类索引解析单类型、通配符和静态导入以及同包引用，
+        适用于 src/main/java 与多模块布局。
+        """
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 查找import语句
-            import_pattern = r'import\s+([a-zA-Z_][a-zA-Z0-9_.]*);'
-            matches = re.findall(import_pattern, content)
-            
-            for match in matches:
-                # 转换包名为文件路径
-                path_parts = match.split('.')
-                possible_path = '/'.join(path_parts) + '.java'
-                
-                if os.path.exists(os.path.join(self.repo_path, possible_path)):
-                    dependencies.add(possible_path)
-        
+            return self.java_resolver.resolve(file_path)
         except Exception as e:
             print(f"警告: 无法分析文件 {file_path} 的依赖: {e}")
+            return set()
+
+
+def _walk_history_shard(analyzer_options: Dict[str, Any], log_args: List[str]) -> List[GitCommit]:
+    """
+    历史分片的子进程入口: 遍历并解析一个时间窗口内的提交
+    
+    Args:
+        analyzer_options: 重建 GitAnalyzer 所需的参数 (仓库路径、路径范围、合并提交策略、编码)
+        log_args: 分片的 git log 参数 (时间窗口、修订、作者等)
         
-        return dependencies
+    Returns:
+        按 git log 顺序排列的提交列表
+    """
+    with GitAnalyzer(**analyzer_options) as analyzer:
+        return list(analyzer._iter_log_commits(log_args))
 
 
 class RequirementAnalyzer:
     """需求分析器 - 基于前缀匹配"""
     
-    def __init__(self, repo_path: str):
-        self.git_analyzer = GitAnalyzer(repo_path)
+    def __init__(self, repo_path: str, git_analyzer: Optional[GitAnalyzer] = None,
+                 use_index: bool = False):
+        """
+        初始化需求分析器
+        
+        Args:
+            repo_path: Git仓库路径
+            git_analyzer: 共享的Git分析器，未指定时新建
+            use_index: 新建Git分析器时是否启用持久化提交索引
+        """
+        self.git_analyzer = git_analyzer or GitAnalyzer(repo_path, use_index=use_index)
     
     def analyze_requirement_by_prefix(self, prefix: str, 
-                                    since: Optional[str] = '1 month ago') -> Dict[str, Any]:
+                                    since: Optional[str] = '1 month ago',
+                                    net_diff: bool = False) -> Dict[str, Any]:
         """
         通过提交前缀分析特定需求的代码变更
         
         Args:
             prefix: 提交消息前缀 (如: 'feat:', 'JIRA-123:', 'fix:')
             since: 时间范围
+            net_diff: 是否计算每个文件在全部匹配提交上的净差异 (结果键 'net_diffs')
             
         Returns:
             需求分析结果
         """
         result = self.git_analyzer.get_files_by_commit_prefix(prefix, since=since)
         
-        return {
+        analysis = {
             'prefix': prefix,
             'commits': result['commits'],
             'files': result['related_files'],
             'direct_files': result['direct_files'],
             'file_changes': result['file_changes'],
+            'duplicate_commits': result.get('duplicate_commits', {}),
+            'summary': result['summary']
+        }
+        if net_diff:
+            analysis['net_diffs'] = self.git_analyzer.get_net_file_diffs(
+                result['commits'], result['direct_files']
+            )
+        return analysis
+    
+    def analyze_range(self, range_spec: str, net_diff: bool = False) -> Dict[str, Any]:
+        """
+        分析提交范围 (如 'origin/main..HEAD') 内的代码变更
+        
+        Args:
+            range_spec: 提交范围，'base..head' / 'base...head' / 'base'
+            net_diff: 是否计算合并基准到 head 的净差异 (结果键 'net_diffs')
+            
+        Returns:
+            与 analyze_requirement_by_prefix 结构相同的分析结果，另含 'base'、'head'、'merge_base'
+        """
+        result = self.git_analyzer.get_files_by_range(range_spec)
+        
+        analysis = {
+            'prefix': range_spec,
+            'base': result['base'],
+            'head': result['head'],
+            'merge_base': result['merge_base'],
+            'commits': result['commits'],
+            'files': result['related_files'],
+            'direct_files': result['direct_files'],
+            'file_changes': result['file_changes'],
+            'duplicate_commits': result['duplicate_commits'],
             'summary': result['summary']
         }
+        if net_diff:
+            # 范围内所有文件共用同一对基准与终点，一次 git diff 即可；
+            # 重命名文件连同原路径一起比较，片段相对原文件给出而不是整个文件新增
+            diff_paths = set(result['direct_files'])
+            diff_paths.update(change.old_path for change in result['net_changes'] if change.old_path)
+            hunks_by_file = self.git_analyzer.get_diff_hunks_between(
+                result['merge_base'], result['head'], sorted(diff_paths)
+            )
+            analysis['net_diffs'] = {
+                file_path: {
+                    'base': result['merge_base'],
+                    'head': result['head'],
+                    'commits': [commit.hash for commit in result['commits']
+                                if file_path in commit.files_changed],
+                    'interleaved': False,
+                    'hunks': hunks_by_file.get(file_path, []),
+                    'content': None
+                }
+                for file_path in result['direct_files']
+            }
+        return analysis
     
     def analyze_multiple_prefixes(self, prefixes: List[str],
                                 since: Optional[str] = '1 month ago') -> Dict[str, Any]:
@@ -901,6 +2268,27 @@ class RequirementAnalyzer:
         prefix_commits = self.git_analyzer.get_commits_by_multiple_prefixes_fast(
             prefixes, since=since
         )
+        return self._combine_prefix_commits(prefixes, prefix_commits)
+    
+    def _combine_prefix_commits(self, prefixes: List[str],
+                                prefix_commits: Dict[str, List[GitCommit]]) -> Dict[str, Any]:
+        """
+        汇总按前缀 (或编号) 分组的提交: 计算各组的文件与依赖，并合并为整体结果
+        
+        Args:
+            prefixes: 查询的前缀列表
+            prefix_commits: 前缀到提交列表的映射
+            
+        Returns:
+            analyze_multiple_prefixes 结构的分析结果
+        """
+        # 启用时合并 cherry-pick/变基产生的重复提交，patch-id 对全部提交只计算一次
+        patch_ids = None
+        duplicate_commits: Dict[str, List[str]] = {}
+        if self.git_analyzer.dedupe_patches:
+            patch_ids = self.git_analyzer.get_patch_ids(
+                [commit.hash for commits in prefix_commits.values() for commit in commits]
+            )
         
         all_commits = []
         all_files = set()
@@ -908,6 +2296,13 @@ class RequirementAnalyzer:
         prefix_results = {}
         
         for prefix, commits in prefix_commits.items():
+            if patch_ids is not None and commits:
+                commits, prefix_duplicates = self.git_analyzer.collapse_duplicate_commits(commits, patch_ids)
+                for kept_hash, duplicate_hashes in prefix_duplicates.items():
+                    duplicate_commits.setdefault(kept_hash, []).extend(duplicate_hashes)
+            else:
+                prefix_duplicates = {}
+            
             if commits:
                 # 计算文件信息
                 direct_files = set()
@@ -927,15 +2322,13 @@ class RequirementAnalyzer:
                     'commits': commits,
                     'files': related_files,
                     'direct_files': direct_files,
+                    'duplicate_commits': prefix_duplicates,
                     'summary': {
                         'total_commits': len(commits),
                         'total_files': len(related_files),
                         'total_additions': total_additions,
                         'total_deletions': total_deletions,
-                        'time_range': {
-                            'start': min(c.date for c in commits) if commits else None,
-                            'end': max(c.date for c in commits) if commits else None
-                        }
+                        'time_range': _commit_time_range(commits)
                     }
                 }
                 
@@ -948,6 +2341,15 @@ class RequirementAnalyzer:
         for commit in all_commits:
             unique_commits[commit.hash] = commit
         unique_commits_list = list(unique_commits.values())
+        if patch_ids is not None:
+            # 不同前缀下的等价提交同样合并
+            unique_commits_list.sort(key=lambda commit: commit.committed_at, reverse=True)
+            unique_commits_list, cross_prefix_duplicates = self.git_analyzer.collapse_duplicate_commits(
+                unique_commits_list, patch_ids
+            )
+            for kept_hash, duplicate_hashes in cross_prefix_duplicates.items():
+                merged = duplicate_commits.setdefault(kept_hash, [])
+                merged.extend(commit_hash for commit_hash in duplicate_hashes if commit_hash not in merged)
         
         return {
             'prefixes': prefixes,
@@ -955,16 +2357,14 @@ class RequirementAnalyzer:
             'combined_commits': unique_commits_list,
             'combined_files': all_files,
             'combined_direct_files': all_direct_files,
+            'duplicate_commits': duplicate_commits,
             'summary': {
                 'total_commits': len(unique_commits_list),
                 'total_files': len(all_files),
                 'total_direct_files': len(all_direct_files),
                 'total_additions': sum(c.additions for c in unique_commits_list),
                 'total_deletions': sum(c.deletions for c in unique_commits_list),
-                'date_range': {
-                    'start': min(c.date for c in unique_commits_list) if unique_commits_list else None,
-                    'end': max(c.date for c in unique_commits_list) if unique_commits_list else None
-                }
+                'date_range': _commit_time_range(unique_commits_list)
             }
         }
     
@@ -972,30 +2372,46 @@ class RequirementAnalyzer:
                           patterns: Optional[List[str]] = None,
                           since: Optional[str] = '1 month ago') -> Dict[str, Any]:
         """
-        分析特定需求的代码变更 (保留向后兼容性)
+        分析特定需求的代码变更
+        
+        需求ID符合 ticket_patterns 时，查找标题或正文任意位置引用该编号的提交
+        (启用索引时为一次倒排表查询)；否则回退为按常见前缀写法匹配。
         
         Args:
             requirement_id: 需求ID
-            patterns: 额外的搜索模式
+            patterns: 额外的提交前缀
             since: 时间范围
             
         Returns:
             需求分析结果
         """
-        # 优先使用前缀匹配
         if patterns is None:
             patterns = []
         
-        # 构建前缀列表
-        prefixes = [
-            f"{requirement_id}:",
-            f"feat({requirement_id}):",
-            f"fix({requirement_id}):",
-            f"feat: {requirement_id}",
-            f"fix: {requirement_id}",
-        ] + patterns
-        
-        return self.analyze_multiple_prefixes(prefixes, since)
+        if not self.git_analyzer.ticket_extractor.is_ticket(requirement_id):
+            # 编号不符合 ticket_patterns 时无法走编号倒排表，按常见的前缀写法匹配
+            prefixes = [
+                f"{requirement_id}:",
+                f"feat({requirement_id}):",
+                f"fix({requirement_id}):",
+                f"feat: {requirement_id}",
+                f"fix: {requirement_id}",
+            ] + patterns
+            result = self.analyze_multiple_prefixes(prefixes, since)
+            result['requirement_id'] = requirement_id
+            return result
+        
+        # 编号出现在标题或正文任意位置的提交，额外模式仍按前缀匹配
+        prefix_commits = {}
+        ticket_commits = self.git_analyzer.get_commits_by_ticket(requirement_id, since=since)
+        if ticket_commits:
+            prefix_commits[requirement_id] = ticket_commits
+        if patterns:
+            prefix_commits.update(self.git_analyzer.get_commits_by_multiple_prefixes_fast(patterns, since=since))
+        
+        result = self._combine_prefix_commits([requirement_id] + patterns, prefix_commits)
+        result['requirement_id'] = requirement_id
+        return result
     
     def export_analysis_report(self, analysis_result: Dict[str, Any], 
                              output_file: str = None) -> str:
@@ -1040,7 +2456,7 @@ class RequirementAnalyzer:
         
         # 提交详情
         report_lines.append("## 提交详情")
-        for commit in sorted(analysis_result['commits'], key=lambda x: x.date, reverse=True):
+        for commit in sorted(analysis_result['commits'], key=attrgetter('authored_at'), reverse=True):
             report_lines.append(f"### {commit.hash[:8]} - {commit.message}")
             report_lines.append(f"- **作者**: {commit.author} ({commit.email})")
             report_lines.append(f"- **时间**: {commit.date.strftime('%Y-%m-%d %H:%M:%S')}")
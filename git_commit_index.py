@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+持久化的Git提交元数据索引
+
+将提交哈希、作者、时间、标题以及每个文件的 numstat 保存在 SQLite 中，
+默认位于 .git/code_reviewer/commit_index.sqlite。已摄取的提交与分支无关地保留，
+并记录已完整索引的提交端点 (tips)：HEAD 变化 (前进、切换分支、改写历史) 时只摄取
+'HEAD --not <已知端点>' 范围内尚未索引的提交。当前 HEAD 可达的提交及其 git log 顺序
+由一次 git rev-list 记录 (不计算差异，代价远小于摄取)，查询只返回这些提交，
+因此之前分支上的提交不会混入结果。之后的前缀、时间范围和需求查询直接从索引读取，
+无需重新遍历 git log。
+
+另外维护工单/需求编号到提交的倒排表，编号从完整提交消息 (标题与正文) 中
+按分析器的 ticket_patterns 提取，模式变化时对已索引的历史重新提取。
+"""
+
+import json
+import os
+import re
+import sqlite3
+from typing import Callable, Dict, Iterator, List, Optional, TYPE_CHECKING
+
+from git_commit_analyzer import GitCommit, GitFileChange, _LOG_RECORD_SEP_BYTES
+
+if TYPE_CHECKING:
+    from git_commit_analyzer import GitAnalyzer
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS commits (
+    hash TEXT PRIMARY KEY,
+    author TEXT NOT NULL,
+    email TEXT NOT NULL,
+    authored_at INTEGER NOT NULL,
+    author_tz INTEGER NOT NULL,
+    committed_at INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    subject_key TEXT NOT NULL,
+    additions INTEGER NOT NULL,
+    deletions INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_commits_time ON commits (committed_at);
+CREATE INDEX IF NOT EXISTS idx_commits_subject_key ON commits (subject_key);
+CREATE TABLE IF NOT EXISTS tips (
+    hash TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS reachable (
+    hash TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    hash TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    file_path TEXT NOT NULL,
+    change_type TEXT NOT NULL,
+    old_path TEXT,
+    additions INTEGER NOT NULL,
+    deletions INTEGER NOT NULL,
+    PRIMARY KEY (hash, position)
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (ticket, hash)
+) WITHOUT ROWID;
+"""
+
+
+
+def _regexp(pattern: str, value: str) -> bool:
+    """SQLite REGEXP 运算符的实现 (编译结果由 re 模块缓存)"""
+    return re.search(pattern, value) is not None
+
+
+def _key_upper_bound(key: str) -> str:
+    """以 key 开头的字符串都小于返回值 (按码位比较，与 SQLite 的 BINARY 排序一致)"""
+    return key[:-1] + chr(ord(key[-1]) + 1)
+
+
+class CommitIndex:
+    """基于 SQLite 的提交元数据索引"""
+    
+    def __init__(self, analyzer: 'GitAnalyzer', index_path: Optional[str] = None):
+        """
+        打开 (必要时创建) 提交索引
+        
+        Args:
+            analyzer: 所属的Git分析器，用于执行Git命令和摄取提交
+            index_path: 索引数据库路径，默认为 <git_dir>/code_reviewer/commit_index.sqlite
+        """
+        self.analyzer = analyzer
+        if index_path is None:
+            index_path = os.path.join(analyzer.git_dir, 'code_reviewer', 'commit_index.sqlite')
+        self.index_path = index_path
+        
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        self._conn = sqlite3.connect(index_path)
+        self._conn.create_function('REGEXP', 2, _regexp)
+        self._conn.executescript(_SCHEMA)
+        
+        ticket_patterns = json.dumps(analyzer.ticket_extractor.patterns)
+        if self._get_meta('ticket_patterns') != ticket_patterns:
+            # 编号模式变化: 按新模式重新提取已索引历史中的编号
+            with self._conn:
+                self._conn.execute('DELETE FROM tickets')
+                tips = self._get_tips()
+                if tips:
+                    self._index_tickets(tips)
+                self._set_meta('ticket_patterns', ticket_patterns)
+    
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value)
+        )
+    
+    def _clear(self):
+        """清空已索引的提交"""
+        self._conn.execute('DELETE FROM commits')
+        self._conn.execute('DELETE FROM files')
+        self._conn.execute('DELETE FROM tickets')
+        self._conn.execute('DELETE FROM tips')
+        self._conn.execute('DELETE FROM reachable')
+        self._conn.execute("DELETE FROM meta WHERE key = 'indexed_head'")
+    
+    def _get_tips(self) -> List[str]:
+        """已完整索引 (其全部祖先都已摄取) 的提交端点"""
+        return [row[0] for row in self._conn.execute('SELECT hash FROM tips')]
+    
+    @property
+    def indexed_head(self) -> Optional[str]:
+        """上次刷新时的 HEAD 提交哈希"""
+        return self._get_meta('indexed_head')
+    
+    def refresh(self) -> int:
+        """
+        增量刷新索引
+        
+        HEAD 未变化时只需一次 rev-parse。HEAD 变化时只摄取 'HEAD --not <已知端点>'
+        范围内的提交 (切换到非后代分支也不会重建)，再用一次 git rev-list 记录当前
+        HEAD 可达的提交及其 git log 顺序。
+        
+        Returns:
+            本次新摄取的提交数量
+        """
+        try:
+            head = self.analyzer.resolve_revision('HEAD')
+        except RuntimeError:
+            # 空仓库，尚无提交
+            return 0
+        
+        if head == self.indexed_head:
+            return 0
+        
+        # 端点对应的对象可能已被 gc 回收，排除后其祖先中未被其他端点覆盖的提交会重新摄取
+        tips = self._existing_commits(self._get_tips())
+        revisions = [head] + [f'^{tip}' for tip in tips]
+        
+        commits = list(self.analyzer._iter_log_commits([], stdin_revisions=revisions, scoped=False))
+        reachable = self.analyzer._run_git_bytes(['rev-list', head]).decode('ascii').split()
+        # 只保留互不为祖先的端点，避免端点列表随刷新次数增长
+        tips = self.analyzer._run_git_command(['merge-base', '--independent', head] + tips).split()
+        
+        with self._conn:
+            for commit in commits:
+                self._insert_commit(commit)
+            self._index_tickets(revisions)
+            self._conn.execute('DELETE FROM reachable')
+            self._conn.executemany('INSERT INTO reachable VALUES (?, ?)',
+                                   ((commit_hash, position) for position, commit_hash in enumerate(reachable)))
+            self._conn.execute('DELETE FROM tips')
+            self._conn.executemany('INSERT INTO tips VALUES (?)', ((tip,) for tip in tips))
+            self._set_meta('indexed_head', head)
+        
+        return len(commits)
+    
+    def _existing_commits(self, revisions: List[str]) -> List[str]:
+        """过滤出仓库中仍然存在的提交 (一次 git cat-file --batch-check)"""
+        if not revisions:
+            return []
+        command = ['cat-file', '--batch-check=%(objectname) %(objecttype)']
+        stdin_data = ''.join(f"{revision}\n" for revision in revisions)
+        existing = set()
+        for line in self.analyzer._stream_git_records(command, b'\n', stdin_data=stdin_data):
+            object_name, _, object_type = line.partition(b' ')
+            if object_type == b'commit':
+                existing.add(object_name.decode('ascii'))
+        return [revision for revision in revisions if revision in existing]
+    
+    def _index_tickets(self, revisions: List[str]):
+        """
+        从范围内提交的完整消息中提取编号并写入倒排表
+        
+        只读取提交消息、不计算差异，代价远小于摄取文件变更的 git log。
+        """
+        analyzer = self.analyzer
+        extract = analyzer.ticket_extractor.extract
+        command = ['log', f'--encoding={analyzer.encoding}', '--format=%x1e%H%x00%B', '--stdin']
+        stdin_data = ''.join(f"{revision}\n" for revision in revisions)
+        
+        rows = []
+        for record in analyzer._stream_git_records(command, _LOG_RECORD_SEP_BYTES, stdin_data=stdin_data):
+            commit_hash, _, message = record.partition(b'\x00')
+            commit_hash = commit_hash.decode('ascii')
+            rows.extend((ticket, commit_hash) for ticket in extract(analyzer._decode(message)))
+        self._conn.executemany('INSERT OR IGNORE INTO tickets VALUES (?, ?)', rows)
+    
+    def _insert_commit(self, commit: GitCommit):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (commit.hash, commit.author, commit.email, commit.authored_at, commit.author_tz,
+             commit.committed_at, commit.message, commit.message.lower().strip(),
+             commit.additions, commit.deletions)
+        )
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [
+                (commit.hash, position, change.file_path, change.change_type,
+                 change.old_path, change.additions, change.deletions)
+                for position, change in enumerate(commit.file_changes)
+            ]
+        )
+    
+    def iter_commits(self, since_ts: Optional[int] = None,
+                     until_ts: Optional[int] = None,
+                     author: Optional[str] = None,
+                     message_filter: Optional[Callable[[str], bool]] = None,
+                     ticket: Optional[str] = None,
+                     subject_keys: Optional[List[str]] = None) -> Iterator[GitCommit]:
+        """
+        按 git log 顺序 (最新在前) 查询索引中当前 HEAD 可达的提交
+        
+        时间、作者、编号与标题前缀条件都在 SQL 中筛选，文件变更随提交一次联表读取，
+        结果逐行流式产出；只有 message_filter (如前缀配额) 在 Python 侧检查。
+        
+        Args:
+            since_ts: 提交者时间下限 (含)
+            until_ts: 提交者时间上限 (含)
+            author: 作者正则，与 git log --author 一样匹配 'name <email>'
+            message_filter: 提交标题过滤函数，未通过的提交不构造记录
+            ticket: 只返回消息中引用了该编号的提交 (已标准化的编号)，
+                由倒排表直接定位，不扫描其余提交
+            subject_keys: 标准化 (小写、去除首尾空白) 的标题必须以其中之一开头，
+                按 subject_key 索引范围查询 (见 PrefixMatcher.index_keys)
+        
+        Returns:
+            提交记录迭代器
+        """
+        conditions = []
+        params: List = []
+        if ticket is not None:
+            conditions.append('commits.hash IN (SELECT hash FROM tickets WHERE ticket = ?)')
+            params.append(ticket)
+        if subject_keys is not None:
+            if not subject_keys:
+                return
+            conditions.append('(' + ' OR '.join(['(subject_key >= ? AND subject_key < ?)'] * len(subject_keys)) + ')')
+            for key in subject_keys:
+                params.extend([key, _key_upper_bound(key)])
+        if since_ts is not None:
+            conditions.append('committed_at >= ?')
+            params.append(since_ts)
+        if until_ts is not None:
+            conditions.append('committed_at <= ?')
+            params.append(until_ts)
+        if author:
+            conditions.append("author || ' <' || email || '>' REGEXP ?")
+            params.append(author)
+        
+        # 先筛选提交再按可达顺序排序，文件变更按提交联表读取
+        query = (
+            'SELECT commits.hash, author, email, authored_at, author_tz, committed_at, subject, '
+            'commits.additions, commits.deletions, '
+            'files.file_path, files.change_type, files.old_path, files.additions, files.deletions '
+            'FROM commits JOIN reachable ON reachable.hash = commits.hash '
+            'LEFT JOIN files ON files.hash = commits.hash'
+        )
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY reachable.position, files.position'
+        
+        cursor = self._conn.execute(query, params)
+        try:
+            # 同一提交的行相邻 (按可达顺序排序)，切换提交时产出上一个提交
+            current_hash = None
+            current_row = None
+            file_changes: List[GitFileChange] = []
+            for row in cursor:
+                if row[0] != current_hash:
+                    if current_row is not None:
+                        yield self._build_commit(current_row, file_changes)
+                    # 上一个提交产出后再检查过滤条件 (条件可能随已产出的提交变化，如前缀配额)
+                    current_hash = row[0]
+                    current_row = row if message_filter is None or message_filter(row[6]) else None
+                    file_changes = []
+                if current_row is not None and row[9] is not None:
+                    file_path, change_type, old_path, additions, deletions = row[9:]
+                    file_changes.append(GitFileChange(
+                        file_path=file_path,
+                        change_type=change_type,
+                        additions=additions,
+                        deletions=deletions,
+                        old_path=old_path
+                    ))
+            if current_row is not None:
+                yield self._build_commit(current_row, file_changes)
+        finally:
+            cursor.close()
+    
+    @staticmethod
+    def _build_commit(row, file_changes: List[GitFileChange]) -> GitCommit:
+        """由查询行与文件变更构造提交记录"""
+        (commit_hash, author_name, email, authored_at, author_tz,
+         committed_at, subject, additions, deletions) = row[:9]
+        return GitCommit(
+            hash=commit_hash,
+            author=author_name,
+            email=email,
+            authored_at=authored_at,
+            author_tz=author_tz,
+            message=subject,
+            files_changed=[change.file_path for change in file_changes],
+            additions=additions,
+            deletions=deletions,
+            file_changes=file_changes,
+            committed_at=committed_at
+        )
+    
+    def get_stats(self) -> Dict[str, Optional[str]]:
+        """获取索引状态信息"""
+        commit_count = self._conn.execute('SELECT COUNT(*) FROM commits').fetchone()[0]
+        reachable_count = self._conn.execute('SELECT COUNT(*) FROM reachable').fetchone()[0]
+        ticket_count = self._conn.execute('SELECT COUNT(DISTINCT ticket) FROM tickets').fetchone()[0]
+        return {
+            'index_path': self.index_path,
+            'indexed_head': self.indexed_head,
+            'total_commits': str(commit_count),
+            'reachable_commits': str(reachable_count),
+            'total_tickets': str(ticket_count)
+        }
+    
+    def close(self):
+        """关闭数据库连接"""
+        self._conn.close()
@@ -62,6 +62,14 @@ class MarkdownReportGenerator:
             md_content.append(f"- 发现问题数: {summary.get('total_issues_found', 0)}")
             md_content.append(f"- 高优先级问题: {summary.get('high_priority_issues', 0)}")
         
+        duplicates_section = self._generate_duplicate_commits(review_result.get('duplicate_commits'))
+        if duplicates_section:
+            md_content.append(f"\n{duplicates_section.rstrip()}")
+        
+        commit_reviews_section = self._generate_commit_reviews(review_result.get('commit_reviews'))
+        if commit_reviews_section:
+            md_content.append(f"\n{commit_reviews_section.rstrip()}")
+        
         # 详细审查结果
         md_content.append(f"\n## {self.default_emojis['details']} 详细审查结果")
         
@@ -77,7 +85,7 @@ class MarkdownReportGenerator:
                 for review_type, review_data in file_result['reviews'].items():
                     if 'error' not in review_data:
                         md_content.append(f"\n#### {review_type.replace('_', ' ').title()}")
-                        md_content.append(review_data.get('ai_response', ''))
+                        md_content.append(self._review_text(review_data))
             elif 'review' in file_result:
                 # 单一审查结果
                 md_content.append(f"\n#### 审查结果")
@@ -156,7 +164,14 @@ class MarkdownReportGenerator:
 - **审查文件数**: {result.get('files_reviewed', 0)}
 - **分析提交数**: {result.get('commits_analyzed', 0)}
 - **审查时间**: {result.get('review_time', 'N/A')}
-
+"""
+            duplicates_section = self._generate_duplicate_commits(result.get('duplicate_commits'), level='###')
+            if duplicates_section:
+                report += f"\n{duplicates_section}"
+            commit_reviews_section = self._generate_commit_reviews(result.get('commit_reviews'), level='###')
+            if commit_reviews_section:
+                report += f"\n{commit_reviews_section}"
+            report += f"""
 ### {self.default_emojis['files']} 涉及文件列表
 """
             
@@ -179,6 +194,43 @@ class MarkdownReportGenerator:
         
         return report
     
+    def _generate_duplicate_commits(self, duplicate_commits: Optional[Dict[str, List[str]]],
+                                    level: str = '##') -> str:
+        """生成重复提交 (按 patch-id 合并的 cherry-pick/变基副本) 说明"""
+        if not duplicate_commits:
+            return ""
+        
+        content = f"{level} 🔁 已合并的重复提交\n\n"
+        content += "以下提交与保留的提交内容相同 (patch-id 一致)，只审查了一次：\n\n"
+        for kept_hash, duplicate_hashes in duplicate_commits.items():
+            duplicates = ', '.join(f"`{commit_hash[:8]}`" for commit_hash in duplicate_hashes)
+            content += f"- `{kept_hash[:8]}` ← {duplicates}\n"
+        return content
+    
+    def _generate_commit_reviews(self, commit_reviews: Optional[Dict[str, Dict[str, Any]]],
+                                 level: str = '##') -> str:
+        """生成提交级审查 (commit 模式下整体审查的小提交) 部分，每个提交只输出一次"""
+        if not commit_reviews:
+            return ""
+        
+        content = f"{level} 📦 提交级审查\n\n"
+        for commit_hash, commit_result in commit_reviews.items():
+            content += f"{level}# 提交 `{commit_hash[:8]}` {commit_result.get('message', '')}\n\n"
+            files = ', '.join(f"`{file_path}`" for file_path in commit_result.get('files', []))
+            content += f"**涉及文件**: {files}\n\n"
+            for review_type, review_data in commit_result.get('reviews', {}).items():
+                if 'error' not in review_data:
+                    content += f"**{review_type.replace('_', ' ').title()}**:\n\n"
+                    content += f"{review_data.get('ai_response', '')}\n\n"
+        return content
+    
+    def _review_text(self, review_data: Dict[str, Any]) -> str:
+        """返回审查项的正文；引用提交级审查的条目只输出来源提交"""
+        if 'commit_refs' in review_data:
+            commits = ', '.join(f"`{commit_hash[:8]}`" for commit_hash in review_data['commit_refs'])
+            return f"见提交级审查: {commits}"
+        return review_data.get('ai_response', '')
+    
     def _generate_file_reviews(self, reviews: Dict[str, Any]) -> str:
         """生成文件审查详情部分"""
         content = ""
@@ -193,7 +245,7 @@ class MarkdownReportGenerator:
             if 'reviews' in file_result:
                 for review_type, review_data in file_result['reviews'].items():
                     if 'error' not in review_data:
-                        ai_response = review_data.get('ai_response', '')
+                        ai_response = self._review_text(review_data)
                         content += f"**{review_type.replace('_', ' ').title()}**:\n\n"
                         content += f"{ai_response}\n\n"
             elif 'review' in file_result:
@@ -11,7 +11,8 @@ import sys
 import os
 
 
-def multi_prefix_review(prefixes=None, time_range="2 weeks ago", output_file=None, project_path=None, config_path="config.yaml"):
+def multi_prefix_review(prefixes=None, time_range="2 weeks ago", output_file=None, project_path=None, config_path="config.yaml",
+                        use_index=False, review_mode="file", write_commit_graph=False, **analyzer_options):
     """
     多前缀Git提交代码审查
     
@@ -21,6 +22,14 @@ def multi_prefix_review(prefixes=None, time_range="2 weeks ago", output_file=Non
         output_file: 输出文件名，默认自动生成
         project_path: 待审查项目路径，默认为当前目录
         config_path: 配置文件路径，默认为config.yaml
+        use_index: 是否使用持久化提交索引 (.git/code_reviewer/)，重复运行时只增量摄取新提交
+        review_mode: 'file' 审查整个文件；'diff' 只审查变更片段 (扩展到所在函数/类)；
+            'net' 每个文件按全部匹配提交的净差异审查一次；
+            'commit' 小提交整体审查一次，较大的提交回退为逐文件审查
+        write_commit_graph: 审查前写入带修改路径 Bloom 过滤器的 commit-graph，加速按路径限定的历史遍历
+        **analyzer_options: 其他 GitAnalyzer 选项 (如 grep_pushdown=True、all_refs=True、dedupe_patches=True、
+            include_paths=['services/billing']、exclude_paths=['services/billing/vendor']、
+            merge_policy='first-parent'、encoding='gbk'、history_shards=4)
     
     Returns:
         生成的报告文件路径
@@ -47,9 +56,11 @@ def multi_prefix_review(prefixes=None, time_range="2 weeks ago", output_file=Non
         print(f"❌ 错误: 项目路径不存在: {project_path}")
         return None
     
-    # 检查是否为Git仓库
+    # 检查是否为Git仓库 (支持裸仓库)
     git_path = os.path.join(project_path, '.git')
-    if not os.path.exists(git_path):
+    is_bare = (os.path.isfile(os.path.join(project_path, 'HEAD'))
+               and os.path.isdir(os.path.join(project_path, 'objects')))
+    if not os.path.exists(git_path) and not is_bare:
         print(f"❌ 错误: 指定路径不是Git仓库: {project_path}")
         return None
     
@@ -61,11 +72,20 @@ def multi_prefix_review(prefixes=None, time_range="2 weeks ago", output_file=Non
     print(f"📁 项目路径: {project_path}")
     print(f"📝 匹配前缀: {', '.join(prefixes)}")
     print(f"⏰ 时间范围: {time_range}")
+    if analyzer_options.get('include_paths') or analyzer_options.get('exclude_paths'):
+        scope = ', '.join(analyzer_options.get('include_paths') or ['.'])
+        excluded = analyzer_options.get('exclude_paths')
+        print(f"📂 路径范围: {scope}" + (f" (排除: {', '.join(excluded)})" if excluded else ""))
     print("=" * 50)
     
     try:
         # 初始化审查器，指定项目路径和配置文件
-        reviewer = SmartCodeReviewer(repo_path=project_path, config_path=config_path)
+        reviewer = SmartCodeReviewer(repo_path=project_path, config_path=config_path,
+                                     use_index=use_index, **analyzer_options)
+        
+        if write_commit_graph:
+            print("🗂️ 写入 commit-graph (--changed-paths)...")
+            reviewer.git_analyzer.write_commit_graph()
         
         all_results = {}
         total_files = 0
@@ -80,7 +100,8 @@ def multi_prefix_review(prefixes=None, time_range="2 weeks ago", output_file=Non
                 result = reviewer.review_by_commit_prefix(
                     prefix=prefix,
                     since=time_range,
-                    review_types=['code_review', 'bug_detection', 'security_check']
+                    review_types=['code_review', 'bug_detection', 'security_check'],
+                    review_mode=review_mode
                 )
                 
                 files_count = result.get('files_reviewed', 0)
@@ -167,6 +188,21 @@ def main():
     --time          指定时间范围 (默认: 2 weeks ago)
     --output        指定输出文件名
     --project       指定待审查项目路径 (默认: 当前目录)
+    --index         使用持久化提交索引，重复运行时只摄取新提交
+    --grep          将前缀过滤下推给 git log --grep，由git预先丢弃不匹配的提交
+    --diff          只审查变更片段 (扩展到所在函数/类)，而不是整个文件
+    --net           每个文件只按前缀全部提交的净差异审查一次 (忽略被后续提交改写的中间状态)
+    --commit        小提交的完整补丁一次审查，较大的提交回退为逐文件审查
+    --all           遍历所有分支与标签的提交，而不只是当前分支
+    --dedupe        按 patch-id 合并 cherry-pick/变基产生的重复提交，每个改动只审查一次
+    --path          只分析这些路径下的提交与文件 (逗号分隔，git pathspec)
+    --exclude       排除这些路径 (逗号分隔)
+    --commit-graph  审查前写入带修改路径 Bloom 过滤器的 commit-graph，加速 --path 限定的历史遍历
+    --first-parent  只沿第一父提交遍历历史，合并提交按其合入的整体改动记录
+    --no-merges     跳过合并提交
+    --combined-merges  以合并差异记录合并提交，只审查冲突解决部分
+    --encoding      仓库提交信息与路径的编码 (默认: utf-8)
+    --shards        历史遍历的分片数，时间窗口按提交者时间切分后在多个进程中并行遍历 (默认: 1)
 
 示例:
     python multi_prefix_review.py
@@ -175,6 +211,9 @@ def main():
     python multi_prefix_review.py --output "my_review.md"
     python multi_prefix_review.py --project "/path/to/project"
     python multi_prefix_review.py --project "C:\\Projects\\MyApp" --prefixes "feat:,fix:"
+    python multi_prefix_review.py --index --prefixes "JIRA-1:,JIRA-2:"
+    python multi_prefix_review.py --diff --prefixes "fix:"
+    python multi_prefix_review.py --path "services/billing" --exclude "services/billing/vendor" --commit-graph
             """)
             return
         
@@ -183,6 +222,10 @@ def main():
         time_range = "2 weeks ago"
         output_file = None
         project_path = None
+        use_index = False
+        review_mode = "file"
+        write_commit_graph = False
+        analyzer_options = {}
         
         i = 1
         while i < len(sys.argv):
@@ -198,11 +241,62 @@ def main():
             elif sys.argv[i] == "--project" and i + 1 < len(sys.argv):
                 project_path = sys.argv[i + 1]
                 i += 2
+            elif sys.argv[i] == "--index":
+                use_index = True
+                i += 1
+            elif sys.argv[i] == "--grep":
+                analyzer_options['grep_pushdown'] = True
+                i += 1
+            elif sys.argv[i] == "--diff":
+                review_mode = "diff"
+                i += 1
+            elif sys.argv[i] == "--net":
+                review_mode = "net"
+                i += 1
+            elif sys.argv[i] == "--commit":
+                review_mode = "commit"
+                i += 1
+            elif sys.argv[i] == "--all":
+                analyzer_options['all_refs'] = True
+                i += 1
+            elif sys.argv[i] == "--dedupe":
+                analyzer_options['dedupe_patches'] = True
+                i += 1
+            elif sys.argv[i] == "--path" and i + 1 < len(sys.argv):
+                analyzer_options['include_paths'] = [p.strip() for p in sys.argv[i + 1].split(",") if p.strip()]
+                i += 2
+            elif sys.argv[i] == "--exclude" and i + 1 < len(sys.argv):
+                analyzer_options['exclude_paths'] = [p.strip() for p in sys.argv[i + 1].split(",") if p.strip()]
+                i += 2
+            elif sys.argv[i] == "--commit-graph":
+                write_commit_graph = True
+                i += 1
+            elif sys.argv[i] == "--first-parent":
+                analyzer_options['merge_policy'] = 'first-parent'
+                i += 1
+            elif sys.argv[i] == "--no-merges":
+                analyzer_options['merge_policy'] = 'no-merges'
+                i += 1
+            elif sys.argv[i] == "--combined-merges":
+                analyzer_options['merge_policy'] = 'combined'
+                i += 1
+            elif sys.argv[i] == "--encoding" and i + 1 < len(sys.argv):
+                analyzer_options['encoding'] = sys.argv[i + 1]
+                i += 2
+            elif sys.argv[i] == "--shards" and i + 1 < len(sys.argv):
+                shards = sys.argv[i + 1]
+                if not shards.isdigit() or int(shards) < 1:
+                    print(f"❌ 错误: 分片数必须为正整数: {shards}")
+                    sys.exit(1)
+                analyzer_options['history_shards'] = int(shards)
+                i += 2
             else:
                 i += 1
         
         # 执行审查
-        multi_prefix_review(prefixes, time_range, output_file, project_path)
+        multi_prefix_review(prefixes, time_range, output_file, project_path,
+                            use_index=use_index, review_mode=review_mode,
+                            write_commit_graph=write_commit_graph, **analyzer_options)
     else:
         # 默认执行
         multi_prefix_review()